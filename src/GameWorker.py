@@ -0,0 +1,125 @@
+"""
+Worker thread that plays the turns and resets of the game shown in the PyGame window, so the window keeps drawing
+while the game computes
+"""
+
+# Modules
+import threading
+
+# Model imports
+from model.TicketToRide import TicketToRide
+
+
+class InitializationCancelled(Exception):
+    """
+        Raised in the worker thread to stop the initialization of a game that was cancelled
+    """
+
+
+class GameWorker(object):
+
+    def __init__(self, ttr: TicketToRide, notify=None):
+        """
+        Plays the turns and resets of a game in a background thread. The game itself is only used by the worker;
+        after every job an independent copy of it (see TicketToRide.clone) is published as snapshot, which the window
+        reads without locks and which never changes afterwards.
+        :param ttr: Game to play, it must not be used by the caller afterwards
+        :param notify: Function called from the worker thread when a snapshot is published or the progress changed,
+        e.g. to wake up the event loop of the window
+        """
+        self.ttr = ttr
+        self.notify = notify
+        self.num_published = 0  # number of published snapshots, used as version of the snapshots
+        self.snapshot = None  # latest published copy of the game
+        self.job = None  # 'turn' or 'reset' while the worker is busy, None otherwise
+        self.progress = None  # (phase, done, total) of the running reset
+        self.error = None  # exception of the last job that failed
+        self._cancel = threading.Event()
+        self._thread = None
+
+        self._publish()
+
+    @property
+    def busy(self) -> bool:
+        return self.job is not None
+
+    def turn(self) -> bool:
+        """
+        Start playing one turn
+        :return: False if the worker is busy and the turn is not played
+        """
+        return self._start('turn', self.ttr.turn)
+
+    def reset(self) -> bool:
+        """
+        Start a new game with the same number of agents and route cards on an unused copy of the board
+        :return: False if the worker is busy and the game is not reset
+        """
+        return self._start('reset', self._reset)
+
+    def cancel(self):
+        """
+        Stop the running reset at its next progress report, the game keeps its state from before the reset. Turns
+        cannot be cancelled.
+        """
+        self._cancel.set()
+
+    def join(self, timeout: float = None):
+        """
+        Wait until the running job is done
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _start(self, job: str, function) -> bool:
+        if self.busy:
+            return False
+        self.job = job
+        self.progress = None
+        self.error = None
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._run, args=(function,), name=f'game-{job}', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, function):
+        try:
+            function()
+            self._publish()
+        except InitializationCancelled:
+            pass
+        except Exception as error:  # shown in the window, the last snapshot stays visible
+            self.error = error
+        finally:
+            self.job = None
+            self.progress = None
+            if self.notify is not None:
+                self.notify()
+
+    def _reset(self):
+        """
+        Make a new game with the settings of the current one. The current game is only replaced once the new one is
+        initialized, so a cancelled reset leaves it untouched.
+        """
+        ttr = self.ttr
+        self.ttr = TicketToRide(num_agents=len(ttr.agents), num_route_cards=len(ttr.route_cards) // len(ttr.agents),
+                                kripke_backend=ttr.kripke_backend, board=ttr.board.copy(), events=ttr.events,
+                                agent_types=ttr.agent_types, profiler=ttr.profiler, progress=self._report_progress)
+        for agent in ttr.agents:
+            agent.close()
+
+    def _report_progress(self, phase: str, done: int, total: int):
+        """
+        Progress function of the game that is initialized, raises InitializationCancelled if the reset was cancelled
+        """
+        if self._cancel.is_set():
+            raise InitializationCancelled()
+        self.progress = (phase, done, total)
+        if self.notify is not None:
+            self.notify()
+
+    def _publish(self):
+        snapshot = self.ttr.clone()
+        self.num_published += 1
+        snapshot.version = self.num_published
+        self.snapshot = snapshot
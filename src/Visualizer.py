@@ -4,11 +4,13 @@ Main file for the PyGame window responsible for both displaying the game board a
 
 # Modules
 import math
+import time
 import pygame
 import numpy as np
 import random
 
 # Model imports
+from GameWorker import GameWorker
 from model.TicketToRide import TicketToRide
 from model.map.City import City
 from model.config import *
@@ -26,6 +28,14 @@ BUFFER_FACTOR = PY_GAME_CONFIG['BUFFER_FACTOR']
 LINE_THICKNESS = PY_GAME_CONFIG['LINE_THICKNESS']
 LINE_THICKNESS_RELATION = PY_GAME_CONFIG['LINE_THICKNESS_RELATION']
 RADIUS = PY_GAME_CONFIG['RADIUS']
+MAX_FPS = PY_GAME_CONFIG['MAX_FPS']
+EVENT_DRIVEN = PY_GAME_CONFIG['EVENT_DRIVEN']
+IDLE_WAIT_MS = PY_GAME_CONFIG['IDLE_WAIT_MS']
+SHOW_FRAME_TIME = PY_GAME_CONFIG['SHOW_FRAME_TIME']
+DETAIL_WORLDS = PY_GAME_CONFIG['STATE_SPACE_DETAIL_WORLDS']
+RELATION_SAMPLES = PY_GAME_CONFIG['STATE_SPACE_RELATION_SAMPLES']
+WORLD_DOT_RADIUS = 2  # radius of the worlds of state spaces that are not drawn in detail
+MIN_RELATION_ALPHA = 0.3  # opacity of the pixels of the density raster that are covered once
 COLOURS = PY_GAME_COLOUR_CONFIG
 AGENT_COLOURS = AGENT_COLOURS
 MIN_TRAINS = TICKET_TO_RIDE_CONFIG['MIN_TRAINS']
@@ -36,14 +46,81 @@ BUTTON_HEIGHT = PY_GAME_CONFIG['BUTTON_HEIGHT']
 BUTTON_COLOUR_LIGHT = (180, 180, 180)
 BUTTON_COLOUR_DARK = (110, 110, 110)
 
+GAME_EVENT = pygame.USEREVENT  # posted by the worker when it published a game or its progress changed
+
+FONT_NAME = 'chalkduster.ttf'
+MAX_CACHED_TEXTS = 1024  # rendered texts kept by the visualizer, the cache is emptied when it is full
+
+
+class WorldGrid(object):
+
+    def __init__(self, positions: np.ndarray, cell_size: float):
+        """
+        Uniform grid over the positions of the worlds in the state space view, to find the world under the mouse
+        without comparing the mouse with every world. The worlds are sorted by the cell they are in, so the worlds of a
+        cell are a slice of that order.
+        :param positions: (x, y) of every world
+        :param cell_size: Width and height of a cell, at least the radius used in nearest
+        """
+        self.positions = positions
+        self.cell_size = cell_size
+        cells = np.floor(positions / cell_size).astype(np.int64).reshape(-1, 2)
+        self.origin = cells.min(axis=0) if len(cells) else np.zeros(2, dtype=np.int64)
+        cells -= self.origin
+        self.shape = cells.max(axis=0) + 1 if len(cells) else np.zeros(2, dtype=np.int64)
+        cell_ids = cells[:, 0] * self.shape[1] + cells[:, 1]
+        self.order = np.argsort(cell_ids, kind='stable')  # world indices sorted by cell
+        self.cell_starts = np.searchsorted(cell_ids[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def nearest(self, point: tuple[int, int], radius: float):
+        """
+        Index of the world closest to point that is less than radius away from it, None if there is none. Only the
+        cell of the point and its neighbours are searched.
+        """
+        cell_x, cell_y = np.floor(np.array(point) / self.cell_size).astype(np.int64) - self.origin
+        candidates = [self.order[self.cell_starts[cell_id]:self.cell_starts[cell_id + 1]]
+                      for x in range(max(cell_x - 1, 0), min(cell_x + 2, self.shape[0]))
+                      for y in range(max(cell_y - 1, 0), min(cell_y + 2, self.shape[1]))
+                      for cell_id in [x * self.shape[1] + y]]
+        if not candidates:
+            return None
+        candidates = np.concatenate(candidates)
+        if len(candidates) == 0:
+            return None
+        distances = np.hypot(*(self.positions[candidates] - point).T)
+        closest = np.argmin(distances)
+        return int(candidates[closest]) if distances[closest] < radius else None
+
 
 class Visualizer(object):
 
     def __init__(self, ttr: TicketToRide):
-        self.ttr = ttr
+        # the game is played by the worker, the window draws the latest snapshot the worker published
+        self.worker = GameWorker(ttr, notify=self.notify)
+        self.ttr = self.worker.snapshot
+        self.profiler = ttr.profiler
         self.agent_colors = {}
         self.state_coordinates = {}
         self.selected_state_coordinates_tuple = None
+        self.state_worlds = []  # worlds of the state space view, in the order of world_grid
+        self.world_grid = None  # WorldGrid over the positions of the worlds, depends only on the number of worlds
+        self.true_world_idx = None  # index of the true world in state_worlds
+
+        # render cache: fonts, rendered texts, the positions of the cities and connections in the window, the board
+        # without owners and the board with the owners it was last drawn with
+        self.fonts = {}  # size -> pygame.font.Font
+        self.texts = {}  # (font, text, colour) -> rendered pygame.Surface
+        self.layout_map_data = None  # map of the positions below
+        self.city_positions = []  # city_id -> (x, y)
+        self.connection_lines = []  # connection_id -> ((x, y), (x, y))
+        self.static_board = None  # background and all connections in their own colour
+        self.board_surface = None  # static board with the owned connections and the cities on top
+        self.board_owners = None  # owners of the connections on board_surface
+        self.state_space_surface = None  # state space without the selected world
+        self.state_space_key = None  # (version of the game, id of the Kripke model) of state_space_surface
 
         self._init_agent_colours()
 
@@ -55,6 +132,35 @@ class Visualizer(object):
         for agent, colour in zip(self.ttr.agents, colours):
             self.agent_colors[agent.agent_id] = colour
 
+    def notify(self):
+        """
+        Wakes up the event loop when the worker published a game or its progress changed, called from the worker
+        thread
+        """
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(GAME_EVENT))
+
+    def get_font(self, size: int) -> pygame.font.Font:
+        """
+        Font of the given size, created once
+        """
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.SysFont(FONT_NAME, size)
+        return self.fonts[size]
+
+    def render_text(self, font: pygame.font.Font, text: str, colour: tuple) -> pygame.Surface:
+        """
+        Rendered (antialiased) text, most texts are the same in every frame so they are only rendered the first time
+        """
+        key = (font, text, tuple(colour))
+        rendered = self.texts.get(key)
+        if rendered is None:
+            if len(self.texts) >= MAX_CACHED_TEXTS:
+                self.texts.clear()
+            rendered = font.render(text, True, colour)
+            self.texts[key] = rendered
+        return rendered
+
     def highest_xy(self, cities: list[City]) -> (int, int):
         """
         Determines maximum x and y coordinates of cities to allow for accurate scaling to window size
@@ -162,19 +268,16 @@ class Visualizer(object):
         :param mouse: tuple with mouse coordinates
         :return: boolean indicating truth of collision
         """
-        for world, coordinates in self.state_coordinates.items():
-            centerx, centery = coordinates
-            dist_x = mouse[0] - centerx
-            dist_y = mouse[1] - centery
-            # Calculate the length of the hypotenuse. If it's less than the
-            # radius, the mouse collides with the circle.
-            if math.hypot(dist_x, dist_y) < RADIUS:
-                if self.selected_state_coordinates_tuple and self.selected_state_coordinates_tuple == (
-                        world, centerx, centery):
-                    self.selected_state_coordinates_tuple = None
-                    return False
-                self.selected_state_coordinates_tuple = (world, centerx, centery)
-                return True
+        world_idx = self.world_grid.nearest(mouse, RADIUS) if self.state_worlds else None
+        if world_idx is not None:
+            world = self.state_worlds[world_idx]
+            centerx, centery = self.state_coordinates[world]
+            if self.selected_state_coordinates_tuple and self.selected_state_coordinates_tuple == (
+                    world, centerx, centery):
+                self.selected_state_coordinates_tuple = None
+                return False
+            self.selected_state_coordinates_tuple = (world, centerx, centery)
+            return True
         self.selected_state_coordinates_tuple = None
         return False
 
@@ -190,7 +293,7 @@ class Visualizer(object):
         world, _, _ = self.selected_state_coordinates_tuple
 
         text_height += BUTTON_HEIGHT
-        text = font.render(f"Selected world:", True, COLOURS['dark gray'])
+        text = self.render_text(font, f"Selected world:", COLOURS['dark gray'])
         txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
         surface.blit(text, (text_left, txt_top))
 
@@ -201,13 +304,13 @@ class Visualizer(object):
                 color = COLOURS['dark gray']
 
             text_height += BUTTON_HEIGHT / 2
-            text = font.render(f"Agent {agent_id}:", True, color)
+            text = self.render_text(font, f"Agent {agent_id}:", color)
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             surface.blit(text, (text_left, txt_top))
 
             for route_name in world.get_state(agent_id):
                 text_height += BUTTON_HEIGHT / 2
-                text = font.render(f"* {route_name}", True, color)
+                text = self.render_text(font, f"* {route_name}", color)
                 txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
                 surface.blit(text, (text_left, txt_top))
 
@@ -227,8 +330,8 @@ class Visualizer(object):
         text_left = left + 40
         text_height = top
 
-        large_font = pygame.font.SysFont('chalkduster.ttf', 32)
-        font = pygame.font.SysFont('chalkduster.ttf', 24)
+        large_font = self.get_font(32)
+        font = self.get_font(24)
 
         pygame.draw.rect(surface, COLOURS['dark gray'], [left - 4, top - 4, width + 8, height + 8])
         pygame.draw.rect(surface, COLOURS['background2'], [left, top, width, height])
@@ -244,18 +347,20 @@ class Visualizer(object):
                 for agent in self.ttr.agents:
                     if agent.nr_of_trains < MIN_TRAINS and self.ttr.last_turn == agent.agent_id:
                         text_height += BUTTON_HEIGHT / 2
-                        text = large_font.render(f"Game finished: Agent {agent.agent_id} has less than {MIN_TRAINS} trains!", True,
-                                                 COLOURS['black'])
+                        text = self.render_text(large_font, f"Game finished: Agent {agent.agent_id} has less than "
+                                                            f"{MIN_TRAINS} trains!", COLOURS['black'])
                         surface.blit(text, (text_left, text_height))
                         text_height += BUTTON_HEIGHT
             else:
                 text_height += BUTTON_HEIGHT / 2
-                text = large_font.render(f"Game finished: deck empty, no more train cards!", True, COLOURS['black'])
+                text = self.render_text(large_font, f"Game finished: deck empty, no more train cards!",
+                                        COLOURS['black'])
                 surface.blit(text, (text_left, text_height))
                 text_height += BUTTON_HEIGHT
         else:
             text_height += BUTTON_HEIGHT / 2
-            text = large_font.render(f"Game finished: Agent {winning_agent} completed all routes", True, COLOURS['black'])
+            text = self.render_text(large_font, f"Game finished: Agent {winning_agent} completed all routes",
+                                    COLOURS['black'])
             surface.blit(text, (text_left, text_height))
             text_height += BUTTON_HEIGHT
 
@@ -264,14 +369,15 @@ class Visualizer(object):
         for agent in self.ttr.agents:
             points[agent.agent_id] = agent.score
             text_height += BUTTON_HEIGHT / 2 + 4
-            text = font.render(f"   Agent {agent.agent_id} has {agent.score} points", True, COLOURS['black'])
+            text = self.render_text(font, f"   Agent {agent.agent_id} has {agent.score} points", COLOURS['black'])
             surface.blit(text, (text_left, text_height))
 
         agent_winner = max(points.keys(), key=(lambda idx: points[idx]))
 
         text_height += BUTTON_HEIGHT
         text_height += BUTTON_HEIGHT / 2
-        text = font.render(f"Agent {agent_winner} has won with {points[agent_winner]} points!", True, COLOURS['black'])
+        text = self.render_text(font, f"Agent {agent_winner} has won with {points[agent_winner]} points!",
+                                COLOURS['black'])
         surface.blit(text, (text_left, text_height))
 
         return surface
@@ -298,28 +404,22 @@ class Visualizer(object):
             pygame.draw.rect(surface, BUTTON_COLOUR_LIGHT,
                              [button_x_left, button_y_top, BUTTON_WIDTH, BUTTON_HEIGHT])
 
-        text = font.render(content, True, (0, 0, 0))
+        text = self.render_text(font, content, (0, 0, 0))
         txt_left = button_x_left + BUTTON_WIDTH / 2 - 0.5 * text.get_width()
         txt_top = button_y_top + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
         surface.blit(text, (txt_left, txt_top))
 
         return surface
 
-    def draw_ttr_board(self, contents: pygame.Surface) -> pygame.Surface:
+    def make_board_layout(self) -> (list, list):
         """
-        Returns the contents of the Ticket to Ride board
-        :param contents: PyGame surface on which the ttr board must be drawn
-        :return: PyGame surface containing full board contents
+        Positions in the window of the cities and of both ends of the connections, computed once per map. The
+        connections of a double route are shifted next to each other.
+        :return: list of (x, y) per city and list of (start, end) positions per connection
         """
-        lt_lim = None
-        rt_lim = None
-        tp_lim = None
-        bt_lim = None
-
-        contents.fill(COLOURS['background'])
-
-        min_x, min_y = self.lowest_xy(list(self.ttr.board.cities.values()))
-        max_x, max_y = self.highest_xy(list(self.ttr.board.cities.values()))
+        cities = list(self.ttr.board.cities.values())
+        min_x, min_y = self.lowest_xy(cities)
+        max_x, max_y = self.highest_xy(cities)
 
         min_x -= WIDTH_BUFFER
         max_x += WIDTH_BUFFER
@@ -332,117 +432,199 @@ class Visualizer(object):
         x_scaling = CONTENT_WIDTH / max_x
         y_scaling = SCREEN_HEIGHT / max_y
 
-        for connection in self.ttr.board.connections:
-            n1h, n1w = connection.start_point.coordinates
-            n2h, n2w = connection.end_point.coordinates
-            n1x = (n1w - min_x) * x_scaling
-            n2x = (n2w - min_x) * x_scaling
-            n1y = SCREEN_HEIGHT - (n1h - min_y) * y_scaling
-            n2y = SCREEN_HEIGHT - (n2h - min_y) * y_scaling
-
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(n1x, n1y, lt_lim, rt_lim, tp_lim, bt_lim)
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(n2x, n2y, lt_lim, rt_lim, tp_lim, bt_lim)
-
-            # draw edges
-            if connection.owner is not None:
-                color = self.agent_colors[connection.owner]
-                line_width = 2 * LINE_THICKNESS
-            else:
-                color = COLOURS[connection.color]
-                line_width = LINE_THICKNESS
-
-            if isinstance(connection, FerryConnection):
-                self.draw_dashed_line(contents, color, (n1x, n1y), (n2x, n2y), width=line_width)
-            else:
-                pygame.draw.line(contents, color=color, start_pos=(n1x, n1y), end_pos=(n2x, n2y), width=line_width)
-
-        for city in self.ttr.board.cities.values():
-            height, width = city.coordinates
-            height -= min_y
-            width -= min_x
-
-            x = width * x_scaling
-            y = SCREEN_HEIGHT - height * y_scaling
+        city_positions = [((width - min_x) * x_scaling, SCREEN_HEIGHT - (height - min_y) * y_scaling)
+                          for height, width in (city.coordinates for city in cities)]
 
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(x - RADIUS, y - RADIUS, lt_lim, rt_lim, tp_lim, bt_lim)
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(x + RADIUS, y + RADIUS, lt_lim, rt_lim, tp_lim, bt_lim)
-
-            # draw cities as circles
-            pygame.draw.circle(contents, (255, 0, 0), (x, y), radius=RADIUS)
-
-            # draw text on center of cities
-            font1 = pygame.font.SysFont('chalkduster.ttf', 24)
-            text = font1.render(city.name, True, (0, 0, 0))
+        connection_lines = []
+        for connection in self.ttr.board.connections:
+            n1x, n1y = city_positions[connection.start_point.city_id]
+            n2x, n2y = city_positions[connection.end_point.city_id]
 
-            txt_left = width * x_scaling - 0.5 * text.get_width()
-            txt_top = SCREEN_HEIGHT - (height * y_scaling + 0.5 * text.get_height())
-            txt_right = width * x_scaling + 0.5 * text.get_width()
-            txt_bottom = SCREEN_HEIGHT - (height * y_scaling - 0.5 * text.get_height())
+            # draw the connections of a double route next to each other
+            group = self.ttr.board.connection_groups[connection.connection_id]
+            if len(group) > 1:
+                length = max(math.hypot(n2x - n1x, n2y - n1y), 1)
+                shift = (group.index(connection.connection_id) - (len(group) - 1) / 2) * 2 * LINE_THICKNESS
+                shift_x, shift_y = -(n2y - n1y) / length * shift, (n2x - n1x) / length * shift
+                n1x, n1y, n2x, n2y = n1x + shift_x, n1y + shift_y, n2x + shift_x, n2y + shift_y
+            connection_lines.append(((n1x, n1y), (n2x, n2y)))
 
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(txt_left, txt_top, lt_lim, rt_lim, tp_lim, bt_lim)
-            lt_lim, rt_lim, tp_lim, bt_lim = self.update_limits(txt_right, txt_bottom, lt_lim, rt_lim, tp_lim, bt_lim)
+        return city_positions, connection_lines
 
-            contents.blit(text, (txt_left, txt_top))
+    def draw_connection(self, surface: pygame.Surface, connection, color: tuple, line_width: int):
+        """
+        Draws a connection at its position in the board layout, dashed for ferries
+        """
+        start_pos, end_pos = self.connection_lines[connection.connection_id]
+        if isinstance(connection, FerryConnection):
+            self.draw_dashed_line(surface, color, start_pos, end_pos, width=line_width)
+        else:
+            pygame.draw.line(surface, color=color, start_pos=start_pos, end_pos=end_pos, width=line_width)
 
+    def draw_ttr_board(self, contents: pygame.Surface) -> pygame.Surface:
+        """
+        Returns the contents of the Ticket to Ride board. The board is drawn in layers that are cached: the background
+        with all connections in their own colour is drawn once per map, the owned connections and the cities on top of
+        it only when the owner of a connection changed. Every other frame only copies the cached board.
+        :param contents: PyGame surface on which the ttr board must be drawn
+        :return: PyGame surface containing full board contents
+        """
+        board = self.ttr.board
+        if self.layout_map_data is not board.map_data:
+            self.city_positions, self.connection_lines = self.make_board_layout()
+            self.layout_map_data = board.map_data
+            self.static_board = None
+
+        if self.static_board is None or self.static_board.get_size() != contents.get_size():
+            self.static_board = contents.copy()
+            self.static_board.fill(COLOURS['background'])
+            for connection in board.connections:
+                self.draw_connection(self.static_board, connection, COLOURS[connection.color], LINE_THICKNESS)
+            self.board_surface = None
+
+        if self.board_surface is None or not np.array_equal(self.board_owners, board.connection_owners):
+            self.board_surface = self.static_board.copy()
+            for connection_id in np.flatnonzero(board.connection_owners >= 0).tolist():
+                connection = board.connections[connection_id]
+                self.draw_connection(self.board_surface, connection, self.agent_colors[connection.owner],
+                                     2 * LINE_THICKNESS)
+
+            for city, (x, y) in zip(board.cities.values(), self.city_positions):
+                # draw cities as circles with their name on the center
+                pygame.draw.circle(self.board_surface, (255, 0, 0), (x, y), radius=RADIUS)
+                text = self.render_text(self.get_font(24), city.name, (0, 0, 0))
+                self.board_surface.blit(text, (x - 0.5 * text.get_width(), y - 0.5 * text.get_height()))
+            self.board_owners = board.connection_owners.copy()
+
+        contents.blit(self.board_surface, (0, 0))
         return contents
 
     def draw_state_space(self, contents: pygame.Surface) -> pygame.Surface:
         """
-        Returns the contents of the visual representation of the state space
+        Returns the contents of the visual representation of the state space. The state space is only drawn again when
+        the version of the game changed, other frames copy the cached surface and draw the selected world on top.
         :param contents: PyGame surface on which the state space ought to be drawn
         :return: PyGame surface containing full state spacce
         """
-        contents.fill(COLOURS['background'])
+        key = (self.ttr.version, id(self.ttr.kripke))
+        if self.state_space_surface is None or self.state_space_key != key or \
+                self.state_space_surface.get_size() != contents.get_size():
+            self.state_space_surface = self.make_state_space(contents.copy())
+            self.state_space_key = key
 
-        model = self.ttr.kripke
-        coordinates = self.compute_circular_coordinates(len(model.worlds))
-        random.Random(69).shuffle(coordinates)
+        contents.blit(self.state_space_surface, (0, 0))
+        if self.selected_state_coordinates_tuple:
+            _, x, y = self.selected_state_coordinates_tuple
+            pygame.draw.circle(contents, (0, 0, 255), (x, y), radius=RADIUS)
+        return contents
 
-        self.state_coordinates = {}
+    def make_state_space(self, surface: pygame.Surface) -> pygame.Surface:
+        """
+        Draws the worlds on a circle and the relations of every agent in its colour. With at most DETAIL_WORLDS worlds
+        every relation is drawn as a line, otherwise the relations are drawn at a lower level of detail (see
+        draw_relation_density) and the worlds as dots.
+        :param surface: PyGame surface on which the state space ought to be drawn
+        :return: PyGame surface containing full state space
+        """
+        surface.fill(COLOURS['background'])
 
-        if len(model.worlds) == 1:
-            self.state_coordinates[model.worlds[0]] = (CONTENT_WIDTH / 2, SCREEN_HEIGHT / 2)
+        model = self.ttr.kripke
+        try:
+            worlds = model.worlds
+        except RuntimeError as error:
+            # symbolic model that is too large to enumerate
+            self.state_coordinates = {}
+            self.state_worlds = []
+            self.true_world_idx = None
+            font = self.get_font(24)
+            text = self.render_text(font, str(error), COLOURS['dark gray'])
+            surface.blit(text, (CONTENT_WIDTH / 2 - 0.5 * text.get_width(), SCREEN_HEIGHT / 2))
+            return surface
+
+        # the positions only depend on the number of worlds
+        if self.world_grid is None or len(self.world_grid) != len(worlds):
+            if len(worlds) == 1:
+                coordinates = [(CONTENT_WIDTH / 2, SCREEN_HEIGHT / 2)]
+            else:
+                coordinates = self.compute_circular_coordinates(len(worlds))[:len(worlds)]
+                random.Random(69).shuffle(coordinates)
+            self.world_grid = WorldGrid(np.array(coordinates, dtype=np.float64), cell_size=2 * RADIUS)
+
+        self.state_worlds = worlds
+        self.state_coordinates = {world: tuple(position) for world, position in
+                                  zip(worlds, self.world_grid.positions.tolist())}
+        self.true_world_idx = self.find_true_world(worlds)
+
+        detailed = len(worlds) <= DETAIL_WORLDS
+        if detailed:
+            # draw relations with color per agent {'agent_id': [(world, world), ...], ...}
+            for agent_id, relations_list in model.relations.items():
+                agent_colour = self.agent_colors[agent_id]
+                for world1, world2 in relations_list:
+                    pygame.draw.line(surface, color=agent_colour, start_pos=self.state_coordinates[world1],
+                                     end_pos=self.state_coordinates[world2], width=LINE_THICKNESS_RELATION)
         else:
-            for world, coordinate_tuple in zip(model.worlds, coordinates):
-                self.state_coordinates[world] = coordinate_tuple
-
-        # draw relations with color per agent {'agent_id': [(world, world), ...], ...}
-        for agent_id in model.relations.keys():
-            agent_colour = self.agent_colors[agent_id]
-            relations_list = model.relations[agent_id]
+            self.draw_relation_density(surface, self.world_grid.positions, model.relation_labels)
 
-            for relation_tuple in relations_list:
-                world1, world2 = relation_tuple
+        # draw worlds, the true world in green
+        radius = RADIUS if detailed else WORLD_DOT_RADIUS
+        for coordinate_tuple in self.state_coordinates.values():
+            pygame.draw.circle(surface, (255, 0, 0), coordinate_tuple, radius=radius)
+        if self.true_world_idx is not None:
+            true_world = self.state_worlds[self.true_world_idx]
+            pygame.draw.circle(surface, (0, 255, 0), self.state_coordinates[true_world], radius=RADIUS)
 
-                start_pos = self.state_coordinates[world1]
-                end_pos = self.state_coordinates[world2]
-
-                pygame.draw.line(contents, color=agent_colour, start_pos=start_pos, end_pos=end_pos,
-                                 width=LINE_THICKNESS_RELATION)
+        return surface
 
-        # draw worlds
+    def find_true_world(self, worlds: list) -> int:
+        """
+        Index of the world in which every agent has the route cards it was dealt, None if it is not in worlds
+        """
         true_state = self.ttr.get_true_state()
-        found_true_state = False
-        for world, coordinate_tuple in self.state_coordinates.items():
-            x, y = coordinate_tuple
-            tuple_to_check = (world, x, y)
-            if tuple_to_check == self.selected_state_coordinates_tuple:
-                pygame.draw.circle(contents, (0, 0, 255), coordinate_tuple, radius=RADIUS)
-            else:
-                if not found_true_state:
-                    for agent in self.ttr.agents:
-                        if not true_state[agent.agent_id].symmetric_difference(world.get_state(agent.agent_id)):
-                            # true if no difference in states
-                            found_true_state = True
-                        else:
-                            found_true_state = False
-                            break
-                    if found_true_state:
-                        pygame.draw.circle(contents, (0, 255, 0), coordinate_tuple, radius=RADIUS)
-                        continue
-                pygame.draw.circle(contents, (255, 0, 0), coordinate_tuple, radius=RADIUS)
+        for world_idx, world in enumerate(worlds):
+            if all(world.get_state(agent_id) == route_cards for agent_id, route_cards in true_state.items()):
+                return world_idx
+        return None
 
-        return contents
+    def draw_relation_density(self, surface: pygame.Surface, positions: np.ndarray, labels: dict[int, np.ndarray]):
+        """
+        Draws the relations of large state spaces as a density raster instead of one line per pair of worlds. The
+        relation of an agent is a set of equivalence classes in which all worlds are related, so every world is
+        connected to the center of its class (edges bundled per class). Points sampled along these segments are
+        counted per pixel, and the covered pixels are blended with the colour of the agent, more opaque (on a log scale)
+        the more segments cover them.
+        :param surface: PyGame surface on which the relations ought to be drawn
+        :param positions: (x, y) of every world
+        :param labels: class label of every world per agent, see relation_labels of the Kripke models
+        """
+        width, height = surface.get_size()
+        pixels = pygame.surfarray.array3d(surface).reshape(-1, 3).astype(np.float32)  # pixel x * height + y
+
+        for agent_id, agent_labels in labels.items():
+            # center of the class of every world
+            _, inverse, counts = np.unique(agent_labels, return_inverse=True, return_counts=True)
+            centers = np.stack([np.bincount(inverse, weights=positions[:, axis]) / counts
+                                for axis in range(2)], axis=1)[inverse]
+            bundled = counts[inverse] > 1  # worlds that are related to other worlds
+            starts, ends = positions[bundled], centers[bundled]
+            if starts.shape[0] == 0:
+                continue
+
+            # about one sample per pixel of the longest segment, within the budget of samples
+            longest = np.sqrt(((ends - starts) ** 2).sum(axis=1).max())
+            num_samples = int(np.clip(RELATION_SAMPLES // starts.shape[0], 2, longest + 2))
+            steps = np.linspace(0, 1, num_samples)[None, :, None]
+            points = (starts[:, None, :] + (ends - starts)[:, None, :] * steps).reshape(-1, 2).astype(np.int32)
+            np.clip(points, 0, (width - 1, height - 1), out=points)  # worlds are drawn on the surface, guards rounding
+            density = np.bincount(points[:, 0] * height + points[:, 1], minlength=width * height)
+
+            # blend only the pixels that are covered
+            covered = np.flatnonzero(density)
+            alpha = (MIN_RELATION_ALPHA + (1 - MIN_RELATION_ALPHA) * np.log1p(density[covered]) /
+                     np.log1p(density.max()))[:, None]
+            pixels[covered] = pixels[covered] * (1 - alpha) + np.array(self.agent_colors[agent_id]) * alpha
+
+        pygame.surfarray.blit_array(surface, pixels.reshape(width, height, 3).astype(np.uint8))
 
     def draw_side_panel(self, side_panel: pygame.Surface, button_x_left: int, button_x_right: int,
                         mouse: tuple[int, int], board_visible: bool) -> pygame.Surface:
@@ -456,7 +638,7 @@ class Visualizer(object):
         """
 
         side_panel.fill(COLOURS['background2'])
-        button_font = pygame.font.SysFont('chalkduster.ttf', 20)
+        button_font = self.get_font(20)
 
         # draw switch button
         side_panel = self.draw_button(side_panel, button_x_left, BUTTON_HEIGHT / 2,
@@ -468,35 +650,35 @@ class Visualizer(object):
                                       button_x_right, BUTTON_HEIGHT / 2 + 3 * BUTTON_HEIGHT,
                                       mouse, button_font, "Turn")
 
-        # reset game
+        # reset game, or cancel the reset that is running
         side_panel = self.draw_button(side_panel, button_x_left, BUTTON_HEIGHT / 2 + 4 * BUTTON_HEIGHT,
                                       button_x_right, BUTTON_HEIGHT / 2 + 5 * BUTTON_HEIGHT,
-                                      mouse, button_font, "Reset")
+                                      mouse, button_font, "Cancel" if self.worker.job == 'reset' else "Reset")
 
         # show relevant information of agents
         text_height = 6 * BUTTON_HEIGHT
         txt_left = BUFFER_FACTOR * 2
         for idx, agent in enumerate(self.ttr.agents):
-            text = button_font.render(f"Agent {agent.agent_id}", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"Agent {agent.agent_id}",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"* score: {agent.score}", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"* score: {agent.score}",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"* nr. trains: {agent.nr_of_trains}", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"* nr. trains: {agent.nr_of_trains}",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"* route cards:", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"* route cards:",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
@@ -505,19 +687,19 @@ class Visualizer(object):
                 if route_card.is_finished:
                     text_color = self.agent_colors[agent.agent_id]
                 text_height += BUTTON_HEIGHT / 2
-                text = button_font.render(f"   - {route_card.route_name}", True, text_color)
+                text = self.render_text(button_font, f"   - {route_card.route_name}", text_color)
                 txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
                 side_panel.blit(text, (txt_left, txt_top))
 
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"* last move:", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"* last move:",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"   - {agent.last_move}", True,
-                                      self.agent_colors[agent.agent_id])
+            text = self.render_text(button_font, f"   - {agent.last_move}",
+                                    self.agent_colors[agent.agent_id])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
@@ -528,15 +710,51 @@ class Visualizer(object):
             side_panel = self.show_state_info(side_panel, txt_left, text_height, button_font)
         elif not board_visible:
             text_height += BUTTON_HEIGHT / 2
-            text = button_font.render(f"No world selected", True, COLOURS['dark gray'])
+            text = self.render_text(button_font, f"No world selected", COLOURS['dark gray'])
             txt_top = BUTTON_HEIGHT / 2 + text_height + BUTTON_HEIGHT / 2 - 0.5 * text.get_height()
             side_panel.blit(text, (txt_left, txt_top))
 
         return side_panel
 
+    def draw_worker_status(self, surface: pygame.Surface):
+        """
+        Draws what the worker is doing, or the error of its last job, above the frame time at the bottom of the side
+        panel
+        :param surface: PyGame surface of the side panel
+        """
+        job, progress, error = self.worker.job, self.worker.progress, self.worker.error
+        if job == 'turn':
+            status = "Playing turn..."
+        elif job == 'reset' and progress is not None:
+            phase, done, total = progress
+            status = f"Resetting: {phase} {100 * done / max(total, 1):.0f}%"
+        elif job == 'reset':
+            status = "Resetting..."
+        elif error is not None:
+            status = f"Error: {error}"
+        else:
+            return
+
+        text = self.render_text(self.get_font(20), status, COLOURS['dark gray'])
+        surface.blit(text, (BUFFER_FACTOR * 2, SCREEN_HEIGHT - 1.5 * BUTTON_HEIGHT - text.get_height()))
+
+    def draw_frame_time(self, surface: pygame.Surface, stats: dict):
+        """
+        Draws the time of the last frame, the number of frames drawn and the CPU usage of the process in the last
+        second at the bottom of the side panel
+        :param surface: PyGame surface of the side panel
+        :param stats: dictionary with 'frame_time' in seconds, 'fps' and 'cpu' as fraction of one core
+        """
+        text = self.render_text(self.get_font(20), f"frame {stats['frame_time'] * 1e3:.1f} ms | {stats['fps']} fps | "
+                                                   f"cpu {stats['cpu'] * 100:.0f}%", COLOURS['dark gray'])
+        surface.blit(text, (BUFFER_FACTOR * 2, SCREEN_HEIGHT - BUTTON_HEIGHT / 2 - text.get_height()))
+
     def run(self):
         """
-        Main PyGame function responsible for keeping the screen up to date
+        Main PyGame function responsible for keeping the screen up to date. At most MAX_FPS frames are drawn per
+        second. In the event-driven mode a frame is only drawn after input or when the worker published a game or
+        progress, otherwise the loop sleeps while waiting for input. Turns and resets are played by the worker, the
+        loop only draws the latest snapshot of the game.
         """
         pygame.init()
 
@@ -544,25 +762,44 @@ class Visualizer(object):
         contents = screen.copy()
         contents = pygame.transform.scale(contents, (CONTENT_WIDTH, SCREEN_HEIGHT))
         side_panel = pygame.Surface((SCREEN_WIDTH - CONTENT_WIDTH, SCREEN_HEIGHT))
-
-        contents = self.draw_ttr_board(contents)
-
-        screen.blit(contents, (WIDTH_BUFFER / 2, HEIGHT_BUFFER / 2))
-
-        pygame.display.update()
+        clock = pygame.time.Clock()
 
         running = True
         show_board = True
+        show_frame_time = SHOW_FRAME_TIME
+        redraw = True
+        drawn_version = None
+
+        # frame time overlay, the frame rate and CPU usage are measured over one second
+        stats = {'frame_time': 0.0, 'fps': 0, 'cpu': 0.0}
+        frames = 0
+        stats_wall_time = time.perf_counter()
+        stats_cpu_time = time.process_time()
 
         while running:
             button_x_left = PANEL_WIDTH / 2 - BUTTON_WIDTH / 2
             button_x_right = PANEL_WIDTH / 2 + BUTTON_WIDTH / 2
 
+            if EVENT_DRIVEN and not redraw and drawn_version == self.ttr.version:
+                # nothing to draw, sleep until input arrives (or the timeout to check the version of the game)
+                timeout = min(IDLE_WAIT_MS, 1000) if show_frame_time else IDLE_WAIT_MS  # overlay: update each second
+                events = [pygame.event.wait(timeout)]
+                events += pygame.event.get()
+            else:
+                events = pygame.event.get()
+
             mouse = pygame.mouse.get_pos()
 
-            for event in pygame.event.get():
+            for event in events:
+                if event.type == pygame.NOEVENT:
+                    continue
+                # any input can change the window, e.g. the colour of a button under the mouse
+                redraw = True
                 if event.type == pygame.QUIT:
                     running = False
+                    self.worker.cancel()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+                    show_frame_time = not show_frame_time
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     # assert not clicked on state
                     if not self.state_collision(mouse):
@@ -576,26 +813,57 @@ class Visualizer(object):
                     # turn button
                     elif self.rectangle_collision(button_x_left, BUTTON_HEIGHT / 2 + 2 * BUTTON_HEIGHT,
                                                   button_x_right, BUTTON_HEIGHT / 2 + 3 * BUTTON_HEIGHT, mouse):
-                        self.ttr.turn()
+                        self.worker.turn()
 
                     # reset button
                     elif self.rectangle_collision(button_x_left, BUTTON_HEIGHT / 2 + 4 * BUTTON_HEIGHT,
                                                   button_x_right, BUTTON_HEIGHT / 2 + 5 * BUTTON_HEIGHT,
                                                   mouse):
-                        self.ttr.init_game(num_agents=len(self.ttr.agents),
-                                           num_route_cards=len(self.ttr.route_cards) // len(self.ttr.agents))
-
-            if show_board:
-                contents = self.draw_ttr_board(contents)
-            else:
-                contents = self.draw_state_space(contents)
-
-            if not self.ttr.in_game:
-                contents = self.show_result(contents)
-
-            side_panel = self.draw_side_panel(side_panel, button_x_left, button_x_right, mouse, show_board)
-
-            screen.blit(contents, (WIDTH_BUFFER / 2, HEIGHT_BUFFER / 2 - 1))
-            screen.blit(side_panel, (CONTENT_WIDTH, 0))
-
-            pygame.display.update()
+                        if self.worker.job == 'reset':
+                            self.worker.cancel()
+                        else:
+                            self.worker.reset()
+
+            now = time.perf_counter()
+            if now - stats_wall_time >= 1:
+                cpu_time = time.process_time()
+                stats['fps'] = frames
+                stats['cpu'] = (cpu_time - stats_cpu_time) / (now - stats_wall_time)
+                frames = 0
+                stats_wall_time, stats_cpu_time = now, cpu_time
+                redraw = redraw or show_frame_time
+
+            self.ttr = self.worker.snapshot
+            if not running or (EVENT_DRIVEN and not redraw and drawn_version == self.ttr.version):
+                continue
+
+            begin = time.perf_counter()
+            profiler = self.profiler
+            with profiler.phase('frame'):
+                drawn_version = self.ttr.version
+                if show_board:
+                    with profiler.phase('draw_ttr_board'):
+                        contents = self.draw_ttr_board(contents)
+                else:
+                    with profiler.phase('draw_state_space'):
+                        contents = self.draw_state_space(contents)
+
+                if not self.ttr.in_game:
+                    with profiler.phase('show_result'):
+                        contents = self.show_result(contents)
+
+                with profiler.phase('draw_side_panel'):
+                    side_panel = self.draw_side_panel(side_panel, button_x_left, button_x_right, mouse, show_board)
+                    self.draw_worker_status(side_panel)
+                    if show_frame_time:
+                        self.draw_frame_time(side_panel, stats)
+
+                with profiler.phase('display_update'):
+                    screen.blit(contents, (WIDTH_BUFFER / 2, HEIGHT_BUFFER / 2 - 1))
+                    screen.blit(side_panel, (CONTENT_WIDTH, 0))
+                    pygame.display.update()
+
+            stats['frame_time'] = time.perf_counter() - begin
+            frames += 1
+            redraw = False
+            clock.tick(MAX_FPS)
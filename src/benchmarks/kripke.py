@@ -0,0 +1,266 @@
+"""
+Benchmark of the Kripke models over a grid of numbers of agents and route cards per agent. Every case plays the same
+knowledge updates as a game: every agent learns its own hand, the agents ask what they know of each other, every agent
+announces that it has one of two cards and then one card of its own, and the agents ask again. The time of every
+operation, the peak memory and the number of worlds and relations are reported.
+
+Every case runs in a new process, so its peak RSS is not affected by earlier cases. Results can be written as JSON and
+compared with the JSON of an earlier run to flag regressions.
+
+Run from the src folder with:
+
+    python -m benchmarks.kripke --output kripke.json
+    python -m benchmarks.kripke --baseline kripke.json
+"""
+
+# packages
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from model.TicketToRide import KRIPKE_BACKENDS
+from model.ttr_kripke.enumeration import count_worlds
+
+try:
+    import resource
+except ImportError:  # not available on Windows, peak RSS is then not reported
+    resource = None
+
+OPERATIONS = ['_init_worlds', '_init_relations', 'update_once_cards_known', 'public_announcement_possibilities',
+              'public_announcement_route_card', 'get_known_route_cards']
+DEFAULT_AGENTS = [2, 3, 4, 5]
+DEFAULT_CARDS = [1, 2, 3, 4]
+DEFAULT_MAX_WORLDS = 1000000  # larger models are only benchmarked for backends that do not enumerate the worlds
+MIN_REGRESSION_TIME = 1e-3  # seconds, smaller slowdowns are considered noise
+
+
+def timed_backend(backend_class):
+    """
+    Subclass of a Kripke model that records the time of _init_worlds and _init_relations, which are called by the
+    initializer of the enumerating models
+    """
+
+    class TimedBackend(backend_class):
+
+        def _init_worlds(self):
+            begin = time.perf_counter()
+            super()._init_worlds()
+            self.init_times = {'_init_worlds': time.perf_counter() - begin}
+
+        def _init_relations(self):
+            begin = time.perf_counter()
+            super()._init_relations()
+            self.init_times['_init_relations'] = time.perf_counter() - begin
+
+    return TimedBackend
+
+
+def max_rss() -> float:
+    """
+    Peak resident set size of this process in MB, None if it cannot be measured
+    """
+    if resource is None:
+        return None
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss_kb / 2 ** 20 if sys.platform == 'darwin' else max_rss_kb / 2 ** 10  # bytes on macOS
+
+
+def count_relations(model) -> int:
+    """
+    Number of relations over all agents, None for models without partitions of the worlds
+    """
+    partitions = getattr(model, 'partitions', None)
+    if not partitions:
+        return None
+    return sum(partition.num_relations() for partition in partitions.values())
+
+
+def count_remaining_worlds(model) -> int:
+    """
+    Number of worlds left after the announcements, None for models that do not enumerate their worlds
+    """
+    if hasattr(model, 'num_worlds'):
+        return model.num_worlds
+    if hasattr(model, 'partitions'):
+        return len(model.worlds)
+    return None
+
+
+def play_updates(backend: str, num_agents: int, num_cards: int, seed: int) -> (dict, object):
+    """
+    Make a model and play the knowledge updates of one case
+    :return: time of every operation in seconds and the model
+    """
+    rng = random.Random(seed)
+    agent_ids = list(range(num_agents))
+    route_cards = [f'Route{idx}' for idx in range(num_agents * num_cards)]
+    dealt = route_cards.copy()
+    rng.shuffle(dealt)
+    hands = {agent_id: dealt[idx * num_cards:(idx + 1) * num_cards] for idx, agent_id in enumerate(agent_ids)}
+    times = dict.fromkeys(OPERATIONS, 0.0)
+
+    backend_class = KRIPKE_BACKENDS[backend]
+    begin = time.perf_counter()
+    if hasattr(backend_class, '_init_worlds'):
+        model = timed_backend(backend_class)(agent_ids, route_cards, max_worlds=None)
+        times.update(model.init_times)
+    else:
+        model = backend_class(agent_ids, route_cards)
+        times['_init_worlds'] = time.perf_counter() - begin
+
+    def ask_all():
+        start = time.perf_counter()
+        for agent_id in agent_ids:
+            for target_agent_id in agent_ids:
+                if target_agent_id != agent_id:
+                    model.get_known_route_cards(agent_id, target_agent_id)
+        times['get_known_route_cards'] += time.perf_counter() - start
+
+    begin = time.perf_counter()
+    for agent_id in agent_ids:
+        model.update_once_cards_known(agent_id, set(hands[agent_id]))
+    times['update_once_cards_known'] = time.perf_counter() - begin
+    ask_all()
+
+    begin = time.perf_counter()
+    for agent_id in agent_ids:
+        other_card = hands[agent_ids[(agent_id + 1) % num_agents]][0]
+        model.public_announcement_possibilities(agent_id, {hands[agent_id][0], other_card})
+    times['public_announcement_possibilities'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for agent_id in agent_ids:
+        model.public_announcement_route_card(agent_id, {hands[agent_id][-1]})
+    times['public_announcement_route_card'] = time.perf_counter() - begin
+    ask_all()
+
+    return times, model
+
+
+def run_case(case: dict) -> dict:
+    """
+    Benchmark one case, the best time of every operation over the repetitions is reported
+    """
+    rss_before = max_rss()
+    best_times = {}
+    relations = remaining_worlds = None
+    for _ in range(case['repeats']):
+        times, model = play_updates(case['backend'], case['agents'], case['cards'], case['seed'])
+        for operation, seconds in times.items():
+            best_times[operation] = min(seconds, best_times.get(operation, seconds))
+        relations = count_relations(model)
+        remaining_worlds = count_remaining_worlds(model)
+        del model
+
+    rss_after = max_rss()
+    return dict(case, worlds=count_worlds(case['agents'] * case['cards'], case['agents']), relations=relations,
+                remaining_worlds=remaining_worlds, times=best_times, peak_rss_mb=rss_after,
+                model_rss_mb=rss_after - rss_before if rss_after is not None else None)
+
+
+def find_regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """
+    Compare results with the results of an earlier run. A time or the memory of the model is a regression if it grew
+    by more than the tolerance (and, for times, by more than MIN_REGRESSION_TIME), different numbers of worlds or
+    relations are always reported.
+    :return: Description of every regression
+    """
+    baseline_cases = {(result['backend'], result['agents'], result['cards']): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = (result['backend'], result['agents'], result['cards'])
+        name = f"{result['backend']} {result['agents']} agents x {result['cards']} cards"
+        old = baseline_cases.get(key)
+        if old is None or result.get('skipped') or old.get('skipped'):
+            continue
+
+        for count in ('worlds', 'relations', 'remaining_worlds'):
+            if result[count] != old[count]:
+                regressions.append(f"{name}: {count} {old[count]} -> {result[count]}")
+        for operation, seconds in result['times'].items():
+            old_seconds = old['times'].get(operation)
+            if old_seconds is not None and seconds > old_seconds * (1 + tolerance) and \
+                    seconds - old_seconds > MIN_REGRESSION_TIME:
+                regressions.append(f"{name}: {operation} {old_seconds * 1e3:.3f} ms -> {seconds * 1e3:.3f} ms")
+        if result['model_rss_mb'] is not None and old['model_rss_mb'] is not None and \
+                result['model_rss_mb'] > old['model_rss_mb'] * (1 + tolerance) + 1:
+            regressions.append(f"{name}: model memory {old['model_rss_mb']:.1f} MB -> {result['model_rss_mb']:.1f} MB")
+    return regressions
+
+
+def print_results(results: list[dict]):
+    columns = ['backend', 'agents', 'cards', 'worlds', 'relations', 'left'] + \
+              [operation.strip('_').replace('public_announcement', 'pa') for operation in OPERATIONS] + ['RSS (MB)']
+    widths = [10, 8, 7, 14, 14, 10] + [max(len(column), 10) + 2 for column in columns[6:]]
+    print(''.join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for result in results:
+        values = [result['backend'], result['agents'], result['cards'], result['worlds']]
+        if result.get('skipped'):
+            print(''.join(f"{value:>{width}}" for value, width in zip(values, widths)) + "   skipped, too many worlds")
+            continue
+        values += ['-' if result['relations'] is None else result['relations'],
+                   '-' if result['remaining_worlds'] is None else result['remaining_worlds']]
+        values += [f"{result['times'][operation] * 1e3:.3f}" for operation in OPERATIONS]
+        values += ['-' if result['model_rss_mb'] is None else f"{result['model_rss_mb']:.1f}"]
+        print(''.join(f"{value:>{width}}" for value, width in zip(values, widths)))
+    print("\nRelations and worlds left after all updates, times in ms (best of the repetitions, the initializer of the "
+          "symbolic model as init_worlds), RSS is the growth of the peak RSS of the process during the case")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the Kripke models')
+    parser.add_argument('--backends', '-k', nargs='+', choices=list(KRIPKE_BACKENDS.keys()),
+                        default=list(KRIPKE_BACKENDS.keys()), help="The Kripke model implementations.")
+    parser.add_argument('--agents', '-n', type=int, nargs='+', default=DEFAULT_AGENTS, help="Numbers of agents.")
+    parser.add_argument('--cards', '-m', type=int, nargs='+', default=DEFAULT_CARDS,
+                        help="Numbers of route cards per agent.")
+    parser.add_argument('--max_worlds', type=int, default=DEFAULT_MAX_WORLDS,
+                        help="Largest number of worlds of a case for backends that enumerate the worlds.")
+    parser.add_argument('--repeats', '-r', type=int, default=3, help="Number of repetitions of every case.")
+    parser.add_argument('--seed', '-s', type=int, default=0, help="Seed of the dealt route cards.")
+    parser.add_argument('--output', '-o', default=None, help="File to write the results to as JSON.")
+    parser.add_argument('--baseline', '-b', default=None,
+                        help="JSON file of an earlier run, exits with status 1 if a case regressed.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Relative growth of a time or of the memory that is flagged as a regression.")
+    args = parser.parse_args()
+
+    cases = []
+    results = []
+    for backend in args.backends:
+        for num_agents in args.agents:
+            for num_cards in args.cards:
+                case = {'backend': backend, 'agents': num_agents, 'cards': num_cards, 'repeats': args.repeats,
+                        'seed': args.seed}
+                num_worlds = count_worlds(num_agents * num_cards, num_agents)
+                if hasattr(KRIPKE_BACKENDS[backend], '_init_worlds') and num_worlds > args.max_worlds:
+                    results.append(dict(case, worlds=num_worlds, skipped=True))
+                else:
+                    cases.append(case)
+
+    # a new process per case (spawned, not forked) so the peak RSS of a case starts from a clean interpreter
+    with multiprocessing.get_context('spawn').Pool(processes=1, maxtasksperchild=1) as pool:
+        results.extend(pool.map(run_case, cases, chunksize=1))
+    order = {backend: idx for idx, backend in enumerate(args.backends)}
+    results.sort(key=lambda result: (order[result['backend']], result['agents'], result['cards']))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        print(f"\n{len(regressions)} regressions against {args.baseline}")
+        for regression in regressions:
+            print(f"* {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark of how the game scales with the size of the map, on random maps of growing size made by
+model.map.generator: the time to parse and load a map, to initialize a game, to recompute all shortest routes and to
+play a turn, and the peak memory of initializing and playing a game.
+
+Run from the src folder with:
+
+    python -m benchmarks.scaling
+"""
+
+# packages
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from model.events import EventLog
+from model.TicketToRide import TicketToRide, KRIPKE_BACKENDS, KRIPKE_BACKEND
+from model.map import MapData as map_module
+from model.map.Board import Board
+from model.map.MapData import parse_map, load_map
+from model.map.generator import generate_map, write_map
+
+DEFAULT_SIZES = [25, 50, 100, 200, 400]
+
+
+def time_call(function, repeats: int) -> (float, object):
+    """
+    :return: mean time of a call in seconds and the result of the last call
+    """
+    result = None
+    begin = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - begin) / repeats, result
+
+
+def make_game(board: Board, args) -> TicketToRide:
+    return TicketToRide(num_agents=args.num_agents, num_route_cards=args.num_route_cards, kripke_backend=args.kripke,
+                        seed=args.seed, board=board.copy(), events=EventLog())
+
+
+def play_turns(ttr: TicketToRide, max_turns: int) -> list[float]:
+    """
+    Play until the game ends or max_turns turns are played
+    :return: time of every turn in seconds
+    """
+    turn_times = []
+    while ttr.in_game and len(turn_times) < max_turns:
+        begin = time.perf_counter()
+        ttr.turn()
+        turn_times.append(time.perf_counter() - begin)
+    return turn_times
+
+
+def peak_memory(board: Board, args) -> int:
+    """
+    Peak memory in bytes allocated while initializing a game on the board and playing it
+    """
+    tracemalloc.start()
+    ttr = make_game(board, args)
+    play_turns(ttr, args.turns)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark_size(num_cities: int, args, directory: str) -> dict:
+    """
+    Generate a map with num_cities cities, write it to directory and measure it
+    """
+    map_data = generate_map(num_cities, seed=args.seed)
+    paths = write_map(map_data, directory)
+
+    parse_time, _ = time_call(lambda: parse_map(*paths), args.repeats)
+    map_module._loaded_maps.clear()
+    begin = time.perf_counter()
+    load_map(*paths, cache_dir=directory)  # parses the map and writes the compiled file
+    compile_time = time.perf_counter() - begin
+
+    def load_compiled():
+        map_module._loaded_maps.clear()
+        return load_map(*paths, cache_dir=directory)
+
+    load_time, map_data = time_call(load_compiled, args.repeats)
+    board_time, board = time_call(lambda: Board(map_data), args.repeats)
+    init_time, ttr = time_call(lambda: make_game(board, args), args.repeats)
+    routes_time, _ = time_call(ttr.game.recalculate_shortest_routes, args.repeats)
+
+    turn_times = play_turns(make_game(board, args), args.turns)
+    return {
+        'cities': len(map_data.city_names),
+        'connections': len(map_data.connection_lengths),
+        'route cards': len(map_data.route_card_scores),
+        'parse (ms)': parse_time * 1e3,
+        'compile (ms)': compile_time * 1e3,
+        'load (ms)': load_time * 1e3,
+        'board (ms)': board_time * 1e3,
+        'init (ms)': init_time * 1e3,
+        'routes (ms)': routes_time * 1e3,
+        'turns': len(turn_times),
+        'turn (ms)': np.mean(turn_times) * 1e3 if turn_times else float('nan'),
+        'max turn (ms)': max(turn_times) * 1e3 if turn_times else float('nan'),
+        'peak (MB)': peak_memory(board, args) / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the game on random maps of growing size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Numbers of cities of the maps.")
+    parser.add_argument('--num_agents', '-n', type=int, default=3, help="The number of agents.")
+    parser.add_argument('--num_route_cards', '-m', type=int, default=2, help="The number of route cards per agent.")
+    parser.add_argument('--kripke', '-k', choices=list(KRIPKE_BACKENDS.keys()), default=KRIPKE_BACKEND,
+                        help="The Kripke model implementation.")
+    parser.add_argument('--turns', '-t', type=int, default=20, help="Maximum number of turns played per map.")
+    parser.add_argument('--repeats', '-r', type=int, default=3, help="Number of repetitions of every timing.")
+    parser.add_argument('--seed', '-s', type=int, default=0, help="Seed of the maps and games.")
+    args = parser.parse_args()
+
+    print(f"{args.num_agents} agents, {args.num_route_cards} route cards per agent, {args.kripke} Kripke model, "
+          f"at most {args.turns} turns, {args.repeats} repetitions\n")
+
+    rows = []
+    for num_cities in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            rows.append(benchmark_size(num_cities, args, directory))
+
+    columns = list(rows[0].keys())
+    print(''.join(f"{column:>14}" for column in columns))
+    for row in rows:
+        print(''.join(f"{row[column]:>14}" if isinstance(row[column], int) else f"{row[column]:>14.3f}"
+                      for column in columns))
+
+
+if __name__ == "__main__":
+    main()
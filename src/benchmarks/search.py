@@ -0,0 +1,201 @@
+"""
+Micro-benchmark of the UCS search in search_alg.Graph against the original list-based implementation on the Europe
+board, for every route card of which both cities are on the board.
+
+Run from the src folder with:
+
+    python -m benchmarks.search
+"""
+
+# packages
+import argparse
+import os
+import time
+
+from model.map.Board import Board
+from model.search_alg.Graph import Graph
+from model.search_alg.Node import Node
+from model.config import *
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROUTE_CARDS_PATH = os.path.join(ROOT_DIR, TICKET_TO_RIDE_CONFIG['ROUTE_CARDS_PATH'])
+
+
+class ListGraph(Graph):
+    """
+        Original search of Graph, the methods below are copied verbatim from the first version: a sorted list as
+        priority queue and linear scans for node lookups and membership
+    """
+
+    def setup(self, start: str, target: str):
+        self.start = self.find_node(start)
+        self.target = self.find_node(target)
+        self.number_of_steps = 0
+        self.opened = []
+        self.closed = []
+        for node in self.nodes:
+            node.reset()
+
+    def find_node(self, node_name: str):
+        """
+            Return True if the node with the given value exist in the graph. Otherwise, it returns False
+        """
+        for node in self.nodes:
+            if node.name == node_name:
+                return node
+        return None
+
+    def calculate_distance(self, parent: Node, child: Node) -> int:
+        """
+          Calculate and return the distance from the start to child node. If the heuristic value has already calculated
+          and is smaller than the new value, the method return the old value. Otherwise, the method return the new value
+          and note the parent as the parent node of child
+        """
+        for neighbor in parent.neighbors:
+            if neighbor[0] == child:
+                distance = parent.heuristic_value + neighbor[1]
+                if distance < child.heuristic_value:
+                    child.parent = parent
+                    return distance
+
+                return child.heuristic_value
+
+    def insert_to_list(self, list_category: str, node: Node):
+        """
+          Insert a node in the proper list (opened or closed) according to list_category
+        """
+        if list_category == "open":
+            self.opened.append(node)
+        else:
+            self.closed.append(node)
+
+    def remove_from_opened(self) -> Node:
+        """
+          Remove the node with the smallest heuristic value from the opened list
+          Then add the removed node to the closed list
+        """
+        self.opened.sort()
+        node = self.opened.pop(0)
+        self.closed.append(node)
+        return node
+
+    def opened_is_empty(self) -> bool:
+        """
+          Check if the list opened is empty, so no solution found
+        """
+        return len(self.opened) == 0
+
+    def get_old_node(self, node_value: str):
+        """
+          Return the node with the given value from the opened list,
+          to compare its heuristic_value with a node with the same value
+        """
+        for node in self.opened:
+            if node.name == node_value:
+                return node
+        return None
+
+    def search(self):
+        """
+          Is the main algorithm. Search for a solution in the solution space of the problem
+          Stops if the opened list is empty, so no solution found or if it finds a solution.
+        """
+        # The heuristic value of the starting node is zero
+        self.start.heuristic_value = 0
+        # Add the starting point to opened list
+        self.opened.append(self.start)
+
+        while True:
+            self.number_of_steps += 1
+
+            if self.opened_is_empty():
+                # print(f"No route found for {self.start} to {self.target} after {self.number_of_steps} steps!!!")
+                return None
+
+            selected_node = self.remove_from_opened()
+            # check if the selected_node is the solution
+            if selected_node == self.target:
+                path = self.calculate_path(selected_node)
+                return path, self.number_of_steps
+
+            # extend the node
+            new_nodes = selected_node.extend_node()
+
+            # add the extended nodes in the list opened
+            if len(new_nodes) > 0:
+                for new_node in new_nodes:
+                    new_node.heuristic_value = self.calculate_distance(selected_node, new_node)
+                    if new_node not in self.closed and new_node not in self.opened:
+                        self.insert_to_list("open", new_node)
+                    elif new_node in self.opened and new_node.parent != selected_node:
+                        old_node = self.get_old_node(new_node.name)
+                        if new_node.heuristic_value < old_node.heuristic_value:
+                            new_node.parent = selected_node
+                            self.insert_to_list("open", new_node)
+
+
+def read_route_cards(board: Board) -> list[tuple[str, str]]:
+    """
+    Read all route cards and keep the ones of which both cities are on the board
+    """
+    route_cards = []
+    with open(ROUTE_CARDS_PATH, mode='r', encoding='utf-8') as f:
+        for line in f:
+            start, end = line.split()[0].split('-')
+            if board.get_city(start) is not None and board.get_city(end) is not None:
+                route_cards.append((start, end))
+    return route_cards
+
+
+def make_graph(graph_class, board: Board) -> Graph:
+    graph = graph_class()
+    for city_name in board.cities.keys():
+        graph.add_node(Node(city_name))
+    return graph
+
+
+def route_length(board: Board, path: list[str]) -> int:
+    return sum(board.get_connection(start, end).num_trains for start, end in zip(path, path[1:]))
+
+
+def time_searches(graph: Graph, board: Board, route_cards: list[tuple[str, str]], repeats: int) -> (float, list):
+    """
+    Time the shortest route queries of all route cards, including the setup of the graph as done by the game
+    :return: total time per repetition in seconds and the route lengths found
+    """
+    lengths = []
+    begin = time.perf_counter()
+    for _ in range(repeats):
+        lengths = []
+        for start, end in route_cards:
+            graph.setup(start, end)
+            for connection in board.connections:
+                graph.add_edge(connection.start_point.name, connection.end_point.name, connection.num_trains)
+            lengths.append(route_length(board, graph.get_shortest_route()))
+    return (time.perf_counter() - begin) / repeats, lengths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the UCS search on the Europe board')
+    parser.add_argument('--repeats', '-r', type=int, default=20, help="Number of repetitions over all route cards.")
+    args = parser.parse_args()
+
+    board = Board()
+    with open(ROUTE_CARDS_PATH, mode='r', encoding='utf-8') as f:
+        num_route_cards = sum(1 for line in f if line.strip())
+    route_cards = read_route_cards(board)
+    print(f"Route cards on the board: {len(route_cards)} of {num_route_cards}, {len(board.cities)} cities, "
+          f"{len(board.connections)} connections, {args.repeats} repetitions\n")
+
+    list_time, list_lengths = time_searches(make_graph(ListGraph, board), board, route_cards, args.repeats)
+    heap_time, heap_lengths = time_searches(make_graph(Graph, board), board, route_cards, args.repeats)
+    assert list_lengths == heap_lengths, "Searches found routes of different lengths"
+
+    print(f"{'search':<12}{'total (ms)':>12}{'per card (us)':>16}")
+    for name, total in (("list", list_time), ("heap", heap_time)):
+        print(f"{name:<12}{total * 1e3:>12.3f}{total / len(route_cards) * 1e6:>16.1f}")
+    print(f"\nSpeedup: {list_time / heap_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# packages
+import argparse
+import os
+
+from model.map.generator import generate_map, write_map
+
+DEFAULT_NUM_CITIES = 100
+DEFAULT_SEED = 0
+
+
+def main():
+    """
+        Main function to generate a random map and write it in the format of the data files
+    """
+    parser = make_parser()
+    args = parser.parse_args()
+
+    assert args.num_cities >= 2, "The number of cities must be at least 2. EXITING..."
+    for fraction in (args.gray, args.ferries, args.tunnels, args.doubles):
+        assert 0 <= fraction <= 1, "Fractions of connections must be in [0, 1]. EXITING..."
+    assert 1 <= args.min_score <= args.max_score, "The score range of route cards is empty. EXITING..."
+
+    map_data = generate_map(args.num_cities, num_connections=args.num_connections,
+                            num_route_cards=args.num_route_cards, gray_fraction=args.gray,
+                            ferry_fraction=args.ferries, tunnel_fraction=args.tunnels, double_fraction=args.doubles,
+                            route_card_scores_range=(args.min_score, args.max_score), seed=args.seed)
+    paths = write_map(map_data, args.output)
+
+    print(f"Generated {len(map_data.city_names)} cities, {len(map_data.connection_lengths)} connections and "
+          f"{len(map_data.route_card_scores)} route cards:")
+    for path in paths:
+        print(f"* {os.path.abspath(path)}")
+    print("Set CITY_FILE_PATH, CONNECTION_FILE_PATH and ROUTE_CARDS_PATH in the config to play on this map.")
+
+
+def make_parser():
+    """
+        Makes a parser for user input
+    """
+    parser = argparse.ArgumentParser(description='Generate a random Ticket to Ride map')
+    parser.add_argument("output", help="Directory to write cities.txt, train_connections.txt and route_cards.txt to.")
+    parser.add_argument("--num_cities", '-c', type=int, default=DEFAULT_NUM_CITIES, help="The number of cities.")
+    parser.add_argument("--num_connections", '-e', type=int, default=None,
+                        help="The number of connected city pairs, by default twice the number of cities.")
+    parser.add_argument("--num_route_cards", '-m', type=int, default=None,
+                        help="The number of route cards, by default twice the number of cities.")
+    parser.add_argument("--gray", type=float, default=0.25, help="Fraction of gray connections.")
+    parser.add_argument("--ferries", type=float, default=0.05, help="Fraction of ferries.")
+    parser.add_argument("--tunnels", type=float, default=0.1, help="Fraction of tunnels.")
+    parser.add_argument("--doubles", type=float, default=0.1, help="Fraction of double routes.")
+    parser.add_argument("--min_score", type=int, default=5, help="Minimum score of a route card.")
+    parser.add_argument("--max_score", type=int, default=21, help="Maximum score of a route card.")
+    parser.add_argument("--seed", '-s', type=int, default=DEFAULT_SEED, help="Seed of the map.")
+    return parser
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 # packages
 import argparse
 
-from model.TicketToRide import TicketToRide
+from model.TicketToRide import TicketToRide, KRIPKE_BACKENDS, KRIPKE_BACKEND, AGENT_TYPES
+from model.profiling import Profiler
 from Visualizer import Visualizer
 import random
 
@@ -9,6 +10,9 @@ import random
 
 NUM_AGENTS = 'n'
 NUM_ROUTE_CARDS = 'm'
+KRIPKE = 'k'
+AGENT_TYPES_ARG = 'a'
+PROFILE = 'p'
 ALLOWED_AGENTS = [2, 3, 4, 5]
 DEFAULT_NUM_AGENTS = 3
 DEFAULT_NUM_ROUTE_CARDS = 2
@@ -22,11 +26,19 @@ def main():
     arguments = parse_args(parser)
 
     ticket_to_ride_game = TicketToRide(num_agents=arguments[NUM_AGENTS],
-                                       num_route_cards=arguments[NUM_ROUTE_CARDS])
+                                       num_route_cards=arguments[NUM_ROUTE_CARDS],
+                                       kripke_backend=arguments[KRIPKE],
+                                       agent_types=arguments[AGENT_TYPES_ARG],
+                                       profiler=Profiler(enabled=bool(arguments[PROFILE])))
 
     visualizer = Visualizer(ticket_to_ride_game)
     visualizer.run()
 
+    if arguments[PROFILE]:
+        ticket_to_ride_game.profiler.write_json(arguments[PROFILE] + '.json')
+        ticket_to_ride_game.profiler.write_folded(arguments[PROFILE] + '.folded')
+        print(ticket_to_ride_game.profiler.summary())
+
 
 def parse_args(parser) -> dict:
     """
@@ -57,8 +69,21 @@ def parse_args(parser) -> dict:
               f"USING DEFAULT = {DEFAULT_NUM_ROUTE_CARDS}.")
         num_route_cards = DEFAULT_NUM_ROUTE_CARDS
 
+    kripke_backend = args.kripke
+    if kripke_backend not in KRIPKE_BACKENDS:
+        print(f"INVALID KRIPKE BACKEND. CHOOSE IN {list(KRIPKE_BACKENDS.keys())}. USING DEFAULT = {KRIPKE_BACKEND}.")
+        kripke_backend = KRIPKE_BACKEND
+
+    agent_types = args.agent_types.split(',') if args.agent_types else []
+    if any(agent_type not in AGENT_TYPES for agent_type in agent_types):
+        print(f"INVALID AGENT TYPE. CHOOSE IN {list(AGENT_TYPES.keys())}. USING ONLY GREEDY AGENTS.")
+        agent_types = []
+
     return_dict = {NUM_AGENTS: num_agents,
-                   NUM_ROUTE_CARDS: num_route_cards}
+                   NUM_ROUTE_CARDS: num_route_cards,
+                   KRIPKE: kripke_backend,
+                   AGENT_TYPES_ARG: agent_types,
+                   PROFILE: args.profile}
     print()
     return return_dict
 
@@ -72,6 +97,15 @@ def make_parser():
                         default=DEFAULT_NUM_AGENTS)
     parser.add_argument(f"--num_route_cards", '-m', help=f"The number of route cards per agent.",
                         default=DEFAULT_NUM_ROUTE_CARDS)
+    parser.add_argument(f"--kripke", '-k', help=f"The Kripke model implementation. "
+                                                f"Options={{{','.join(KRIPKE_BACKENDS.keys())}}}.",
+                        default=KRIPKE_BACKEND)
+    parser.add_argument(f"--agent_types", '-a', help=f"Comma separated type per agent, e.g. mcts,greedy,greedy. "
+                                                     f"Options={{{','.join(AGENT_TYPES.keys())}}}.",
+                        default=None)
+    parser.add_argument(f"--profile", '-p', help=f"Time the phases of the game and the drawing and write them to "
+                                                 f"PROFILE.json and PROFILE.folded when the window is closed.",
+                        default=None)
     return parser
 
 
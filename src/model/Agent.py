@@ -6,7 +6,8 @@ Object player that holds all information necessary for an agent to play the game
 from .Game import Game
 from .RouteCard import RouteCard
 from .map.Connection import Connection, FerryConnection
-from .Deck import TRAIN_COLOURS
+from .Deck import CARD_COLOURS, CARD_CODES
+from .events import ClaimEvent, BlockEvent, DrawEvent, TunnelEvent, RouteFinishedEvent
 from .config import *
 
 import numpy as np
@@ -17,6 +18,13 @@ JOKER_COLOUR = DECK_CONFIG['JOKER_COLOUR']
 NR_CARDS_TO_DRAW = AGENT_CONFIG['NR_CARDS_TO_DRAW']
 GRAY_CONNECTION = BOARD_CONFIG['GRAY_COLOUR']
 TRAIN_POINTS = BOARD_CONFIG['TRAIN_POINTS']
+TUNNEL_CARDS = BOARD_CONFIG['TUNNEL_CARDS']
+JOKER_CODE = CARD_CODES[JOKER_COLOUR]  # train colours come first in CARD_COLOURS, the joker last
+
+# Actions, the first element of an action tuple
+CLAIM = 'claim'  # (CLAIM, connection index)
+BLOCK = 'block'  # (BLOCK, id of the blocked agent, route card, connection index)
+DRAW = 'draw'  # (DRAW,)
 
 
 class Agent(object):
@@ -31,10 +39,11 @@ class Agent(object):
         self.agent_id = agent_id
         self.nr_of_trains = nr_of_trains
         self.game = game
-        self.hand = []
+        self.hand = np.zeros(len(CARD_COLOURS), dtype=np.int64)  # number of train cards per colour in CARD_COLOURS
         self.own_route_cards = []
         self.can_draw_card = True
         self.last_move = ''
+        self.blocks = True  # False to never block, e.g. in rollouts where the known route cards are not reliable
 
     def get_route_cards_str(self):
         route_cards = []
@@ -62,11 +71,14 @@ class Agent(object):
         :return: The connection an agent should claim
         """
         connection_value = [0] * len(claimable_connections)
+        positions = {}  # connection id -> first position in claimable_connections
+        for position, connection in enumerate(claimable_connections):
+            positions.setdefault(connection.connection_id, position)
 
         for route_card in self.own_route_cards:
             for connection in route_card.shortest_routes[self.agent_id]:
-                if connection in claimable_connections:
-                    index_connection = claimable_connections.index(connection)
+                index_connection = positions.get(connection.connection_id)
+                if index_connection is not None:
                     connection_value[index_connection] = max(route_card.score, connection_value[index_connection])
         return claimable_connections[np.argmax(connection_value)]
 
@@ -76,7 +88,7 @@ class Agent(object):
         and which states this agent considers.
         """
         print(f"\n------\nProfile agent {self.agent_id}:")
-        print(f"* Owned train cards: {self.hand}")
+        print(f"* Owned train cards: {dict(zip(CARD_COLOURS, self.hand.tolist()))}")
         print(f"* Number of trains: {self.nr_of_trains}")
         print(f"* Owned connections:")
         for connection in self.game.board.connections:
@@ -123,11 +135,13 @@ class Agent(object):
         possible_blocks = {}
         for agent in self.game.agent_list:
             if not agent.agent_id == self.agent_id:
-                known_routes_str = self.game.model.get_known_route_cards(self.agent_id, agent.agent_id)
+                with self.game.profiler.phase('kripke.get_known_route_cards'):
+                    known_routes_str = self.game.model.get_known_route_cards(self.agent_id, agent.agent_id)
                 for known_route_str in known_routes_str:
                     blockable_connections = self.game.route_cards[known_route_str].shortest_routes[agent.agent_id]
                     for connection in blockable_connections:
-                        if connection.owner is None and self.enough_cards_to_claim_train_card(connection):
+                        if self.game.is_claimable(self.agent_id, connection) and \
+                                self.enough_cards_to_claim_train_card(connection):
                             if agent in possible_blocks.keys():
                                 possible_blocks[agent.agent_id].extend((known_route_str, connection))
                             else:
@@ -140,10 +154,12 @@ class Agent(object):
         Function that blocks a connection and does public announcement of the connection and owner
         :param agent_id_blocked: Id of agent of which a connection will blocked
         :param block_tuple: Tuple containing route card and a connection
+        :return: True if the connection is claimed, see claim_connection
         """
         route_card, connection = block_tuple
-        self.game.model.public_announcement_route_card(agent_id_blocked, {route_card})
-        self.claim_connection(connection, 'block')
+        with self.game.profiler.phase('kripke.public_announcement_route_card'):
+            self.game.model.public_announcement_route_card(agent_id_blocked, {route_card})
+        return self.claim_connection(connection, 'block')
 
     def draw_card(self):
         """
@@ -155,7 +171,7 @@ class Agent(object):
 
         if JOKER_COLOUR in self.game.deck.open_cards:
             self.game.deck.remove_open_card(JOKER_COLOUR)
-            self.hand.append(JOKER_COLOUR)
+            self.add_train_card(JOKER_COLOUR)
             return
 
         for idx in range(NR_CARDS_TO_DRAW):
@@ -164,7 +180,7 @@ class Agent(object):
             for colour in desired_colours:  # NO JOKER IN DESIRED COLOURS!!!
                 if colour in self.game.deck.open_cards:
                     self.game.deck.remove_open_card(colour)
-                    self.hand.append(colour)
+                    self.add_train_card(colour)
                     card_drawn = True
                     if idx != NR_CARDS_TO_DRAW - 1:  # One less calculation of the desired colours
                         desired_colours = self.get_desired_colours()
@@ -175,7 +191,7 @@ class Agent(object):
                 if drawn_closed_card is None:
                     self.can_draw_card = False
                 else:
-                    self.hand.append(drawn_closed_card)
+                    self.add_train_card(drawn_closed_card)
 
     def get_desired_colours(self) -> list:
         """
@@ -185,7 +201,7 @@ class Agent(object):
         desired_cards_count = {}
         for route_card in self.own_route_cards:
             for connection in route_card.shortest_routes[self.agent_id]:
-                needed_cards = connection.num_trains - self.hand.count(connection.color)
+                needed_cards = connection.num_trains - self.count_train_cards(connection.color)
                 if connection.color in desired_cards_count.keys():
                     desired_cards_count[connection.color] = min(desired_cards_count[connection.color], needed_cards)
                 else:
@@ -203,7 +219,14 @@ class Agent(object):
         """
         Give an agent a card of a colour 'colour'
         """
-        self.hand.append(colour)
+        self.hand[CARD_CODES[colour]] += 1
+
+    def count_train_cards(self, colour: str) -> int:
+        """
+        Number of cards of a colour in the hand, 0 for colours that are no card (gray)
+        """
+        code = CARD_CODES.get(colour)
+        return 0 if code is None else int(self.hand[code])
 
     def add_route_card(self, route_card: RouteCard):
         """
@@ -215,105 +238,208 @@ class Agent(object):
         """
         Returns True if agent has sufficient hand to claim connection, else returns False
         """
+        jokers = int(self.hand[JOKER_CODE])
         if connection.color == GRAY_CONNECTION:
-            for color in TRAIN_COLOURS:
-                enough_train_cards = connection.num_trains <= self.hand.count(color) + self.hand.count(JOKER_COLOUR)
-                if isinstance(connection, FerryConnection):
-                    enough_jokers = connection.num_jokers <= self.hand.count(JOKER_COLOUR)
-                    enough_train_cards = connection.num_trains <= self.hand.count(color) + self.hand.count(JOKER_COLOUR)
-                    enough_train_cards = enough_train_cards and enough_jokers
-                if enough_train_cards:
-                    return True
-        return connection.num_trains <= self.hand.count(connection.color) + self.hand.count(JOKER_COLOUR)
+            enough_jokers = not isinstance(connection, FerryConnection) or connection.num_jokers <= jokers
+            if enough_jokers and connection.num_trains <= int(self.hand[:JOKER_CODE].max()) + jokers:
+                return True
+        return connection.num_trains <= self.count_train_cards(connection.color) + jokers
+
+    def claimable_connections_mask(self, connection_indices: np.ndarray) -> np.ndarray:
+        """
+        Vectorized enough_cards_to_claim_train_card for many connections at once: the colour count of every connection
+        is looked up in the hand, the largest count of any train colour for gray connections
+        :param connection_indices: Indices of the connections in the connections of the board
+        :return: Boolean array, True where the hand is sufficient, the agent has enough trains left and is allowed to
+        claim the connection (see Game.is_claimable)
+        """
+        colours = self.game.board.connection_colours[connection_indices]
+        trains = self.game.board.connection_lengths[connection_indices]
+        jokers = self.hand[JOKER_CODE]
+        colour_counts = np.where(colours >= 0, self.hand[colours], self.hand[:JOKER_CODE].max())
+        enough_jokers = self.game.board.connection_jokers[connection_indices] <= jokers
+        enough_cards = ((trains <= colour_counts + jokers) & enough_jokers) | (trains <= jokers)
+        allowed = self.game.edge_weights[self.game.agent_index[self.agent_id], connection_indices] < np.inf
+        return enough_cards & (trains <= self.nr_of_trains) & allowed
 
     def check_claim_connection(self) -> list:
         """
         If it can claim, mark connection as claimable
         :return: True if connection is claimed else False
         """
-        claimable_connections = []
-        for route_card in self.own_route_cards:
-            for connection in route_card.shortest_routes[self.agent_id]:
-                if connection.owner is None and self.enough_cards_to_claim_train_card(connection) \
-                        and self.nr_of_trains >= connection.num_trains:
-                    claimable_connections.append(connection)
+        candidates = [connection for route_card in self.own_route_cards
+                      for connection in route_card.shortest_routes[self.agent_id] if connection.owner is None]
+        if not candidates:
+            return []
 
-        return claimable_connections
+        with self.game.profiler.phase('claimable_connections_mask'):
+            indices = np.fromiter((connection.connection_id for connection in candidates), dtype=np.int64,
+                                  count=len(candidates))
+            claimable = self.claimable_connections_mask(indices)
+        return [connection for connection, is_claimable in zip(candidates, claimable.tolist()) if is_claimable]
 
-    def claim_connection(self, connection: Connection, claim_type='claim'):
+    def claim_connection(self, connection: Connection, claim_type='claim') -> bool:
         """
-        Agent claims a connection by putting trains on a connection
+        Agent claims a connection by putting trains on a connection. For a tunnel TUNNEL_CARDS cards of the closed deck
+        are revealed first, every one of the colour that is played (or a joker) costs an extra card. If the agent
+        cannot pay the extra cards, it keeps its cards and the connection stays free.
+        :return: True if the connection is claimed, False if the agent could not pay for a tunnel
         """
-        print(f"-- Agent {self.agent_id} {claim_type}s connection {connection.end_point.name}-{connection.start_point.name}"
-              f" with color {connection.color} and costs {connection.num_trains}.")
-
-        connection.set_owner(self.agent_id)
         connection_color = connection.color
 
         if connection_color == GRAY_CONNECTION:
-            max_color_count = (TRAIN_COLOURS[0], self.hand.count(TRAIN_COLOURS[0]))
-            for color in TRAIN_COLOURS[1:]:
-                _, count = max_color_count
-                if count < self.hand.count(color):
-                    max_color_count = (color, self.hand.count(color))
-            connection_color, _ = max_color_count
+            # first train colour with the most cards
+            connection_color = CARD_COLOURS[int(np.argmax(self.hand[:JOKER_CODE]))]
+        color_code = CARD_CODES[connection_color]
 
         if isinstance(connection, FerryConnection):
-            color_count = min(self.hand.count(connection_color), connection.num_trains - connection.num_jokers)
+            color_count = min(int(self.hand[color_code]), connection.num_trains - connection.num_jokers)
         else:
-            color_count = min(self.hand.count(connection_color), connection.num_trains)
+            color_count = min(int(self.hand[color_code]), connection.num_trains)
         joker_count = connection.num_trains - color_count
 
+        if connection.is_tunnel and TUNNEL_CARDS > 0:
+            revealed_cards = self.game.deck.reveal_cards(TUNNEL_CARDS)
+            self.game.deck.play_train_cards(revealed_cards)
+            # if only jokers are played, only revealed jokers cost extra
+            extra_count = sum(card == JOKER_COLOUR or (card == connection_color and color_count > 0)
+                              for card in revealed_cards)
+            extra_color_count = min(extra_count, int(self.hand[color_code]) - color_count) if color_count > 0 else 0
+            extra_joker_count = extra_count - extra_color_count
+            can_pay = extra_joker_count <= int(self.hand[JOKER_CODE]) - joker_count
+            if self.game.events.enabled:
+                self.game.events.emit(TunnelEvent(self.agent_id, connection.connection_name, revealed_cards,
+                                                  extra_count, can_pay))
+            if not can_pay:
+                return False
+            color_count += extra_color_count
+            joker_count += extra_joker_count
+
+        if self.game.events.enabled:
+            self.game.events.emit(ClaimEvent(self.agent_id, connection.connection_name, connection.color,
+                                             connection.num_trains, claim_type))
+        connection.set_owner(self.agent_id)
+
         color_list = [connection_color] * color_count + [JOKER_COLOUR] * joker_count
         self.game.deck.play_train_cards(color_list)
         self.place_trains(connection.num_trains)
 
-        for color in color_list:
-            self.hand.remove(color)
+        self.hand[color_code] -= color_count
+        self.hand[JOKER_CODE] -= joker_count
 
         if claim_type == 'claim':
             self.game.announce_claimed_connection(self.agent_id, connection)
 
-        self.game.recalculate_shortest_routes()
+        self.game.update_shortest_routes(connection)
 
         for route_card in self.own_route_cards:
             if not route_card.is_finished and self.check_route_finished(route_card):
                 self.score += route_card.score  # Add score from finished route card
-                print(f"\n### Agent {self.agent_id} finished route card {route_card.route_name} with "
-                      f"{route_card.score} points! ###\n")
-                self.game.model.public_announcement_route_card(agent_id=self.agent_id,
-                                                               route_card={route_card.route_name})
+                if self.game.events.enabled:
+                    self.game.events.emit(RouteFinishedEvent(self.agent_id, route_card.route_name, route_card.score))
+                with self.game.profiler.phase('kripke.public_announcement_route_card'):
+                    self.game.model.public_announcement_route_card(agent_id=self.agent_id,
+                                                                   route_card={route_card.route_name})
                 route_card.set_finished()
+        return True
 
     def choose_action(self):
         """
         By default, every agent chooses to claim a connection advancing its own route cards. However, when it knows a
         route card of another agent (and this has been publicly announced) they will choose to block said route.
         """
-        self.can_draw_card = True
-
         # Greedy implementation
-        claimable_connections = self.check_claim_connection()
+        with self.game.profiler.phase('check_claim_connection'):
+            claimable_connections = self.check_claim_connection()
         if claimable_connections:
-            print(f"- Agent {self.agent_id} claims connection.")
             claimed_connection = self.select_connection_to_claim(claimable_connections)
-            self.claim_connection(claimed_connection, 'claim')
-            self.last_move = f'claims {claimed_connection.connection_name}'
+            self.perform_action((CLAIM, claimed_connection.connection_id))
         else:
-            claimable_connections = self.check_block_connection()
+            with self.game.profiler.phase('check_block_connection'):
+                claimable_connections = self.check_block_connection() if self.blocks else {}
             if claimable_connections:
-
-                print(f"- Agent {self.agent_id} blocks connection.")
                 agent_to_block = np.random.choice(list(claimable_connections.keys()))
                 block_tuple_idx = np.random.choice(range(len(claimable_connections[agent_to_block])))
-                block_tuple = claimable_connections[agent_to_block][block_tuple_idx]
-                self.block_connection(agent_to_block, block_tuple)
-                self.last_move = f'blocks agent {agent_to_block}: {block_tuple[1].connection_name}'
+                route_card, connection = claimable_connections[agent_to_block][block_tuple_idx]
+                self.perform_action((BLOCK, int(agent_to_block), route_card, connection.connection_id))
+            else:
+                self.perform_action((DRAW,))
+
+    def get_possible_actions(self) -> list[tuple]:
+        """
+        All actions the agent can choose from: claiming a connection on the shortest route of one of its route cards,
+        blocking a connection of a route card it knows another agent has, or drawing cards
+        :return: List of action tuples, see perform_action
+        """
+        actions = []
+        for connection in self.check_claim_connection():
+            action = (CLAIM, connection.connection_id)
+            if action not in actions:
+                actions.append(action)
+
+        if self.blocks:
+            for agent_id, block_tuples in self.check_block_connection().items():
+                for route_card, connection in block_tuples:
+                    action = (BLOCK, agent_id, route_card, connection.connection_id)
+                    if action not in actions:
+                        actions.append(action)
+
+        actions.append((DRAW,))
+        return actions
+
+    def perform_action(self, action: tuple):
+        """
+        Perform one action, connections are referred to by their index in the connections of the board
+        :param action: (CLAIM, connection index), (BLOCK, id of the blocked agent, route card, connection index) or
+        (DRAW,)
+        """
+        self.can_draw_card = True
+
+        if action[0] == CLAIM:
+            connection = self.game.board.connections[action[1]]
+            if self.claim_connection(connection, 'claim'):
+                self.last_move = f'claims {connection.connection_name}'
             else:
-                print(f"- Agent {self.agent_id} draws card.")
-                self.draw_card()
-                self.last_move = f'draws card'
-        print()
+                self.last_move = f'fails to claim tunnel {connection.connection_name}'
+        elif action[0] == BLOCK:
+            _, agent_to_block, route_card, connection_idx = action
+            connection = self.game.board.connections[connection_idx]
+            if self.game.events.enabled:
+                self.game.events.emit(BlockEvent(self.agent_id, agent_to_block, connection.connection_name))
+            if self.block_connection(agent_to_block, (route_card, connection)):
+                self.last_move = f'blocks agent {agent_to_block}: {connection.connection_name}'
+            else:
+                self.last_move = f'fails to block agent {agent_to_block}: {connection.connection_name}'
+        else:
+            if self.game.events.enabled:
+                self.game.events.emit(DrawEvent(self.agent_id))
+            self.draw_card()
+            self.last_move = f'draws card'
+
+    def close(self):
+        """
+        Release what the agent holds on to once the game is over, e.g. worker processes
+        """
+
+    def snapshot(self) -> tuple:
+        """
+        Immutable copy of the state of the agent that changes during the game or a rollout
+        :return: Tuple of score, number of trains, hand counts, whether the agent could draw a card, the last move, the
+        names of the own route cards and whether the agent blocks
+        """
+        hand_counts = self.hand.copy()
+        hand_counts.flags.writeable = False
+        route_names = tuple(route_card.route_name for route_card in self.own_route_cards)
+        return self.score, self.nr_of_trains, hand_counts, self.can_draw_card, self.last_move, route_names, self.blocks
+
+    def restore(self, snapshot: tuple):
+        """
+        Set the state of the agent to a snapshot made by snapshot()
+        """
+        self.score, self.nr_of_trains, hand_counts, self.can_draw_card, self.last_move, route_names, self.blocks = \
+            snapshot
+        self.hand = hand_counts.copy()
+        self.own_route_cards = [self.game.route_cards[route_name] for route_name in route_names]
 
     def __str__(self):
         return f"Agent {self.agent_id}. "
@@ -2,6 +2,7 @@
 This class represents the deck of playing cards with coloured wagons and locomotives
 """
 import random
+import numpy as np
 from .config import *
 
 # Config in Deck Config
@@ -10,6 +11,24 @@ NR_JOKERS = DECK_CONFIG['NR_JOKERS']
 NR_OPEN_CARDS = DECK_CONFIG['NR_OPEN_CARDS']
 TRAIN_COLOURS = DECK_CONFIG['TRAIN_COLOURS']
 JOKER_COLOUR = DECK_CONFIG['JOKER_COLOUR']
+CARD_COLOURS = TRAIN_COLOURS + [JOKER_COLOUR]
+CARD_CODES = {colour: code for code, colour in enumerate(CARD_COLOURS)}
+
+
+def encode_cards(cards: list[str]) -> np.ndarray:
+    """
+    Encode a list of train cards as a read-only array of indices in CARD_COLOURS, -1 for a missing (None) card
+    """
+    codes = np.array([CARD_CODES.get(card, -1) for card in cards], dtype=np.int8)
+    codes.flags.writeable = False
+    return codes
+
+
+def decode_cards(codes: np.ndarray) -> list:
+    """
+    Decode an array made by encode_cards back to a list of train cards
+    """
+    return [CARD_COLOURS[code] if code >= 0 else None for code in codes.tolist()]
 
 
 class Deck(object):
@@ -50,19 +69,44 @@ class Deck(object):
         """
         if not self.closed_cards and self.used_cards:  # No closed cards
             self.shuffle_used_cards()
-        elif not self.closed_cards:
+        if not self.closed_cards:  # refilling the open cards may have used all shuffled cards
             if self.open_cards:
                 return self.open_cards.pop()
             return None
 
         return self.closed_cards.pop()
 
+    def reveal_cards(self, nr_cards: int) -> list[str]:
+        """
+        Take cards from the top of the closed deck to show them, e.g. when claiming a tunnel. The open cards are not
+        used, so fewer cards are returned if the closed and used cards run out. Put the cards on the used cards stack
+        with play_train_cards afterwards.
+        """
+        if len(self.closed_cards) < nr_cards and self.used_cards:
+            self.shuffle_used_cards()
+        return [self.closed_cards.pop() for _ in range(min(nr_cards, len(self.closed_cards)))]
+
     def play_train_cards(self, train_cards: list[str]):
         """
         Add the played train cards to the used cards stack
         """
         self.used_cards.extend(train_cards)
 
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Immutable copy of the closed, open and used cards, in order
+        """
+        return encode_cards(self.closed_cards), encode_cards(self.open_cards), encode_cards(self.used_cards)
+
+    def restore(self, snapshot: tuple[np.ndarray, np.ndarray, np.ndarray]):
+        """
+        Set the cards to the state of a snapshot made by snapshot()
+        """
+        closed_cards, open_cards, used_cards = snapshot
+        self.closed_cards = decode_cards(closed_cards)
+        self.open_cards = decode_cards(open_cards)
+        self.used_cards = decode_cards(used_cards)
+
     def shuffle_used_cards(self):
         """
         Gets called if closed card deck is empty and shuffles the played cards
@@ -70,5 +114,6 @@ class Deck(object):
         self.closed_cards.extend(self.used_cards)
         random.shuffle(self.closed_cards)
         self.used_cards = []
-        while len(self.open_cards) < NR_OPEN_CARDS:  # add to open cards if less than NR_OPEN_CARDS
+        # add to open cards if less than NR_OPEN_CARDS, as long as there are cards left
+        while len(self.open_cards) < NR_OPEN_CARDS and self.closed_cards:
             self.open_cards.append(self.remove_closed_card())
@@ -7,105 +7,347 @@ from .Deck import Deck
 from .RouteCard import RouteCard
 from .ttr_kripke.TtRKripke import TtRKripke
 from .map.Connection import Connection
-from .search_alg.Graph import Node, Graph
+from .search_alg.ShortestPaths import AllPairsShortestPaths
+from .search_alg.CSRGraph import CSRGraph
+from .events import EventLog
+from .profiling import Profiler
+from .config import *
+
+import numpy as np
+
+# Params in Board Config
+MIN_AGENTS_DOUBLE_ROUTES = BOARD_CONFIG['MIN_AGENTS_DOUBLE_ROUTES']
 
 
 class Game(object):
 
-    def __init__(self, board: Board, route_cards: dict[str: RouteCard], agent_list: list, deck: Deck, model: TtRKripke):
+    def __init__(self, board: Board, route_cards: dict[str: RouteCard], agent_list: list, deck: Deck, model: TtRKripke,
+                 events: EventLog = None, profiler: Profiler = None):
         """
         Initializer of game object
         :param board: Board object of the game
         :param route_cards: Different route cards
         :param agent_list: List of agents
+        :param events: Event log of the game, disabled if None
+        :param profiler: Profiler of the game, disabled if None
         """
         self.route_cards = route_cards
         self.board = board
         self.agent_list = agent_list  # List with agent objects, not defined because of circular import
         self.deck = deck
         self.model = model
-        self.graph = None
+        self.events = events if events is not None else EventLog()
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.shortest_paths = {}  # agent_id -> AllPairsShortestPaths for the current board state
+        self.stale_agents = set([])  # agents whose shortest paths still contain connections claimed by others
+        self.recomputed_routes = 0
+        self.skipped_routes = 0
+
+        self.agent_index = {agent.agent_id: idx for idx, agent in enumerate(self.agent_list)}
+        # with few agents a claimed connection of a double route closes the other connection for everybody
+        self.single_double_routes = len(self.agent_list) < MIN_AGENTS_DOUBLE_ROUTES
+        self.edge_weights = np.zeros((len(self.agent_list), len(self.board.connections)))
+        self.csr_graph = None
 
         self._init_graph()
 
+    def _init_graph(self):
+        """
+        Initialize the CSR graph for path planning once from the adjacency list of the board, together with the
+        number of trains every agent needs per connection. The weights are kept up to date through the owner
+        listeners of the connections, so the graph never has to be rebuilt.
+        """
+        adjacency = []
+        for city_id, city_name in enumerate(self.board.city_names):
+            city_adjacency = []
+            for connection in self.board.adjacency_list[city_name]:
+                city1, city2 = connection.start_point.city_id, connection.end_point.city_id
+                city_adjacency.append((city2 if city1 == city_id else city1, connection.connection_id))
+            adjacency.append(city_adjacency)
+        self.csr_graph = CSRGraph(adjacency)
+
+        for connection in self.board.connections:
+            self.update_edge_weights(connection)
+            connection.add_owner_listener(self.update_edge_weights)
+
+    def update_edge_weights(self, connection: Connection):
+        """
+        Update the number of trains every agent needs for a connection and the connections parallel to it after its
+        owner changed: nothing for the owner, np.inf (cannot be used) for all other agents. An agent cannot claim both
+        connections of a double route, and if single_double_routes is set nobody can claim the second one.
+        :param connection: Connection of which the owner changed
+        """
+        group = self.board.connection_groups[connection.connection_id]
+        owners = [self.board.connections[idx].owner for idx in group]
+        for idx, owner in zip(group, owners):
+            if owner is None:
+                self.edge_weights[:, idx] = self.board.connections[idx].num_trains
+                for parallel_owner in owners:
+                    if parallel_owner is None:
+                        continue
+                    if self.single_double_routes:
+                        self.edge_weights[:, idx] = np.inf
+                    elif parallel_owner in self.agent_index:
+                        self.edge_weights[self.agent_index[parallel_owner], idx] = np.inf
+            else:
+                self.edge_weights[:, idx] = np.inf
+                if owner in self.agent_index:
+                    self.edge_weights[self.agent_index[owner], idx] = 0
+
+    def is_claimable(self, agent_id: int, connection: Connection) -> bool:
+        """
+        True if the connection has no owner and the agent is allowed to claim it
+        """
+        return connection.owner is None and \
+            self.edge_weights[self.agent_index[agent_id], connection.connection_id] < np.inf
+
     def init_shortest_routes(self):
         """
-        Initial calculation of the shortest route for each route card for each agent
+        Initial calculation of the shortest route for each route card for each agent. Nobody owns a connection yet, so
+        the routes of the first agent are used for everybody and only the table of that agent is built.
         """
+        self.get_shortest_paths(self.agent_list[0].agent_id)
         for route_card in self.route_cards.values():
             from_city = route_card.start.name
             target_city = route_card.end.name
-            shortest_route = self.calculate_shortest_route(from_city, target_city, 0)
+            shortest_route = self.calculate_shortest_route(from_city, target_city, self.agent_list[0].agent_id)
             for agent in self.agent_list:
                 route_card.add_shortest_route(agent.agent_id, shortest_route=shortest_route)
 
     def calculate_shortest_route(self, from_city: str, target_city: str, agent_id: int):
         """
-        Function to calculate the shortest route between two cities for an agent
+        Function to calculate the shortest route between two cities for an agent. The route is looked up in the
+        all-pairs table of the agent if that is up to date, otherwise a single search on the CSR graph is done. Between
+        two cities of the table path the cheapest connection for the agent is taken.
         :param from_city: Start city of route card
         :param target_city: End city of route card
         :param agent_id: Agent for which the route is calculated
         :return: List with the shortest route
         """
-        self.graph.setup(from_city, target_city)
-        self.update_graph_for_agent(agent_id)
-        list_of_city_names = self.graph.get_shortest_route()
-        if not list_of_city_names:
-            return []
+        start = self.board.cities[from_city].city_id
+        target = self.board.cities[target_city].city_id
+        if agent_id not in self.shortest_paths or agent_id in self.stale_agents:
+            with self.profiler.phase('csr_graph.search'):
+                edge_path = self.csr_graph.search(start, target, self.edge_weights[self.agent_index[agent_id]])
+            return [self.board.connections[idx] for idx in edge_path]
 
+        path = self.shortest_paths[agent_id].get_path(start, target)
+        if len(path) < 2:
+            return []
+        edge_weights = self.edge_weights[self.agent_index[agent_id]]
         shortest_route_list = []
-        start = list_of_city_names[0]
-        for end in list_of_city_names[1:]:
-            shortest_route_list.append(self.board.get_connection(start, end))
-            start = end
-
+        for idx in self.board.connection_matrix[path[:-1], path[1:]].tolist():
+            group = self.board.connection_groups[idx]
+            if len(group) > 1:
+                idx = min(group, key=edge_weights.__getitem__)
+            shortest_route_list.append(self.board.connections[idx])
         return shortest_route_list
 
-    def _init_graph(self):
+    def get_weights_for_agent(self, agent_id: int) -> np.ndarray:
         """
-        Initialize graph for path planning
+        Function that creates the weight matrix between cities for an agent based on the claimed connections
+        :param agent_id: Agent for which the weights are determined
+        :return: Symmetric matrix with the number of trains needed per connection, np.inf if there is none
         """
-        self.graph = Graph()
-
-        # Add vertices
-        for city_name in self.board.cities.keys():
-            self.graph.add_node(Node(city_name))
+        edge_weights = self.edge_weights[self.agent_index[agent_id]]
+        city1, city2 = self.board.connection_cities[:, 0], self.board.connection_cities[:, 1]
 
-        # Add edges
-        for connection in self.board.connections:
-            city1 = connection.start_point.name
-            city2 = connection.end_point.name
-            nr_trains = connection.num_trains
-
-            self.graph.add_edge(city1, city2, nr_trains)
+        num_cities = len(self.board.city_names)
+        weights = np.full((num_cities, num_cities), np.inf)
+        np.minimum.at(weights, (city1, city2), edge_weights)
+        np.minimum.at(weights, (city2, city1), edge_weights)
+        return weights
 
-    def update_graph_for_agent(self, agent_id: int):
+    def update_shortest_paths_for_agent(self, agent_id: int):
         """
-        Function that updates the graph for an agent based on the claimed connections
-        :param agent_id: Agent for which the graph has to be updated
+        Compute the all-pairs shortest paths of an agent for the current board state
+        :param agent_id: Agent for which the shortest paths are computed
         """
-        for connection in self.board.connections:
-            city1 = connection.start_point.name
-            city2 = connection.end_point.name
-            if connection.owner == agent_id:
-                nr_trains = 0
-            elif connection.owner is None:
-                nr_trains = connection.num_trains
-            else:  # connection has owner unequal to current agent
-                continue
+        with self.profiler.phase('update_shortest_paths_for_agent'):
+            shortest_paths = AllPairsShortestPaths(len(self.board.city_names))
+            shortest_paths.compute(self.get_weights_for_agent(agent_id))
+        self.shortest_paths[agent_id] = shortest_paths
+        self.stale_agents.discard(agent_id)
 
-            self.graph.add_edge(city1, city2, nr_trains)
+    def get_shortest_paths(self, agent_id: int) -> AllPairsShortestPaths:
+        """
+        Return the all-pairs shortest paths of an agent, recomputing them only if the board changed for the agent
+        :param agent_id: Agent for which the shortest paths are returned
+        """
+        if agent_id not in self.shortest_paths or agent_id in self.stale_agents:
+            self.update_shortest_paths_for_agent(agent_id)
+        return self.shortest_paths[agent_id]
 
     def recalculate_shortest_routes(self):
         """
         Update the shortest routes based on changes on board
         """
-        for route_card in self.route_cards.values():
-            from_city = route_card.start.name
-            target_city = route_card.end.name
-            for agent in self.agent_list:  # List with agents
-                shortest_route = self.calculate_shortest_route(from_city, target_city, agent.agent_id)
-                route_card.add_shortest_route(agent.agent_id, shortest_route=shortest_route)
+        with self.profiler.phase('recalculate_shortest_routes'):
+            for agent in self.agent_list:
+                self.get_shortest_paths(agent.agent_id)
+            for route_card in self.route_cards.values():
+                from_city = route_card.start.name
+                target_city = route_card.end.name
+                for agent in self.agent_list:  # List with agents
+                    shortest_route = self.calculate_shortest_route(from_city, target_city, agent.agent_id)
+                    route_card.add_shortest_route(agent.agent_id, shortest_route=shortest_route)
+
+    def update_shortest_routes(self, claimed_connection: Connection):
+        """
+        Incrementally update the shortest routes after a connection has been claimed. For the owner the connection no
+        longer costs trains, so only routes that get shorter through it are recomputed. For all other agents the
+        connection is removed, so only routes that used it, or a parallel connection that was closed with it, are
+        recomputed. No all-pairs table is rebuilt here: an up to date table of the owner is relaxed, otherwise the
+        distances through the connection are found with one CSR search from each of its cities.
+        :param claimed_connection: Connection that just got an owner
+        """
+        with self.profiler.phase('update_shortest_routes'):
+            self._update_shortest_routes(claimed_connection)
+
+    def _update_shortest_routes(self, claimed_connection: Connection):
+        owner = claimed_connection.owner
+        city1 = claimed_connection.start_point.city_id
+        city2 = claimed_connection.end_point.city_id
+        group = self.board.connection_groups[claimed_connection.connection_id]
+
+        for agent in self.agent_list:
+            agent_id = agent.agent_id
+            closed_connections = {self.board.connections[idx] for idx in group
+                                  if self.edge_weights[self.agent_index[agent_id], idx] == np.inf}
+            if agent_id == owner:
+                if agent_id in self.shortest_paths and agent_id not in self.stale_agents:
+                    self.shortest_paths[agent_id].relax_edge(city1, city2, 0)
+                    distance = self.shortest_paths[agent_id].distance
+                else:
+                    distance = self._distance_through(agent_id, city1, city2)
+            else:
+                # other paths in the table may use the connection as well, search the CSR graph until the table is
+                # recomputed once it is needed again
+                self.stale_agents.add(agent_id)
+
+            for route_card in self.route_cards.values():
+                if agent_id == owner:
+                    start = route_card.start.city_id
+                    end = route_card.end.city_id
+                    current_route = route_card.shortest_routes[agent_id]
+                    to_recompute = distance(start, end) < self.get_route_cost(current_route, agent_id)
+                else:
+                    to_recompute = not closed_connections.isdisjoint(route_card.shortest_routes[agent_id])
+
+                if to_recompute:
+                    shortest_route = self.calculate_shortest_route(route_card.start.name, route_card.end.name,
+                                                                   agent_id)
+                    route_card.add_shortest_route(agent_id, shortest_route=shortest_route)
+                    self.recomputed_routes += 1
+                    self.profiler.count('recomputed_routes')
+                else:
+                    self.skipped_routes += 1
+                    self.profiler.count('skipped_routes')
+
+    def _distance_through(self, agent_id: int, city1: int, city2: int):
+        """
+        Distance function for an agent that just claimed the connection between city1 and city2 and has no up to date
+        table. A route that got shorter must use the connection, so its new length is the distance to one of the
+        cities plus the distance from the other one, which two searches on the CSR graph give for every route.
+        :return: Function of (start, end) with the length of the shortest path between them through the connection
+        """
+        edge_weights = self.edge_weights[self.agent_index[agent_id]]
+        with self.profiler.phase('csr_graph.distances_from'):
+            distances1 = self.csr_graph.distances_from(city1, edge_weights)
+            distances2 = self.csr_graph.distances_from(city2, edge_weights)
+        return lambda start, end: min(distances1[start] + distances2[end], distances2[start] + distances1[end])
+
+    @staticmethod
+    def get_route_cost(route: list[Connection], agent_id: int) -> float:
+        """
+        Number of trains an agent still needs for a route, np.inf for an empty (non-existing) route
+        :param route: List of connections
+        :param agent_id: Agent for which the cost is calculated
+        """
+        if not route:
+            return np.inf
+        return sum(connection.num_trains for connection in route if connection.owner != agent_id)
+
+    def snapshot(self) -> tuple:
+        """
+        Immutable copy of the state of the board and the route cards: the owner of every connection (-1 if none), per
+        route card whether it is finished and the shortest route of every agent as connection indices, and the
+        shortest path tables. The tables are shared, they are replaced instead of changed in place.
+        """
+        owners = self.board.connection_owners.astype(np.int8)
+        owners.flags.writeable = False
+
+        route_cards = tuple((route_card.is_finished,
+                             tuple(tuple(connection.connection_id
+                                         for connection in route_card.shortest_routes[agent.agent_id])
+                                   for agent in self.agent_list))
+                            for route_card in self.route_cards.values())
+
+        shortest_paths = []
+        for agent_id, agent_shortest_paths in self.shortest_paths.items():
+            agent_shortest_paths.distances.flags.writeable = False
+            agent_shortest_paths.next_node.flags.writeable = False
+            shortest_paths.append((agent_id, agent_shortest_paths.distances, agent_shortest_paths.next_node))
+
+        edge_weights = self.edge_weights.copy()
+        edge_weights.flags.writeable = False
+
+        return (owners, route_cards, tuple(shortest_paths), frozenset(self.stale_agents), edge_weights,
+                self.recomputed_routes, self.skipped_routes)
+
+    def restore(self, snapshot: tuple):
+        """
+        Set the board and the route cards to a snapshot made by snapshot(). Owners are set without calling the owner
+        listeners, the edge weights are restored from the snapshot instead.
+        """
+        owners, route_cards, shortest_paths, stale_agents, edge_weights, self.recomputed_routes, \
+            self.skipped_routes = snapshot
+
+        self.board.set_owners(owners)
+
+        for route_card, (is_finished, routes) in zip(self.route_cards.values(), route_cards):
+            route_card.is_finished = is_finished
+            for agent, route in zip(self.agent_list, routes):
+                route_card.add_shortest_route(agent.agent_id, [self.board.connections[idx] for idx in route])
+
+        self.shortest_paths = {}
+        for agent_id, distances, next_node in shortest_paths:
+            agent_shortest_paths = AllPairsShortestPaths(len(self.board.city_names))
+            agent_shortest_paths.distances = distances
+            agent_shortest_paths.next_node = next_node
+            self.shortest_paths[agent_id] = agent_shortest_paths
+        self.stale_agents = set(stale_agents)
+        self.edge_weights[:] = edge_weights
+
+    def copy_structure(self, board: Board, route_cards: dict[str: RouteCard], agent_list: list, deck: Deck,
+                       model: TtRKripke, events: EventLog = None):
+        """
+        Make a game on copies of the board, route cards, agents, deck and model without building the search graph
+        again: the CSR graph does not change during a game and are shared with this game. The state
+        is not copied, restore a snapshot on the new game for that. The new game is not profiled.
+        :return: New Game object
+        """
+        game = Game.__new__(Game)
+        game.route_cards = route_cards
+        game.board = board
+        game.agent_list = agent_list
+        game.deck = deck
+        game.model = model
+        game.events = events if events is not None else EventLog()
+        game.profiler = Profiler()
+        game.shortest_paths = {}
+        game.stale_agents = set([])
+        game.recomputed_routes = 0
+        game.skipped_routes = 0
+
+        game.agent_index = self.agent_index
+        game.single_double_routes = self.single_double_routes
+        game.edge_weights = self.edge_weights.copy()
+        game.csr_graph = self.csr_graph
+
+        for connection in board.connections:
+            connection.add_owner_listener(game.update_edge_weights)
+        return game
 
     def announce_claimed_connection(self, announcing_agent_id: int, claimed_connection: Connection):
         """
@@ -120,7 +362,8 @@ class Game(object):
                 public_singled_out.add(route_card.route_name)
 
         # possibilities
-        self.model.public_announcement_possibilities(announcing_agent_id, public_singled_out)
+        with self.profiler.phase('kripke.public_announcement_possibilities'):
+            self.model.public_announcement_possibilities(announcing_agent_id, public_singled_out)
 
         # Legacy function:
         # for agent in self.agent_list:
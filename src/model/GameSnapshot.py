@@ -0,0 +1,22 @@
+"""
+Immutable snapshot of the full state of a Ticket to Ride game, to go back to a state after trying moves
+"""
+
+# packages
+from typing import NamedTuple, Any
+
+
+class GameSnapshot(NamedTuple):
+    """
+        Made by TicketToRide.snapshot() and restored with TicketToRide.restore(). All arrays in the snapshot are
+        read-only, so a snapshot can be restored any number of times.
+    """
+    turn_num: int
+    last_turn: int
+    in_game: bool
+    termination_reason: str
+    winner: int
+    deck: tuple  # closed, open and used cards, see Deck.snapshot()
+    agents: tuple  # state per agent, see Agent.snapshot()
+    game: tuple  # owners of connections, route cards and shortest paths, see Game.snapshot()
+    kripke: Any  # worlds and relations, format depends on the Kripke backend
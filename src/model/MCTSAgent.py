@@ -0,0 +1,228 @@
+"""
+Agent that chooses its actions with Monte Carlo tree search over rollouts of the rest of the game
+"""
+
+# packages
+import math
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from .Agent import Agent
+from .config import *
+
+# Params in MCTS Config
+TIME_LIMIT = MCTS_CONFIG['TIME_LIMIT']
+MAX_ROLLOUTS = MCTS_CONFIG['MAX_ROLLOUTS']
+BATCH_SIZE = MCTS_CONFIG['BATCH_SIZE']
+WORKERS = MCTS_CONFIG['WORKERS']
+MAX_ROLLOUT_TURNS = MCTS_CONFIG['MAX_ROLLOUT_TURNS']
+EXPLORATION = MCTS_CONFIG['EXPLORATION']
+
+
+def run_rollouts(ttr, agent_id: int, rollouts: list[tuple[tuple, int]], max_turns: int) -> list[float]:
+    """
+    Play rollouts from the state of a game, every rollout starts from the same snapshot
+    :param ttr: TicketToRide object in the state to start from, it is not changed
+    :param agent_id: Agent that chooses the first action
+    :param rollouts: List of (first action, seed) tuples
+    :param max_turns: Maximum number of turns per rollout
+    :return: Reward of every rollout, 1 if agent_id wins and 0 otherwise
+    """
+    game = ttr.clone()
+    snapshot = game.snapshot()
+    return [rollout(game, snapshot, agent_id, action, seed, max_turns) for action, seed in rollouts]
+
+
+def rollout(ttr, snapshot, agent_id: int, action: tuple, seed: int, max_turns: int) -> float:
+    """
+    Play one game from a snapshot until it ends, or until max_turns turns are played. The hidden information is
+    determinized first: the route cards of the other agents are drawn from the worlds agent_id considers possible and
+    the closed cards are shuffled. Afterwards all agents play greedily without blocking, since the route cards they
+    know of others follow from the true hands, not from the drawn ones.
+    :param ttr: Clone of a game, restored to the snapshot before the rollout
+    :param snapshot: Snapshot of the state in which agent_id has to choose an action
+    :param agent_id: Agent that performs the action
+    :param action: First action of the agent
+    :param seed: Seed of the rollout
+    :param max_turns: Maximum number of turns
+    :return: 1 if agent_id wins the rollout, 0 otherwise
+    """
+    ttr.restore(snapshot)
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = random.Random(seed)
+
+    world = ttr.kripke.sample_world(agent_id, rng)
+    for agent in ttr.agents:
+        agent.blocks = False
+        if world is not None and agent.agent_id != agent_id:
+            agent.own_route_cards = [ttr.game.route_cards[route_card] for route_card in sorted(world[agent.agent_id])]
+    random.shuffle(ttr.deck.closed_cards)
+
+    agent_idx = ttr.game.agent_index[agent_id]
+    ttr.agents[agent_idx].perform_action(action)
+    if ttr.is_finished(agent_id):
+        ttr.in_game = False
+        ttr.announce_winner()
+    else:
+        ttr.turn(first_agent_idx=agent_idx + 1)
+
+    last_turn = ttr.turn_num + max_turns
+    while ttr.in_game and ttr.turn_num < last_turn:
+        ttr.turn()
+    if ttr.in_game:
+        ttr.in_game = False
+        ttr.announce_winner()
+
+    return 1.0 if ttr.winner == agent_id else 0.0
+
+
+class MCTSAgent(Agent):
+
+    def __init__(self, agent_id: int, nr_of_trains: int, game=None, time_limit: float = TIME_LIMIT,
+                 max_rollouts: int = MAX_ROLLOUTS, batch_size: int = BATCH_SIZE, workers: int = WORKERS,
+                 max_rollout_turns: int = MAX_ROLLOUT_TURNS, exploration: float = EXPLORATION):
+        """
+        Agent that chooses between its possible actions with UCB1 at the root: actions are tried in rollouts of the
+        rest of the game, more often the more promising they are, and the most tried action is played. Rollouts run
+        in batches, optionally spread over a pool of worker processes.
+        :param time_limit: Maximum number of seconds per decision, None for no limit. Only the rollout budget keeps
+        seeded games reproducible, with a time limit the decisions depend on the speed of the machine.
+        :param max_rollouts: Maximum number of rollouts per decision, None for no limit
+        :param batch_size: Number of rollouts chosen at once and run together
+        :param workers: Number of worker processes for the rollouts, 1 to run them in this process. The rollouts also
+        run in this process if it is itself a worker process (e.g. of a simulation), which cannot have children.
+        :param max_rollout_turns: Maximum number of turns per rollout
+        :param exploration: Exploration constant of UCB1
+        """
+        super().__init__(agent_id, nr_of_trains, game)
+        assert time_limit is not None or max_rollouts is not None, "MCTS needs a time or rollout budget. EXITING..."
+        self.time_limit = time_limit
+        self.max_rollouts = max_rollouts
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_rollout_turns = max_rollout_turns
+        self.exploration = exploration
+        self.ttr = None
+        self.pool = None
+        self.num_rollouts = 0  # rollouts of the last decision
+
+    def set_ticket_to_ride(self, ttr):
+        """
+        Set the game the agent plays in, which is cloned for the rollouts
+        """
+        self.ttr = ttr
+
+    def choose_action(self):
+        """
+        Choose the action with the most rollouts after the search. The random generators of the game are restored
+        afterwards, so the search does not change the rest of the game.
+        """
+        actions = self.get_possible_actions()
+        if len(actions) == 1:
+            self.perform_action(actions[0])
+            return
+
+        random_state = random.getstate()
+        np_random_state = np.random.get_state()
+        visits, _ = self.search(actions)
+        random.setstate(random_state)
+        np.random.set_state(np_random_state)
+
+        self.perform_action(actions[int(np.argmax(visits))])
+
+    def search(self, actions: list[tuple]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Run rollouts for the actions until the time or rollout budget is used
+        :param actions: Possible actions of the agent
+        :return: Number of rollouts and total reward per action
+        """
+        start_time = time.perf_counter()
+        root = self.ttr.clone()
+        snapshot = root.snapshot()
+        rng = random.Random(random.getrandbits(64))
+
+        visits = np.zeros(len(actions))
+        rewards = np.zeros(len(actions))
+        self.num_rollouts = 0
+        while True:
+            batch_size = self.batch_size
+            if self.max_rollouts is not None:
+                batch_size = min(batch_size, self.max_rollouts - self.num_rollouts)
+            batch = self.select_batch(visits, rewards, batch_size)
+            seeds = [rng.getrandbits(32) for _ in batch]
+            batch_rewards = self.run_batch(root, snapshot, [(actions[idx], seed) for idx, seed in zip(batch, seeds)])
+
+            for idx, reward in zip(batch, batch_rewards):
+                visits[idx] += 1
+                rewards[idx] += reward
+            self.num_rollouts += len(batch)
+
+            if self.max_rollouts is not None and self.num_rollouts >= self.max_rollouts:
+                break
+            if self.time_limit is not None and time.perf_counter() - start_time >= self.time_limit:
+                break
+
+        return visits, rewards
+
+    def select_batch(self, visits: np.ndarray, rewards: np.ndarray, batch_size: int) -> list[int]:
+        """
+        Choose the actions of the next batch of rollouts with UCB1. Rollouts already chosen for the batch count as
+        visits without reward, so a batch spreads over the promising actions instead of repeating the best one.
+        :return: List of action indices
+        """
+        visits = visits.copy()
+        batch = []
+        for _ in range(batch_size):
+            unvisited = np.flatnonzero(visits == 0)
+            if unvisited.size > 0:
+                idx = int(unvisited[0])
+            else:
+                ucb = rewards / visits + self.exploration * np.sqrt(math.log(visits.sum()) / visits)
+                idx = int(np.argmax(ucb))
+            batch.append(idx)
+            visits[idx] += 1
+        return batch
+
+    def run_batch(self, root, snapshot, rollouts: list[tuple[tuple, int]]) -> list[float]:
+        """
+        Run a batch of rollouts, in this process or divided over the worker processes
+        :param root: Clone of the game in which the agent has to choose an action
+        :param snapshot: Snapshot of root
+        :param rollouts: List of (first action, seed) tuples
+        :return: Reward of every rollout
+        """
+        if self.workers <= 1 or multiprocessing.current_process().daemon:
+            return [rollout(root, snapshot, self.agent_id, action, seed, self.max_rollout_turns)
+                    for action, seed in rollouts]
+
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(processes=self.workers)
+        root.restore(snapshot)
+        chunks = [rollouts[idx::self.workers] for idx in range(self.workers)]
+        results = self.pool.starmap(run_rollouts, [(root, self.agent_id, chunk, self.max_rollout_turns)
+                                                   for chunk in chunks if chunk])
+
+        # undo the round-robin division over the chunks
+        rewards = [0.0] * len(rollouts)
+        for chunk_idx, chunk_rewards in enumerate(results):
+            rewards[chunk_idx::self.workers] = chunk_rewards
+        return rewards
+
+    def close(self):
+        """
+        Stop the worker processes of the rollouts, a new pool is started if the agent searches again
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __getstate__(self):
+        # the pool cannot be sent to other processes
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
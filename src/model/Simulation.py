@@ -0,0 +1,146 @@
+"""
+Headless simulation of complete Ticket to Ride games, without the PyGame visualizer
+"""
+
+# packages
+import multiprocessing
+
+from .map.Board import Board
+from .map.MapData import MapData
+from .TicketToRide import TicketToRide, KRIPKE_BACKEND
+from .events import EventLog
+from .profiling import Profiler
+
+# simulation of the current worker process, set by _init_worker
+_worker_simulation = None
+
+
+def _init_worker(simulation):
+    """
+    Initializer of a worker process, loads the map once for all games played by the worker
+    """
+    global _worker_simulation
+    _worker_simulation = simulation
+    _worker_simulation.load_data()
+
+
+def _run_worker_game(indexed_seed: tuple[int, int]) -> tuple[int, dict]:
+    """
+    Play the game of one seed in a worker process
+    :param indexed_seed: Tuple of the position of the seed in the batch and the seed
+    :return: Tuple of the position and the result of the game
+    """
+    idx, seed = indexed_seed
+    return idx, _worker_simulation.run_game(seed)
+
+
+class Simulation(object):
+
+    def __init__(self, num_agents: int, num_route_cards: int, kripke_backend: str = KRIPKE_BACKEND,
+                 max_turns: int = None, quiet: bool = True, agent_types: list[str] = None, map_data: MapData = None,
+                 profiler: Profiler = None):
+        """
+        Initializer of a simulation that plays games with the same settings
+        :param num_agents: The number of agents per game
+        :param num_route_cards: The number of route cards per agent
+        :param kripke_backend: Name of the Kripke model implementation
+        :param max_turns: Maximum number of turns per game, None to play until the game finishes by itself
+        :param quiet: If True the games run with a disabled event log, otherwise their events are printed
+        :param agent_types: Type of every agent, see TicketToRide, by default all agents are greedy
+        :param map_data: Map to play on, the map of the data files if None
+        :param profiler: Profiler that collects the phases of all games, disabled if None. Games played by worker
+        processes are not profiled.
+        """
+        self.num_agents = num_agents
+        self.num_route_cards = num_route_cards
+        self.kripke_backend = kripke_backend
+        self.max_turns = max_turns
+        self.quiet = quiet
+        self.agent_types = agent_types
+        self.map_data = map_data
+        self.profiler = profiler if profiler is not None else Profiler()
+
+        # board and route cards of the map, shared by all games of this simulation
+        self.board = None
+        self.route_card_data = None
+
+    def load_data(self):
+        """
+        Make the board and the route cards of the map, if not done before
+        """
+        if self.board is None:
+            self.board = Board(self.map_data)
+            self.route_card_data = self.board.map_data.route_card_data()
+
+    def __getstate__(self):
+        # workers make the board themselves instead of receiving the objects, the map is loaded from the cache file
+        state = self.__dict__.copy()
+        state['board'] = None
+        state['route_card_data'] = None
+        state['profiler'] = Profiler()
+        return state
+
+    def run_game(self, seed: int) -> dict:
+        """
+        Play one complete game
+        :param seed: Seed of the game, the same seed gives the same game
+        :return: Dictionary with the results of the game
+        """
+        self.load_data()
+        events = EventLog() if self.quiet else EventLog([print])
+        ttr = TicketToRide(num_agents=self.num_agents, num_route_cards=self.num_route_cards,
+                           kripke_backend=self.kripke_backend, seed=seed, board=self.board.copy(),
+                           route_card_data=self.route_card_data, events=events, agent_types=self.agent_types,
+                           profiler=self.profiler)
+        while ttr.in_game:
+            if self.max_turns is not None and ttr.turn_num >= self.max_turns:
+                ttr.in_game = False
+                ttr.termination_reason = 'max_turns'
+                ttr.announce_winner()
+                break
+            ttr.turn()
+
+        return self.make_result(ttr, seed)
+
+    def make_result(self, ttr: TicketToRide, seed: int) -> dict:
+        """
+        Collect the results of a finished game
+        :param ttr: Finished game
+        :param seed: Seed of the game
+        :return: Dictionary with the winner, scores, number of turns and reason the game ended
+        """
+        return {
+            'seed': seed,
+            'num_agents': len(ttr.agents),
+            'num_route_cards': len(ttr.route_cards) // len(ttr.agents),
+            'winner': ttr.winner,
+            'scores': [agent.score for agent in ttr.agents],
+            'finished_route_cards': [sum(route_card.is_finished for route_card in agent.own_route_cards)
+                                     for agent in ttr.agents],
+            'turns': ttr.turn_num,
+            'termination_reason': ttr.termination_reason
+        }
+
+    def run(self, seeds: list[int], workers: int = 1):
+        """
+        Play a game for every seed. Every game seeds the random generators of the process it runs in, so the result
+        of a game only depends on its seed and not on the worker that played it.
+        :param seeds: Seeds of the games
+        :param workers: Number of worker processes, 1 to play all games in this process
+        :return: Generator of result dictionaries, in the order of the seeds
+        """
+        if workers <= 1:
+            for seed in seeds:
+                yield self.run_game(seed)
+            return
+
+        seeds = list(seeds)
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(self,)) as pool:
+            # games finish out of order, buffer results until all games of earlier seeds are done
+            finished = {}
+            next_idx = 0
+            for idx, result in pool.imap_unordered(_run_worker_game, enumerate(seeds)):
+                finished[idx] = result
+                while next_idx in finished:
+                    yield finished.pop(next_idx)
+                    next_idx += 1
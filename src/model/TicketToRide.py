@@ -3,84 +3,132 @@ Object Ticket to ride board game that has all the functionalities of the game
 """
 
 # packages
+import copy
 import random
+import numpy as np
 from .Deck import Deck
 from .map.Board import Board
 from .Agent import Agent
+from .MCTSAgent import MCTSAgent
 from .RouteCard import RouteCard
 from .Game import Game
+from .GameSnapshot import GameSnapshot
 from .ttr_kripke.TtRKripke import TtRKripke
+from .ttr_kripke.BitmaskKripke import BitmaskKripke
+from .ttr_kripke.SymbolicKripke import SymbolicKripke
+from .events import EventLog, MessageEvent, TurnEvent, GameOverEvent
+from .profiling import Profiler
 from .config import *
-import os
-
-ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Data in TICKET_TO_RIDE_CONFIG
 NR_OF_TRAINS = TICKET_TO_RIDE_CONFIG['NR_OF_TRAINS']
 NR_TRAIN_CARDS = TICKET_TO_RIDE_CONFIG['NR_TRAIN_CARDS']
-ROUTE_CARDS_PATH = os.path.join(ROOT_DIR, TICKET_TO_RIDE_CONFIG['ROUTE_CARDS_PATH'])
 MIN_TRAINS = TICKET_TO_RIDE_CONFIG['MIN_TRAINS']
 MAX_TURNS = TICKET_TO_RIDE_CONFIG['MAX_TURNS']
 
+# Data in KRIPKE_CONFIG
+KRIPKE_BACKEND = KRIPKE_CONFIG['BACKEND']
+KRIPKE_BACKENDS = {
+    'sets': TtRKripke,
+    'bitmask': BitmaskKripke,
+    'symbolic': SymbolicKripke
+}
+
+AGENT_TYPE = 'greedy'
+AGENT_TYPES = {
+    'greedy': Agent,
+    'mcts': MCTSAgent
+}
+
 
 class TicketToRide(object):
 
-    def __init__(self, num_agents: int, num_route_cards: int):
+    def __init__(self, num_agents: int, num_route_cards: int, kripke_backend: str = KRIPKE_BACKEND,
+                 seed: int = None, board: Board = None, route_card_data: list[tuple[str, str, int]] = None,
+                 events: EventLog = None, agent_types: list[str] = None, profiler: Profiler = None,
+                 progress=None):
         """
         Initialize the full game by initializing agent, board, deck and route cards individually
+        :param kripke_backend: Name of the Kripke model implementation, one of KRIPKE_BACKENDS
+        :param seed: Seed for the random generators, None for a random game
+        :param board: Unused board to play on, the board of the data files if None
+        :param route_card_data: List of (start city, end city, score) tuples, the route cards of the map of the board
+        if None
+        :param events: Event log of the game, by default all events are printed to the console
+        :param agent_types: Type of every agent, one of AGENT_TYPES, by default all agents are greedy
+        :param profiler: Profiler that times the phases of the game, disabled if None
+        :param progress: Function called with (phase, done, total) while the game is initialized, e.g. to show the
+        progress of building the worlds of the Kripke model. It may raise an exception to cancel the initialization.
         """
+        assert kripke_backend in KRIPKE_BACKENDS, f"Unknown Kripke backend {kripke_backend}. " \
+                                                  f"Choose in {list(KRIPKE_BACKENDS.keys())}."
+        self.kripke_backend = kripke_backend
+        self.agent_types = agent_types if agent_types is not None else []
+        for agent_type in self.agent_types:
+            assert agent_type in AGENT_TYPES, f"Unknown agent type {agent_type}. Choose in {list(AGENT_TYPES.keys())}."
+        self.events = events if events is not None else EventLog([print])
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.progress = progress
         self.deck = None
         self.board = None
         self.agents = []
         self.route_cards = []
         self.turn_num = 0
         self.kripke = None
+        self.game = None
         self.last_turn = None
         self.in_game = True
+        self.termination_reason = None
+        self.winner = None
+        self.version = 0  # increased on every change of the state, e.g. to redraw a view only when the game changed
 
-        self.init_game(num_agents, num_route_cards)
+        self.init_game(num_agents, num_route_cards, seed, board, route_card_data)
 
     def _init_agents(self, num_agents):
         """
         Initialize all agents
         """
         for idx in range(num_agents):
-            self.agents.append(Agent(idx, NR_OF_TRAINS))
+            agent_type = self.agent_types[idx] if idx < len(self.agent_types) else AGENT_TYPE
+            self.agents.append(AGENT_TYPES[agent_type](idx, NR_OF_TRAINS))
 
-    def _init_route_cards(self, total_num_route_cards: int):
+    def _init_route_cards(self, total_num_route_cards: int, route_card_data: list[tuple[str, str, int]] = None):
         """
-        Read route cards from text file and create new RouteCard objects for every card which are stored in an array
+        Create new RouteCard objects for every route card on the board which are stored in an array
+        :param route_card_data: List of (start city, end city, score) tuples, the route cards of the map of the board
+        if None
         """
-        with open(ROUTE_CARDS_PATH, mode='r', encoding='utf-8') as f:
-            for line in f:
-                line_list = line.split()
-                start = self.board.get_city(line_list[0].split('-')[0])
-                end = self.board.get_city(line_list[0].split('-')[1])
+        if route_card_data is None:
+            route_card_data = self.board.map_data.route_card_data()
 
-                if start is None or end is None:
-                    # print(f'Route_card: Cities {start} or {end} not implemented. Skipping....')
-                    continue
+        for start_name, end_name, score in route_card_data:
+            start = self.board.get_city(start_name)
+            end = self.board.get_city(end_name)
 
-                score = int(line_list[1].rpartition('(')[2].partition(')')[0])
-                self.route_cards.append(RouteCard(start, end, score))
+            if start is None or end is None:
+                # print(f'Route_card: Cities {start} or {end} not implemented. Skipping....')
+                continue
+
+            self.route_cards.append(RouteCard(start, end, score))
 
         random.shuffle(self.route_cards)
-        print(f"Number of route cards available = {len(self.route_cards)}")
+        text = f"Number of route cards available = {len(self.route_cards)}\n"
 
         if len(self.route_cards) > total_num_route_cards:
-            print(f"Removing {len(self.route_cards) - total_num_route_cards} route cards to get a total of "
-                  f"{total_num_route_cards} route cards.")
+            text += f"Removing {len(self.route_cards) - total_num_route_cards} route cards to get a total of " \
+                    f"{total_num_route_cards} route cards.\n"
             del self.route_cards[-(len(self.route_cards) - total_num_route_cards):]
 
         left_over_cards = len(self.route_cards) % len(self.agents)
         if left_over_cards > 0:
-            print(f"Deleting {left_over_cards} route cards to evenly distribute cards.")
+            text += f"Deleting {left_over_cards} route cards to evenly distribute cards.\n"
             del self.route_cards[-left_over_cards:]
 
-        print(f"\nPossible route cards (total={len(self.route_cards)}):")
-        for route_card in self.route_cards:
-            print(f"- {route_card.route_name}")
-        print()
+        if self.events.enabled:
+            text += f"\nPossible route cards (total={len(self.route_cards)}):\n"
+            for route_card in self.route_cards:
+                text += f"- {route_card.route_name}\n"
+            self.events.emit(MessageEvent(text))
 
     def _init_kripke(self):
         """
@@ -93,24 +141,30 @@ class TicketToRide(object):
         for route_card in self.route_cards:
             route_card_ids.append(route_card.route_name)
 
-        print(f"agent_ids = {agent_ids}")
-        self.kripke = TtRKripke(agent_ids=agent_ids, route_cards_ids=route_card_ids)
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"agent_ids = {agent_ids}"))
+        with self.profiler.phase('kripke.init'):
+            self.kripke = KRIPKE_BACKENDS[self.kripke_backend](agent_ids=agent_ids, route_cards_ids=route_card_ids,
+                                                               events=self.events, progress=self.progress)
 
     def _distribute_route_cards(self):
         """
         Distribute route cards among the agents
         """
-        print("Distribute route cards:")
+        if self.events.enabled:
+            self.events.emit(MessageEvent("Distribute route cards:"))
         random.shuffle(self.route_cards)
         step_size = len(self.route_cards) // len(self.agents)
         end = 0
-        for agent in self.agents:
+        for idx, agent in enumerate(self.agents):
+            self._report_progress('hands', idx, len(self.agents))
             begin = end
             end = begin + step_size
             for card in self.route_cards[begin:end]:
                 agent.add_route_card(card)
 
-            self.kripke.update_once_cards_known(agent.agent_id, set(agent.get_route_cards_str()))
+            with self.profiler.phase('kripke.update_once_cards_known'):
+                self.kripke.update_once_cards_known(agent.agent_id, set(agent.get_route_cards_str()))
 
     def _distribute_train_cards(self):
         """
@@ -129,6 +183,10 @@ class TicketToRide(object):
             route_card_dict[route_card.route_name] = route_card
         return route_card_dict
 
+    def _report_progress(self, phase: str, done: int, total: int):
+        if self.progress is not None:
+            self.progress(phase, done, total)
+
     def get_true_state(self):
         true_state = {}
         for agent in self.agents:
@@ -139,32 +197,33 @@ class TicketToRide(object):
         return true_state
 
     def announce_winner(self):
-        print("\n------")
+        for agent in self.agents:
+            agent.close()
         for agent in self.agents:
             for route_card in agent.own_route_cards:
                 if not route_card.is_finished:
-                    print(f"- Agent {agent.agent_id} did not finish route card {route_card.route_name}: "
-                          f"subtracting {route_card.score} points...")
+                    if self.events.enabled:
+                        self.events.emit(MessageEvent(f"- Agent {agent.agent_id} did not finish route card "
+                                                      f"{route_card.route_name}: subtracting {route_card.score} "
+                                                      f"points..."))
                     agent.score -= route_card.score
-        print("\n-----------------------------------------------------------------\n"
-              "........................AND THE WINNER IS........................\n"
-              "-----------------------------------------------------------------\n")
         points = {}
         for agent in self.agents:
             points[agent.agent_id] = agent.score
-            print(f"* Agent {agent.agent_id} has {agent.score} points...")
         agent_winner = max(points.keys(), key=(lambda idx: points[idx]))
+        self.winner = agent_winner
 
-        print(f"\nCONGRATULATIONS!!! Agent {agent_winner} has won with {points[agent_winner]} points!\n")
-        print(r"""
+        if not self.events.enabled:
+            return
+        self.events.emit(GameOverEvent(agent_winner, points, self.termination_reason))
+        self.events.emit(MessageEvent(r"""
          _____ _   _   ___   _   _  _   __ _____   ______ ___________   ______ _       _____   _______ _   _ _____    _____ _  ______ 
         |_   _| | | | / _ \ | \ | || | / //  ___|  |  ___|  _  | ___ \  | ___ \ |     / _ \ \ / /_   _| \ | |  __ \  |_   _| | | ___ \
           | | | |_| |/ /_\ \|  \| || |/ / \ `--.   | |_  | | | | |_/ /  | |_/ / |    / /_\ \ V /  | | |  \| | |  \/    | | | |_| |_/ /
           | | |  _  ||  _  || . ` ||    \  `--. \  |  _| | | | |    /   |  __/| |    |  _  |\ /   | | | . ` | | __     | | | __|    / 
           | | | | | || | | || |\  || |\  \/\__/ /  | |   \ \_/ / |\ \   | |   | |____| | | || |  _| |_| |\  | |_\ \    | | | |_| |\ \ 
           \_/ \_| |_/\_| |_/\_| \_/\_| \_/\____/   \_|    \___/\_| \_|  \_|   \_____/\_| |_/\_/  \___/\_| \_/\____/    \_/  \__\_| \_|
-        """)
-        print(f"Made by Jeroen, Lennard and Sverre!!\n\n")
+        """ + "\nMade by Jeroen, Lennard and Sverre!!\n\n"))
 
     def is_finished(self, agent_turn: int) -> bool:
         """
@@ -175,7 +234,9 @@ class TicketToRide(object):
         for agent in self.agents:
             # check if an agent has finished all route_cards
             if agent.check_if_route_cards_done():
-                print(f"--> AGENT {agent.agent_id} FINISHED ALL ROUTE CARDS")
+                if self.events.enabled:
+                    self.events.emit(MessageEvent(f"--> AGENT {agent.agent_id} FINISHED ALL ROUTE CARDS"))
+                self.termination_reason = 'route_cards_done'
                 return True
 
         # check if an agent has less than 3 trains left, then everyone has only one turn left
@@ -183,9 +244,12 @@ class TicketToRide(object):
             for agent in self.agents:
                 if agent.nr_of_trains < MIN_TRAINS:
                     self.last_turn = agent.agent_id
-                    print(f"--> AGENT {agent.agent_id} has less than {MIN_TRAINS}")
+                    if self.events.enabled:
+                        self.events.emit(MessageEvent(f"--> AGENT {agent.agent_id} has less than {MIN_TRAINS}"))
         elif agent_turn == self.last_turn:
-            print(f"--> AGENT {agent_turn} has played its last turn")
+            if self.events.enabled:
+                self.events.emit(MessageEvent(f"--> AGENT {agent_turn} has played its last turn"))
+            self.termination_reason = 'out_of_trains'
             return True
 
         # check if all agents could have drawn a card (deck nonempty)
@@ -194,62 +258,151 @@ class TicketToRide(object):
             if agent.can_draw_card:
                 finished = False
         if finished:
-            print(f"--> All agents could not draw any cards since the deck is empty. Game stops.")
+            if self.events.enabled:
+                self.events.emit(MessageEvent("--> All agents could not draw any cards since the deck is empty. "
+                                              "Game stops."))
+            self.termination_reason = 'deck_empty'
         return finished
 
-    def init_game(self, num_agents: int, num_route_cards: int):
+    def init_game(self, num_agents: int, num_route_cards: int, seed: int = None, board: Board = None,
+                  route_card_data: list[tuple[str, str, int]] = None):
         """
         Initializer for the game
+        :param seed: Seed for the random generators, None for a random game
+        :param board: Unused board to play on, the board of the data files if None
+        :param route_card_data: List of (start city, end city, score) tuples, the route cards of the map of the board
+        if None
         """
-        # random.seed(0)
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
 
-        print("\n--- INITIALIZING TICKET TO RIDE ---\n")
+        if self.events.enabled:
+            self.events.emit(MessageEvent("\n--- INITIALIZING TICKET TO RIDE ---\n"))
         self.deck = Deck()
-        self.board = Board()
+        self.board = Board() if board is None else board
         self.agents = []
         self.route_cards = []
         self.turn_num = 0
         self.kripke = None
+        self.game = None
         self.last_turn = None
         self.in_game = True
+        self.termination_reason = None
+        self.winner = None
 
         self._init_agents(num_agents)
-        self._init_route_cards(num_agents * num_route_cards)
+        self._init_route_cards(num_agents * num_route_cards, route_card_data)
         self._init_kripke()
         self._distribute_route_cards()
         self._distribute_train_cards()
 
         # Init game model
         route_card_dict = self._make_route_card_dict()
-        game = Game(board=self.board, route_cards=route_card_dict, agent_list=self.agents, deck=self.deck,
-                    model=self.kripke)
+        self.game = Game(board=self.board, route_cards=route_card_dict, agent_list=self.agents, deck=self.deck,
+                         model=self.kripke, events=self.events, profiler=self.profiler)
         for agent in self.agents:
-            agent.set_game(game)
-        game.init_shortest_routes()
+            agent.set_game(self.game)
+            if isinstance(agent, MCTSAgent):
+                agent.set_ticket_to_ride(self)
+        self._report_progress('shortest routes', 0, 1)
+        with self.profiler.phase('init_shortest_routes'):
+            self.game.init_shortest_routes()
+
+        self.version += 1
+        if self.events.enabled:
+            self.events.emit(MessageEvent("\n---- GAME INITIALIZED ---\n"))
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Take an immutable snapshot of the state of the game, which can be restored with restore()
+        """
+        return GameSnapshot(turn_num=self.turn_num, last_turn=self.last_turn, in_game=self.in_game,
+                            termination_reason=self.termination_reason, winner=self.winner,
+                            deck=self.deck.snapshot(), agents=tuple(agent.snapshot() for agent in self.agents),
+                            game=self.game.snapshot(), kripke=self.kripke.snapshot())
 
-        print("\n---- GAME INITIALIZED ---\n")
+    def restore(self, snapshot: GameSnapshot):
+        """
+        Set the game to the state of a snapshot taken from this game or from a clone of it
+        """
+        self.turn_num = snapshot.turn_num
+        self.last_turn = snapshot.last_turn
+        self.in_game = snapshot.in_game
+        self.termination_reason = snapshot.termination_reason
+        self.winner = snapshot.winner
+        self.deck.restore(snapshot.deck)
+        for agent, agent_snapshot in zip(self.agents, snapshot.agents):
+            agent.restore(agent_snapshot)
+        self.game.restore(snapshot.game)
+        self.kripke.restore(snapshot.kripke)
+        self.version += 1
+
+    def clone(self, events: EventLog = None):
+        """
+        Make an independent copy of the game, e.g. to try moves without changing this game. Only the objects that
+        change during a game are copied; the search structures are shared.
+        :param events: Event log of the copy, disabled if None
+        :return: New TicketToRide object in the same state, in which all agents are greedy and that is not profiled
+        """
+        ttr = TicketToRide.__new__(TicketToRide)
+        ttr.kripke_backend = self.kripke_backend
+        ttr.agent_types = []
+        ttr.events = events if events is not None else EventLog()
+        ttr.profiler = Profiler()
+        ttr.progress = None
+        ttr.version = 0
+        ttr.deck = Deck.__new__(Deck)
+        ttr.board = self.board.copy()
+
+        route_cards = {}
+        for route_card in self.route_cards:
+            route_cards[route_card.route_name] = RouteCard(ttr.board.cities[route_card.start.name],
+                                                           ttr.board.cities[route_card.end.name], route_card.score)
+        ttr.route_cards = list(route_cards.values())
+
+        ttr.agents = []
+        for agent in self.agents:
+            agent_clone = Agent(agent.agent_id, agent.nr_of_trains)
+            for route_card in agent.own_route_cards:
+                agent_clone.add_route_card(route_cards[route_card.route_name])
+            ttr.agents.append(agent_clone)
+
+        # the restore below replaces every container of the model that changes during the game
+        ttr.kripke = copy.copy(self.kripke)
+        ttr.kripke.events = ttr.events
+
+        ttr.game = self.game.copy_structure(board=ttr.board, route_cards=route_cards, agent_list=ttr.agents,
+                                            deck=ttr.deck, model=ttr.kripke, events=ttr.events)
+        for agent in ttr.agents:
+            agent.set_game(ttr.game)
 
-    def turn(self):
+        ttr.restore(self.snapshot())
+        return ttr
+
+    def turn(self, first_agent_idx: int = 0):
         """
         One turn in the game
+        :param first_agent_idx: Index of the first agent to play, the agents before it already played in this turn
         """
         if not self.in_game:
-            print("Game already over, skipping turn.")
+            if self.events.enabled:
+                self.events.emit(MessageEvent("Game already over, skipping turn."))
             return
 
-        print("\n\n----------------------------------------\n"
-              "----------------------------------------\n"
-              f"--- TURN {self.turn_num}\n"
-              "----------------------------------------\n"
-              "----------------------------------------\n")
-
-        for agent in self.agents:
-            agent.choose_action()
-            # agent.print_agent_profile()
-            if self.is_finished(agent.agent_id):
-                self.in_game = False
-                self.announce_winner()
-                return
+        self.version += 1
+        if self.events.enabled:
+            self.events.emit(TurnEvent(self.turn_num))
+
+        with self.profiler.phase('turn'):
+            for agent in self.agents[first_agent_idx:]:
+                with self.profiler.phase('choose_action'):
+                    agent.choose_action()
+                # agent.print_agent_profile()
+                if self.is_finished(agent.agent_id):
+                    self.in_game = False
+                    self.announce_winner()
+                    return
 
         self.turn_num += 1
 
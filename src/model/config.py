@@ -7,6 +7,15 @@ AGENT_CONFIG = {
     'NR_CARDS_TO_DRAW': 2
 }
 
+MCTS_CONFIG = {
+    'TIME_LIMIT': None,  # seconds per decision, None for no limit; a time limit makes games depend on the machine
+    'MAX_ROLLOUTS': 200,  # rollouts per decision, None for no limit
+    'BATCH_SIZE': 16,
+    'WORKERS': 1,
+    'MAX_ROLLOUT_TURNS': 30,
+    'EXPLORATION': 1.4
+}
+
 DECK_CONFIG = {
     'NR_COLOUR_CARDS': 12,
     'NR_JOKERS': 14,
@@ -25,10 +34,21 @@ TICKET_TO_RIDE_CONFIG = {
     'MAX_TURNS': 50
 }
 
+KRIPKE_CONFIG = {
+    'BACKEND': "bitmask",
+    'MAX_BITMASK_ROUTE_CARDS': 64,
+    'MAX_WORLDS': None,
+    'MAX_ENUMERATED_WORLDS': 100000
+}
+
 BOARD_CONFIG = {
     'CITY_FILE_PATH': "data/cities.txt",
     'CONNECTION_FILE_PATH': "data/train_connections_all.txt",
+    'MAP_CACHE_DIR': "data/cache",  # compiled maps, see map/MapData.py, None to always parse the text files
     'GRAY_COLOUR': "gray",
+    'DOUBLE_ROUTES': True,  # False to only read the first connection of a double route
+    'MIN_AGENTS_DOUBLE_ROUTES': 4,  # with fewer agents only one connection of a double route can be claimed
+    'TUNNEL_CARDS': 3,  # cards revealed when claiming a tunnel, 0 to claim tunnels as normal connections
     'TRAIN_POINTS': {
         1: 1,
         2: 2,
@@ -51,7 +71,13 @@ PY_GAME_CONFIG = {
     'LINE_THICKNESS_RELATION': 2,
     'RADIUS': 12,
     'BUTTON_WIDTH': 200,
-    'BUTTON_HEIGHT': 30
+    'BUTTON_HEIGHT': 30,
+    'MAX_FPS': 60,  # frames drawn per second at most
+    'EVENT_DRIVEN': True,  # only redraw after input or a change of the game, False to redraw every frame
+    'IDLE_WAIT_MS': 250,  # longest wait for input before checking whether the game changed
+    'SHOW_FRAME_TIME': False,  # overlay with the frame time, frame rate and CPU usage, toggled with the F key
+    'STATE_SPACE_DETAIL_WORLDS': 200,  # larger state spaces are drawn as a density raster instead of lines
+    'STATE_SPACE_RELATION_SAMPLES': 300000  # points sampled per agent for the density raster of the relations
 
 }
 
@@ -0,0 +1,202 @@
+"""
+Events that happen during a game, emitted to the subscribers of an event log instead of printed unconditionally
+"""
+
+
+class Event(object):
+    """
+        Base class of all events. The console message of an event is only formatted when str() is called on it, so
+        subscribers that only read the fields never pay for string formatting.
+    """
+    kind = 'event'
+
+    def to_dict(self) -> dict:
+        """
+        Structured representation of the event, e.g. to write it as JSON
+        """
+        return {'kind': self.kind, **self.__dict__}
+
+
+class MessageEvent(Event):
+    kind = 'message'
+
+    def __init__(self, text: str):
+        """
+        Free text message, for output that is not one of the typed events (initialization, end conditions)
+        """
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class TurnEvent(Event):
+    kind = 'turn'
+
+    def __init__(self, turn_num: int):
+        self.turn_num = turn_num
+
+    def __str__(self):
+        return "\n\n----------------------------------------\n" \
+               "----------------------------------------\n" \
+               f"--- TURN {self.turn_num}\n" \
+               "----------------------------------------\n" \
+               "----------------------------------------\n"
+
+
+class ClaimEvent(Event):
+    kind = 'claim'
+
+    def __init__(self, agent_id: int, connection_name: str, color: str, num_trains: int, claim_type: str):
+        """
+        :param claim_type: 'claim' if the agent claims the connection for its own route, 'block' if it blocks another
+        """
+        self.agent_id = agent_id
+        self.connection_name = connection_name
+        self.color = color
+        self.num_trains = num_trains
+        self.claim_type = claim_type
+
+    def __str__(self):
+        return f"-- Agent {self.agent_id} {self.claim_type}s connection {self.connection_name} with color " \
+               f"{self.color} and costs {self.num_trains}."
+
+
+class TunnelEvent(Event):
+    kind = 'tunnel'
+
+    def __init__(self, agent_id: int, connection_name: str, revealed_cards: list[str], extra_cards: int,
+                 paid: bool):
+        """
+        :param revealed_cards: Cards of the closed deck revealed for the tunnel
+        :param extra_cards: Number of extra cards the revealed cards cost
+        :param paid: True if the agent paid the extra cards and claims the tunnel
+        """
+        self.agent_id = agent_id
+        self.connection_name = connection_name
+        self.revealed_cards = revealed_cards
+        self.extra_cards = extra_cards
+        self.paid = paid
+
+    def __str__(self):
+        result = 'pays' if self.paid else 'cannot pay'
+        return f"-- Agent {self.agent_id} reveals {self.revealed_cards} for tunnel {self.connection_name} and " \
+               f"{result} {self.extra_cards} extra cards."
+
+
+class BlockEvent(Event):
+    kind = 'block'
+
+    def __init__(self, agent_id: int, target_agent_id: int, connection_name: str):
+        self.agent_id = agent_id
+        self.target_agent_id = target_agent_id
+        self.connection_name = connection_name
+
+    def __str__(self):
+        return f"- Agent {self.agent_id} blocks connection {self.connection_name} of agent {self.target_agent_id}."
+
+
+class DrawEvent(Event):
+    kind = 'draw'
+
+    def __init__(self, agent_id: int):
+        self.agent_id = agent_id
+
+    def __str__(self):
+        return f"- Agent {self.agent_id} draws card."
+
+
+class AnnouncementEvent(Event):
+    kind = 'announcement'
+
+    def __init__(self, agent_id: int, route_cards: set[str], announcement: str):
+        """
+        :param announcement: 'own_cards' if only agent_id learns its own route cards, 'card' if it is publicly known
+        that agent_id has the route cards and 'one_of' if it is publicly known it has at least one of them
+        """
+        self.agent_id = agent_id
+        self.route_cards = sorted(route_cards)
+        self.announcement = announcement
+
+    def __str__(self):
+        if self.announcement == 'own_cards':
+            return f"--> Agent {self.agent_id} knows that itself has cards {self.route_cards}"
+        if self.announcement == 'card':
+            return f"--> Publicly known that agent {self.agent_id} has card {self.route_cards}"
+        return f"--> Publicly known that agent {self.agent_id} has at least one of cards {self.route_cards}"
+
+
+class RouteFinishedEvent(Event):
+    kind = 'route_finished'
+
+    def __init__(self, agent_id: int, route_name: str, score: int):
+        self.agent_id = agent_id
+        self.route_name = route_name
+        self.score = score
+
+    def __str__(self):
+        return f"\n### Agent {self.agent_id} finished route card {self.route_name} with {self.score} points! ###\n"
+
+
+class GameOverEvent(Event):
+    kind = 'game_over'
+
+    def __init__(self, winner: int, scores: dict[int, int], termination_reason: str):
+        self.winner = winner
+        self.scores = scores
+        self.termination_reason = termination_reason
+
+    def __str__(self):
+        text = "\n-----------------------------------------------------------------\n" \
+               "........................AND THE WINNER IS........................\n" \
+               "-----------------------------------------------------------------\n\n"
+        for agent_id, score in self.scores.items():
+            text += f"* Agent {agent_id} has {score} points...\n"
+        text += f"\nCONGRATULATIONS!!! Agent {self.winner} has won with {self.scores[self.winner]} points!\n"
+        return text
+
+
+class EventLog(object):
+    """
+        Dispatches events to its subscribers. Without subscribers the log is disabled: emitters check the enabled
+        attribute before creating an event, so a disabled log costs one attribute lookup per event.
+    """
+
+    def __init__(self, subscribers: list = None):
+        """
+        :param subscribers: Functions that are called with every event, e.g. print to write the events to the console
+        """
+        self.subscribers = []
+        self.enabled = False
+        for subscriber in subscribers or []:
+            self.subscribe(subscriber)
+
+    def subscribe(self, subscriber):
+        """
+        Register a function that is called with every event
+        """
+        self.subscribers.append(subscriber)
+        self.enabled = True
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+        self.enabled = bool(self.subscribers)
+
+    def emit(self, event: Event):
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+
+class EventRecorder(object):
+    """
+        Subscriber that stores all events, e.g. to analyse a game afterwards
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event: Event):
+        self.events.append(event)
+
+    def of_kind(self, kind: str) -> list[Event]:
+        return [event for event in self.events if event.kind == kind]
@@ -5,32 +5,36 @@ This class represents the board of the game
 # packages
 from ..map.City import City
 from ..map.Connection import Connection, FerryConnection
+from ..map.MapData import MapData, load_map
 from ..Deck import TRAIN_COLOURS
 from ..config import *
 
-import os
-
-ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import numpy as np
 
 # settings
-CITY_FILE_PATH = os.path.join(ROOT_DIR, BOARD_CONFIG['CITY_FILE_PATH'])
-CONNECTION_FILE_PATH = os.path.join(ROOT_DIR, BOARD_CONFIG['CONNECTION_FILE_PATH'])
 GRAY_CONNECTION = BOARD_CONFIG['GRAY_COLOUR']
 
 
 class Board(object):
 
-    def __init__(self):
+    def __init__(self, map_data: MapData = None):
         """
-        Initializer for board, no parameters are given
+        Initializer for board. Cities and connections get a dense integer id, their index in the city names and the
+        connections, which is used to index the arrays of the board. Two cities can be connected by more than one
+        connection (a double route).
+        :param map_data: Map to play on, the map of the data files (see load_map) if None
         """
+        self.map_data = map_data if map_data is not None else load_map()
         self.cities = {}
-        self.connections = []
+        self.city_names = []  # city_id -> name
+        self.connections = []  # connection_id -> Connection
         self.adjacency_list = {}
+        self.connection_lookup = {}  # (city_id, city_id) -> list of Connections, in both directions
 
         self._init_cities()
         self._init_connections()
         self._make_adjacency_list()
+        self._make_connection_arrays()
 
     def _make_adjacency_list(self):
         """
@@ -45,61 +49,124 @@ class Board(object):
             self.adjacency_list[from_city].append(connection)
             self.adjacency_list[to_city].append(connection)
 
+    def _add_city(self, city: City):
+        city.city_id = len(self.city_names)
+        self.cities[city.name] = city
+        self.city_names.append(city.name)
+
+    def _add_connection(self, connection: Connection):
+        connection.connection_id = len(self.connections)
+        self.connections.append(connection)
+        city1, city2 = connection.start_point.city_id, connection.end_point.city_id
+        parallel_connections = self.connection_lookup.setdefault((city1, city2), [])
+        parallel_connections.append(connection)
+        self.connection_lookup[(city2, city1)] = parallel_connections
+
+    def _make_connection_arrays(self):
+        """
+        Make the arrays indexed by connection id: the cities, length, colour, jokers and tunnel of every connection
+        are the arrays of the map data, the owners (kept up to date through the owner listeners of the connections) are
+        the only array that changes during a game. Also make the ids of the connections between the same cities per
+        connection and the matrix with the id of the first connection between every pair of cities (-1 if there is
+        none).
+        """
+        self.connection_cities = self.map_data.connection_cities
+        self.connection_lengths = self.map_data.connection_lengths
+        self.connection_colours = self.map_data.connection_colours  # card code, -1 for gray
+        self.connection_jokers = self.map_data.connection_jokers  # jokers needed for ferries
+        self.connection_tunnels = self.map_data.connection_tunnels
+        self.connection_groups = []  # connection_id -> ids of all connections between the same cities, in order
+        self.connection_owners = np.full(len(self.connections), -1, dtype=np.int64)  # agent id, -1 for no owner
+        self.connection_matrix = np.full((len(self.city_names), len(self.city_names)), -1, dtype=np.int64)
+
+        for connection in self.connections:
+            city1, city2 = connection.start_point.city_id, connection.end_point.city_id
+            parallel_connections = self.connection_lookup[(city1, city2)]
+            self.connection_groups.append(tuple(parallel.connection_id for parallel in parallel_connections))
+            self.connection_matrix[city1, city2] = parallel_connections[0].connection_id
+            self.connection_matrix[city2, city1] = parallel_connections[0].connection_id
+
+        for connection in self.connections:
+            connection.add_owner_listener(self.update_owner)
+
+    def update_owner(self, connection: Connection):
+        self.connection_owners[connection.connection_id] = -1 if connection.owner is None else connection.owner
+
+    def set_owners(self, owners: np.ndarray):
+        """
+        Set the owner of every connection (-1 for no owner) without calling the owner listeners
+        """
+        self.connection_owners[:] = owners
+        for connection, owner in zip(self.connections, owners.tolist()):
+            connection.owner = None if owner < 0 else owner
+
+    def copy(self):
+        """
+        Make a new, unplayed board with the same cities and connections. The arrays that do not change during a game
+        are shared with this board.
+        :return: Board without owners of connections and without stations
+        """
+        board = Board.__new__(Board)
+        board.map_data = self.map_data
+        board.cities = {}
+        board.city_names = []
+        board.connections = []
+        board.adjacency_list = {}
+        board.connection_lookup = {}
+        board._init_cities()
+        board._init_connections()
+
+        board._make_adjacency_list()
+        board.connection_cities = self.connection_cities
+        board.connection_lengths = self.connection_lengths
+        board.connection_colours = self.connection_colours
+        board.connection_jokers = self.connection_jokers
+        board.connection_tunnels = self.connection_tunnels
+        board.connection_groups = self.connection_groups
+        board.connection_owners = np.full(len(board.connections), -1, dtype=np.int64)
+        board.connection_matrix = self.connection_matrix
+        for connection in board.connections:
+            connection.add_owner_listener(board.update_owner)
+        return board
+
     def get_connection(self, city1: str, city2: str):
-        list_of_connections = self.adjacency_list[city1]
-        for connection in list_of_connections:
-            if connection.end_point.name == city2 or connection.start_point.name == city2:
-                return connection
-        return None
+        """
+        First connection between two cities, None if there is none
+        """
+        connections = self.get_connections_by_id(self.cities[city1].city_id, self.cities[city2].city_id)
+        return connections[0] if connections else None
+
+    def get_connections_by_id(self, city1: int, city2: int) -> list[Connection]:
+        """
+        All connections between two cities given by their ids, empty if there is none
+        """
+        return self.connection_lookup.get((city1, city2), [])
 
     def _init_cities(self):
         """
-        Function that initializes all cities
-        Required: data in txt file with name and coordinates
+        Function that initializes all cities from the map data
         """
-        with open(CITY_FILE_PATH, mode='r', encoding='utf-8') as f:
-            for line in f:
-                line_list = line.split()
-                city_name = line_list[0]
-                x_coord = float(line_list[1])
-                y_coord = float(line_list[2])
-                new_city = City(name=city_name, coordinates=(x_coord, y_coord))
-                self.cities[city_name] = new_city
+        for city_name, coordinates in zip(self.map_data.city_names.tolist(), self.map_data.city_coordinates.tolist()):
+            self._add_city(City(name=city_name, coordinates=tuple(coordinates)))
 
     def _init_connections(self):
         """
-        Read connections from text file and create new Connection objects for every city on the map
-        """
-        with open(CONNECTION_FILE_PATH, mode='r', encoding='utf-8') as f:
-            for line in f:
-                line_list = line.split()
-                city1 = self.get_city(line_list[0].split('-')[0])
-                city2 = self.get_city(line_list[0].split('-')[1])
-
-                if city1 is None or city2 is None:
-                    # print(f'Cities {city1} or {city2} not implemented. Skipping connection....')
-                    continue
-
-                length = int(line_list[1].rpartition('(')[2].partition(')')[0])
-                color = line_list[3]
-
-                is_new = True
-
-                for connection in self.connections:
-                    city1_old = connection.start_point.name
-                    city2_old = connection.end_point.name
-                    if (city1_old == city1.name and city2_old == city2.name) or (
-                            city1_old == city2.name and city2_old == city1.name):
-                        is_new = False
-                        break
-
-                if is_new:
-                    if color not in TRAIN_COLOURS and not color == GRAY_CONNECTION:
-                        num_jokers = int(color)
-                        self.connections.append(FerryConnection(city1, city2, length, color=GRAY_CONNECTION,
-                                                                num_jokers=num_jokers))
-                    else:
-                        self.connections.append(Connection(city1, city2, length, color))
+        Create new Connection objects for every connection of the map data
+        """
+        map_data = self.map_data
+        for (city1, city2), length, colour, num_jokers, tunnel in zip(map_data.connection_cities.tolist(),
+                                                                      map_data.connection_lengths.tolist(),
+                                                                      map_data.connection_colours.tolist(),
+                                                                      map_data.connection_jokers.tolist(),
+                                                                      map_data.connection_tunnels.tolist()):
+            city1 = self.cities[self.city_names[city1]]
+            city2 = self.cities[self.city_names[city2]]
+            if num_jokers > 0:
+                self._add_connection(FerryConnection(city1, city2, length, color=GRAY_CONNECTION,
+                                                     num_jokers=num_jokers))
+            else:
+                color = TRAIN_COLOURS[colour] if colour >= 0 else GRAY_CONNECTION
+                self._add_connection(Connection(city1, city2, length, color, tunnel=tunnel))
 
     def get_city(self, city_name: str):
         try:
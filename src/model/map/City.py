@@ -5,12 +5,14 @@ Object that represents a city
 
 class City(object):
 
-    def __init__(self, name: str, coordinates: tuple):
+    def __init__(self, name: str, coordinates: tuple, city_id: int = None):
         """
         Initializer of city object
         :param name: The name of the city
         :param coordinates: the coordinates of the city in float numbers
+        :param city_id: Index of the city in the cities of the board, set by the board
         """
+        self.city_id = city_id
         self.name = name
         self.coordinates = coordinates
         self.station = False
@@ -8,28 +8,44 @@ from ..map.City import City
 
 class Connection(object):
 
-    def __init__(self, start: City, end: City, num_trains: int, color: str):
+    def __init__(self, start: City, end: City, num_trains: int, color: str, connection_id: int = None,
+                 tunnel: bool = False):
         """
         Initializer of a connection taking 4 parameters
         :param start: Start city of connection
         :param end: End city of connection
         :param num_trains: Number of trains that fit in the connection
         :param color: Color of the connection
+        :param connection_id: Index of the connection in the connections of the board, set by the board
+        :param tunnel: True if claiming the connection can cost extra cards, see Agent.claim_connection
         """
+        self.connection_id = connection_id
         self.start_point = start
         self.end_point = end
         self.connection_name = f'{self.start_point.name}-{self.end_point.name}'
         self.num_trains = num_trains
         self.color = color
+        self.is_tunnel = tunnel
         self.owner = None
+        self.owner_listeners = []
+
+    def add_owner_listener(self, listener):
+        """
+        Register a function that is called with this connection every time its owner is set
+        :param listener: Function taking the connection as only argument
+        """
+        self.owner_listeners.append(listener)
 
     def set_owner(self, agent_id: int):
         self.owner = agent_id
+        for listener in self.owner_listeners:
+            listener(self)
 
 
 class FerryConnection(Connection):
 
-    def __init__(self, start: City, end: City, num_trains: int, color: str, num_jokers: int):
+    def __init__(self, start: City, end: City, num_trains: int, color: str, num_jokers: int,
+                 connection_id: int = None):
         """
         Subclass of connection to represent ferry connection, class is almost same as connection, only number of
         jokers is added
@@ -38,6 +54,7 @@ class FerryConnection(Connection):
         :param num_trains: Number of trains necessary excluding jokers
         :param color: Color to represent the connection
         :param num_jokers: Number of jokers necessary to claim this connection
+        :param connection_id: Index of the connection in the connections of the board, set by the board
         """
-        super().__init__(start, end, num_trains, color)
+        super().__init__(start, end, num_trains, color, connection_id)
         self.num_jokers = num_jokers
@@ -0,0 +1,217 @@
+"""
+Arrays describing a map (cities, connections and route cards), parsed from the text files once and cached as a binary
+file that is memory-mapped by later games and other processes
+"""
+
+# packages
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+
+from ..Deck import TRAIN_COLOURS, CARD_COLOURS, CARD_CODES
+from ..config import *
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# settings
+CITY_FILE_PATH = os.path.join(ROOT_DIR, BOARD_CONFIG['CITY_FILE_PATH'])
+CONNECTION_FILE_PATH = os.path.join(ROOT_DIR, BOARD_CONFIG['CONNECTION_FILE_PATH'])
+ROUTE_CARDS_PATH = os.path.join(ROOT_DIR, TICKET_TO_RIDE_CONFIG['ROUTE_CARDS_PATH'])
+MAP_CACHE_DIR = os.path.join(ROOT_DIR, BOARD_CONFIG['MAP_CACHE_DIR']) if BOARD_CONFIG['MAP_CACHE_DIR'] else None
+GRAY_CONNECTION = BOARD_CONFIG['GRAY_COLOUR']
+DOUBLE_ROUTES = BOARD_CONFIG['DOUBLE_ROUTES']
+
+MAP_FORMAT_VERSION = 1  # increase when the fields or the parsing change, so old cache files are not used
+ALIGNMENT = 64  # bytes, start of every array in a compiled map
+
+_loaded_maps = {}  # cache key -> MapData, maps already loaded by this process
+
+
+class MapData(NamedTuple):
+    """
+        Cities, connections and route cards of a map as arrays, cities and connections are referred to by their index.
+        The arrays are read-only, one MapData is shared by all boards made from it.
+    """
+    city_names: np.ndarray  # str per city
+    city_coordinates: np.ndarray  # (y, x) per city
+    connection_cities: np.ndarray  # (city, city) per connection
+    connection_lengths: np.ndarray  # number of trains per connection
+    connection_colours: np.ndarray  # card code per connection, -1 for gray
+    connection_jokers: np.ndarray  # number of jokers per connection, larger than 0 for ferries only
+    connection_tunnels: np.ndarray  # True for tunnels
+    route_card_cities: np.ndarray  # (city, city) per route card, only route cards of which both cities are on the map
+    route_card_scores: np.ndarray  # score per route card
+
+    @classmethod
+    def from_arrays(cls, **arrays):
+        """
+        Make map data from arrays (or lists) with the names of the fields, e.g. for generated maps
+        """
+        dtypes = {'city_names': str, 'city_coordinates': np.float64, 'connection_tunnels': bool}
+        fields = {}
+        for field in cls._fields:
+            array = np.array(arrays[field], dtype=dtypes.get(field, np.int64))
+            if field in ('city_coordinates', 'connection_cities', 'route_card_cities'):
+                array = array.reshape(-1, 2)
+            array.flags.writeable = False
+            fields[field] = array
+        return cls(**fields)
+
+    def route_card_data(self) -> list[tuple[str, str, int]]:
+        """
+        Route cards as (start city, end city, score) tuples
+        """
+        city_names = self.city_names.tolist()
+        return [(city_names[start], city_names[end], score)
+                for (start, end), score in zip(self.route_card_cities.tolist(), self.route_card_scores.tolist())]
+
+
+def parse_map(city_path: str = CITY_FILE_PATH, connection_path: str = CONNECTION_FILE_PATH,
+              route_card_path: str = ROUTE_CARDS_PATH, double_routes: bool = DOUBLE_ROUTES) -> MapData:
+    """
+    Read a map from the text files. Connections and route cards with a city that is not in the city file are skipped.
+    :param double_routes: If False only the first connection between two cities is read
+    """
+    city_names = []
+    city_coordinates = []
+    with open(city_path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            line_list = line.split()
+            city_names.append(line_list[0])
+            city_coordinates.append((float(line_list[1]), float(line_list[2])))
+    city_index = {city_name: idx for idx, city_name in enumerate(city_names)}
+
+    connections = {name: [] for name in ('cities', 'lengths', 'colours', 'jokers', 'tunnels')}
+    city_pairs = set([])
+    with open(connection_path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            line_list = line.split()
+            city1, city2 = line_list[0].split('-')[:2]
+            if city1 not in city_index or city2 not in city_index:
+                continue
+
+            city_pair = (min(city_index[city1], city_index[city2]), max(city_index[city1], city_index[city2]))
+            if not double_routes and city_pair in city_pairs:
+                continue
+            city_pairs.add(city_pair)
+
+            color = line_list[3]
+            is_ferry = color not in TRAIN_COLOURS and not color == GRAY_CONNECTION
+            connections['cities'].append((city_index[city1], city_index[city2]))
+            connections['lengths'].append(int(line_list[1].rpartition('(')[2].partition(')')[0]))
+            connections['colours'].append(-1 if is_ferry else CARD_CODES.get(color, -1))
+            connections['jokers'].append(int(color) if is_ferry else 0)
+            connections['tunnels'].append(line_list[2] == 'tunnel')
+
+    route_card_cities = []
+    route_card_scores = []
+    with open(route_card_path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            line_list = line.split()
+            start, end = line_list[0].split('-')[:2]
+            if start not in city_index or end not in city_index:
+                continue
+            route_card_cities.append((city_index[start], city_index[end]))
+            route_card_scores.append(int(line_list[1].rpartition('(')[2].partition(')')[0]))
+
+    return MapData.from_arrays(city_names=city_names, city_coordinates=city_coordinates,
+                               connection_cities=connections['cities'], connection_lengths=connections['lengths'],
+                               connection_colours=connections['colours'], connection_jokers=connections['jokers'],
+                               connection_tunnels=connections['tunnels'], route_card_cities=route_card_cities,
+                               route_card_scores=route_card_scores)
+
+
+def map_cache_key(city_path: str, connection_path: str, route_card_path: str, double_routes: bool) -> str:
+    """
+    Key of a compiled map, it changes when one of the text files is modified (size or modification time) or when the
+    colours that are encoded in the compiled file (the card colours and the gray colour) change in the config
+    """
+    key = [str(MAP_FORMAT_VERSION), str(double_routes), ','.join(CARD_COLOURS), GRAY_CONNECTION]
+    for path in (city_path, connection_path, route_card_path):
+        stat = os.stat(path)
+        key.extend([os.path.abspath(path), str(stat.st_mtime_ns), str(stat.st_size)])
+    return hashlib.sha1('\n'.join(key).encode('utf-8')).hexdigest()
+
+
+def load_map(city_path: str = CITY_FILE_PATH, connection_path: str = CONNECTION_FILE_PATH,
+             route_card_path: str = ROUTE_CARDS_PATH, double_routes: bool = DOUBLE_ROUTES,
+             cache_dir: str = MAP_CACHE_DIR) -> MapData:
+    """
+    Load a map, parsed from the text files only if it is not loaded by this process before and there is no compiled
+    file of it in cache_dir. A newly parsed map is written to cache_dir, so other processes and later runs can load it.
+    :param cache_dir: Directory of the compiled maps, None to never read or write compiled maps
+    """
+    key = map_cache_key(city_path, connection_path, route_card_path, double_routes)
+    if key in _loaded_maps:
+        return _loaded_maps[key]
+
+    cache_path = os.path.join(cache_dir, f'map-{key}.bin') if cache_dir is not None else None
+    if cache_path is not None and os.path.exists(cache_path):
+        map_data = read_map(cache_path)
+    else:
+        map_data = parse_map(city_path, connection_path, route_card_path, double_routes)
+        if cache_path is not None:
+            save_map(map_data, cache_path)
+
+    _loaded_maps[key] = map_data
+    return map_data
+
+
+def save_map(map_data: MapData, path: str):
+    """
+    Write map data as one binary file: the length of a JSON header (8 bytes), the header with the format version and
+    the dtype, shape and offset of every array, and the arrays at aligned offsets. The file is written under a
+    temporary name and renamed afterwards, so processes loading the map at the same time never see a partial file.
+    Failing to write is not an error, the map is then parsed again next time.
+    """
+    fields = {}
+    offset = 0
+    for field, array in map_data._asdict().items():
+        fields[field] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({'version': MAP_FORMAT_VERSION, 'fields': fields}).encode('utf-8')
+    data_start = -(-(8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(suffix='.bin', dir=os.path.dirname(path))
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(file_descriptor, 'wb') as f:
+            f.write(struct.pack('<Q', len(header)) + header)
+            for field, array in map_data._asdict().items():
+                f.seek(data_start + fields[field][2])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.chmod(temporary_path, 0o644)  # readable by other users, like a file that is not written with mkstemp
+        os.replace(temporary_path, path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def read_map(path: str) -> MapData:
+    """
+    Read map data written by save_map. The file is memory-mapped and the arrays are read-only views of it, so the
+    operating system shares the pages between all processes that load the map.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length, = struct.unpack_from('<Q', buffer)
+    header = json.loads(bytes(buffer[8:8 + header_length]).decode('utf-8'))
+    assert header['version'] == MAP_FORMAT_VERSION, f"Map {path} has format version {header['version']}, " \
+                                                    f"expected {MAP_FORMAT_VERSION}. EXITING..."
+    data_start = -(-(8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+    arrays = {}
+    for field, (dtype, shape, offset) in header['fields'].items():
+        count = int(np.prod(shape))
+        arrays[field] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + offset).reshape(shape)
+    return MapData(**arrays)
@@ -0,0 +1,257 @@
+"""
+Generator of random maps that look like the Europe map: cities in a plane, short connections that (almost) never
+cross, a few ferries, tunnels and double routes, and route cards scored by the length of their shortest route. Maps are
+written in the formats of the files in the data folder, so they are loaded like the Europe map.
+"""
+
+# packages
+import os
+
+import numpy as np
+
+from .MapData import MapData
+from ..Deck import TRAIN_COLOURS
+from ..search_alg.CSRGraph import CSRGraph
+from ..config import *
+
+# settings
+GRAY_CONNECTION = BOARD_CONFIG['GRAY_COLOUR']
+TRAIN_LENGTHS = sorted(BOARD_CONFIG['TRAIN_POINTS'].keys())  # lengths a connection can have
+LATITUDES = (35.0, 65.0)
+LONGITUDES = (-10.0, 45.0)
+MEAN_CONNECTION_LENGTH = 3  # trains of a connection of average distance
+NEAREST_NEIGHBOURS = 8  # candidate connections per city
+ROW_CHUNK = 512  # rows of the distance matrix computed at once
+ROUTE_CARDS_PER_START = 4  # at most, route cards from the same start city per search
+
+
+def nearest_neighbours(coordinates: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k nearest other cities of every city, the distance matrix is computed in chunks of rows
+    """
+    k = min(k, len(coordinates) - 1)
+    neighbours = np.zeros((len(coordinates), k), dtype=np.int64)
+    for start in range(0, len(coordinates), ROW_CHUNK):
+        rows = coordinates[start:start + ROW_CHUNK]
+        distances = np.linalg.norm(rows[:, None, :] - coordinates[None, :, :], axis=2)
+        distances[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        neighbours[start:start + len(rows)] = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return neighbours
+
+
+class _PlanarEdges(object):
+    """
+        Edges added to the map so far, with a test whether a new edge crosses one of them. Edges are stored per cell of
+        a grid that their bounding box overlaps, so only the edges near a new edge are tested (vectorized).
+    """
+
+    def __init__(self, coordinates: np.ndarray, cell_size: float):
+        self.coordinates = coordinates
+        self.cell_size = cell_size
+        self.edges = []
+        self.grid = {}  # (row, column) -> indices of edges that overlap the cell
+
+    def cells(self, city1: int, city2: int):
+        low = np.floor(np.minimum(self.coordinates[city1], self.coordinates[city2]) / self.cell_size).astype(int)
+        high = np.floor(np.maximum(self.coordinates[city1], self.coordinates[city2]) / self.cell_size).astype(int)
+        return [(row, column) for row in range(low[0], high[0] + 1) for column in range(low[1], high[1] + 1)]
+
+    def crosses(self, city1: int, city2: int) -> bool:
+        nearby = {idx for cell in self.cells(city1, city2) for idx in self.grid.get(cell, [])}
+        # edges that share a city with the new edge do not cross it
+        edges = np.array([self.edges[idx] for idx in nearby
+                          if city1 not in self.edges[idx] and city2 not in self.edges[idx]], dtype=np.int64)
+        if len(edges) == 0:
+            return False
+        p1, p2 = self.coordinates[edges[:, 0]], self.coordinates[edges[:, 1]]
+        q1, q2 = self.coordinates[city1], self.coordinates[city2]
+
+        def orientation(a, b, c):
+            return (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+
+        crossing = (orientation(p1, p2, q1) * orientation(p1, p2, q2) < 0) & \
+                   (orientation(q1, q2, p1) * orientation(q1, q2, p2) < 0)
+        return bool(crossing.any())
+
+    def add(self, city1: int, city2: int):
+        for cell in self.cells(city1, city2):
+            self.grid.setdefault(cell, []).append(len(self.edges))
+        self.edges.append((city1, city2))
+
+
+def _find(parents: list[int], city: int) -> int:
+    while parents[city] != city:
+        parents[city] = parents[parents[city]]
+        city = parents[city]
+    return city
+
+
+def generate_connections(coordinates: np.ndarray, num_connections: int) -> list[tuple[int, int]]:
+    """
+    Choose city pairs to connect: first a spanning tree of the shortest candidate connections, then more short
+    connections that do not cross earlier ones, until there are num_connections. If the candidates do not connect all
+    cities, the closest cities of the remaining parts are connected, even if that crosses other connections.
+    :return: List of (city, city) tuples
+    """
+    num_cities = len(coordinates)
+    neighbours = nearest_neighbours(coordinates, NEAREST_NEIGHBOURS)
+    candidates = {(min(city, neighbour), max(city, neighbour))
+                  for city in range(num_cities) for neighbour in neighbours[city].tolist()}
+    candidates = sorted(candidates)
+    distances = np.linalg.norm(coordinates[[city1 for city1, _ in candidates]] -
+                               coordinates[[city2 for _, city2 in candidates]], axis=1)
+    candidates = [candidates[idx] for idx in np.argsort(distances, kind='stable').tolist()]
+
+    edges = _PlanarEdges(coordinates, cell_size=float(np.median(distances)))
+    parents = list(range(num_cities))
+    connections = []
+    remaining = []
+    for city1, city2 in candidates:
+        root1, root2 = _find(parents, city1), _find(parents, city2)
+        if root1 != root2 and not edges.crosses(city1, city2):
+            parents[root1] = root2
+            edges.add(city1, city2)
+            connections.append((city1, city2))
+        else:
+            remaining.append((city1, city2))
+
+    for city1, city2 in remaining:
+        if len(connections) >= num_connections:
+            break
+        if not edges.crosses(city1, city2):
+            parents[_find(parents, city1)] = _find(parents, city2)
+            edges.add(city1, city2)
+            connections.append((city1, city2))
+
+    # connect the parts the candidates did not connect
+    roots = np.array([_find(parents, city) for city in range(num_cities)])
+    while len(set(roots.tolist())) > 1:
+        part = np.flatnonzero(roots == roots[0])
+        rest = np.flatnonzero(roots != roots[0])
+        distances = np.linalg.norm(coordinates[part][:, None, :] - coordinates[rest][None, :, :], axis=2)
+        idx1, idx2 = np.unravel_index(np.argmin(distances), distances.shape)
+        city1, city2 = int(part[idx1]), int(rest[idx2])
+        edges.add(city1, city2)
+        connections.append((city1, city2))
+        roots[roots == roots[city2]] = roots[0]
+
+    return connections
+
+
+def generate_map(num_cities: int, num_connections: int = None, num_route_cards: int = None,
+                 gray_fraction: float = 0.25, ferry_fraction: float = 0.05, tunnel_fraction: float = 0.1,
+                 double_fraction: float = 0.1, route_card_scores_range: tuple[int, int] = (5, 21),
+                 seed: int = None) -> MapData:
+    """
+    Generate a random map, the same seed gives the same map
+    :param num_cities: Number of cities
+    :param num_connections: Number of city pairs that are connected, without the second connections of double routes,
+    by default twice the number of cities
+    :param num_route_cards: Number of route cards, by default twice the number of cities. Fewer route cards are made
+    if there are not enough pairs of cities at a distance in route_card_scores_range.
+    :param gray_fraction: Part of the connections that can be claimed with cards of any colour
+    :param ferry_fraction: Part of the connections that are ferries, which need 1 or 2 jokers
+    :param tunnel_fraction: Part of the connections that are tunnels
+    :param double_fraction: Part of the connections that are double routes, with a second connection of another colour
+    :param route_card_scores_range: Minimum and maximum score (number of trains of the shortest route) of a route card
+    :return: Map data with the cities, connections and route cards
+    """
+    assert num_cities >= 2, "A map needs at least two cities. EXITING..."
+    rng = np.random.default_rng(seed)
+    num_connections = num_connections if num_connections is not None else 2 * num_cities
+    num_route_cards = num_route_cards if num_route_cards is not None else 2 * num_cities
+
+    city_names = [f'City{idx:0{len(str(num_cities - 1))}d}' for idx in range(num_cities)]
+    coordinates = np.column_stack((rng.uniform(*LATITUDES, num_cities), rng.uniform(*LONGITUDES, num_cities)))
+
+    pairs = generate_connections(coordinates, num_connections)
+    distances = np.array([np.linalg.norm(coordinates[city1] - coordinates[city2]) for city1, city2 in pairs])
+    scaled_distances = distances / distances.mean() * MEAN_CONNECTION_LENGTH
+    lengths = np.array(TRAIN_LENGTHS)[np.abs(scaled_distances[:, None] - np.array(TRAIN_LENGTHS)[None, :])
+                                      .argmin(axis=1)]
+
+    connections = {name: [] for name in ('cities', 'lengths', 'colours', 'jokers', 'tunnels')}
+    for (city1, city2), length in zip(pairs, lengths.tolist()):
+        kind = rng.random()
+        is_ferry = kind < ferry_fraction
+        is_tunnel = not is_ferry and kind < ferry_fraction + tunnel_fraction
+        num_copies = 2 if rng.random() < double_fraction else 1
+        colours = rng.choice(len(TRAIN_COLOURS), size=num_copies, replace=False).tolist()
+        for colour in colours:
+            connections['cities'].append((city1, city2))
+            connections['lengths'].append(length)
+            connections['colours'].append(-1 if is_ferry or rng.random() < gray_fraction else colour)
+            connections['jokers'].append(int(rng.integers(1, min(2, length) + 1)) if is_ferry else 0)
+            connections['tunnels'].append(is_tunnel)
+
+    # route cards from random start cities to random cities at a distance in the range of the scores, scored by the
+    # number of trains of their shortest route, a few route cards share a start city so one search scores all of them
+    adjacency = [[] for _ in range(num_cities)]
+    for idx, (city1, city2) in enumerate(connections['cities']):
+        adjacency[city1].append((city2, idx))
+        adjacency[city2].append((city1, idx))
+    graph = CSRGraph(adjacency)
+    edge_weights = np.array(connections['lengths'], dtype=np.float64)
+
+    route_card_cities = []
+    route_card_scores = []
+    used_pairs = set([])
+    min_score, max_score = route_card_scores_range
+    for start in rng.permutation(np.tile(np.arange(num_cities), -(-num_route_cards // num_cities))).tolist():
+        if len(route_card_cities) >= num_route_cards:
+            break
+        distances = np.array(graph.distances_from(start, edge_weights, max_distance=max_score))
+        ends = np.flatnonzero((distances >= min_score) & (distances <= max_score))
+        for end in rng.permutation(ends)[:ROUTE_CARDS_PER_START].tolist():
+            pair = (min(start, end), max(start, end))
+            if pair in used_pairs or len(route_card_cities) >= num_route_cards:
+                continue
+            used_pairs.add(pair)
+            route_card_cities.append(pair)
+            route_card_scores.append(int(distances[end]))
+
+    return MapData.from_arrays(city_names=city_names, city_coordinates=coordinates,
+                               connection_cities=connections['cities'], connection_lengths=connections['lengths'],
+                               connection_colours=connections['colours'], connection_jokers=connections['jokers'],
+                               connection_tunnels=connections['tunnels'], route_card_cities=route_card_cities,
+                               route_card_scores=route_card_scores)
+
+
+def write_map(map_data: MapData, directory: str) -> tuple[str, str, str]:
+    """
+    Write a map in the formats of the text files in the data folder, see parse_map
+    :return: Paths of the city, connection and route card files
+    """
+    os.makedirs(directory, exist_ok=True)
+    city_path = os.path.join(directory, 'cities.txt')
+    connection_path = os.path.join(directory, 'train_connections.txt')
+    route_card_path = os.path.join(directory, 'route_cards.txt')
+    city_names = map_data.city_names.tolist()
+
+    with open(city_path, mode='w', encoding='utf-8') as f:
+        for city_name, (latitude, longitude) in zip(city_names, map_data.city_coordinates.tolist()):
+            f.write(f'{city_name}\t{latitude:.4f}\t{longitude:.4f}\n')
+
+    pair_counts = {}
+    for city1, city2 in map_data.connection_cities.tolist():
+        pair_counts[(city1, city2)] = pair_counts.get((city1, city2), 0) + 1
+
+    with open(connection_path, mode='w', encoding='utf-8') as f:
+        for (city1, city2), length, colour, num_jokers, tunnel in zip(map_data.connection_cities.tolist(),
+                                                                      map_data.connection_lengths.tolist(),
+                                                                      map_data.connection_colours.tolist(),
+                                                                      map_data.connection_jokers.tolist(),
+                                                                      map_data.connection_tunnels.tolist()):
+            if num_jokers > 0:
+                kind, colour_column = 'ferry', str(num_jokers)
+            else:
+                kind = 'tunnel' if tunnel else 'train'
+                colour_column = TRAIN_COLOURS[colour] if colour >= 0 else GRAY_CONNECTION
+            double = int(pair_counts[(city1, city2)] > 1)
+            f.write(f'{city_names[city1]}-{city_names[city2]}\t({length})\t{kind}\t{colour_column}\t{double}\n')
+
+    with open(route_card_path, mode='w', encoding='utf-8') as f:
+        for (start, end), score in zip(map_data.route_card_cities.tolist(), map_data.route_card_scores.tolist()):
+            f.write(f'{city_names[start]}-{city_names[end]}\t({score})\n')
+
+    return city_path, connection_path, route_card_path
@@ -0,0 +1,190 @@
+"""
+Opt-in timers and counters for the hot paths of a game, aggregated per phase over a run and exported as JSON and as
+folded stacks for flame graphs
+"""
+
+# packages
+import collections
+import json
+import threading
+import time
+
+NUM_BUCKETS = 32  # bucket k of a histogram counts durations in [2^(k-1), 2^k) microseconds, the last one the rest
+
+
+class _Phase(object):
+    """
+        Context manager that times one call of a phase on the stack of the profiler
+    """
+    __slots__ = ('profiler', 'name', 'start', 'child_time')
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler.stack
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+        self.profiler.record(self.name, elapsed, elapsed - self.child_time,
+                             ';'.join([phase.name for phase in stack] + [self.name]))
+        return False
+
+
+class _DisabledPhase(object):
+    """
+        Context manager of a disabled profiler, does nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_DISABLED_PHASE = _DisabledPhase()
+
+
+class PhaseStats(object):
+    """
+        Number of calls, total, self (without nested phases) and maximum time and a histogram of the durations of a
+        phase
+    """
+    __slots__ = ('calls', 'total', 'self_time', 'max', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.max = 0.0
+        self.histogram = [0] * NUM_BUCKETS
+
+    def add(self, elapsed: float, self_time: float):
+        self.calls += 1
+        self.total += elapsed
+        self.self_time += self_time
+        self.max = max(self.max, elapsed)
+        self.histogram[min(int(elapsed * 1e6).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Upper bound of the bucket of the histogram that contains the percentile, in seconds
+        """
+        rank = fraction * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** bucket * 1e-6, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'total_ms': self.total * 1e3,
+            'self_ms': self.self_time * 1e3,
+            'mean_us': self.total / self.calls * 1e6 if self.calls else 0.0,
+            'p50_us': self.percentile(0.5) * 1e6,
+            'p99_us': self.percentile(0.99) * 1e6,
+            'max_us': self.max * 1e6,
+            'histogram_us': {f'<{2 ** bucket}': count for bucket, count in enumerate(self.histogram) if count},
+        }
+
+
+class Profiler(object):
+
+    def __init__(self, enabled: bool = False):
+        """
+        Collects the time of the phases of a game. Code is instrumented with `with profiler.phase(name):` blocks,
+        which can be nested; a disabled profiler returns a context manager that does nothing, so instrumented code
+        costs one method call per phase when profiling is off. Every thread has its own stack of phases, e.g. the
+        window and the worker thread that plays the game, as long as the threads time phases with different names.
+        :param enabled: True to time the phases, a game without profiler uses a disabled one
+        """
+        self.enabled = enabled
+        self.thread_stacks = {}  # thread id -> phases that are running in the thread, outermost first
+        self.phases = collections.defaultdict(PhaseStats)  # phase name -> PhaseStats
+        self.stacks = collections.Counter()  # folded stack, e.g. 'turn;choose_action' -> self time in seconds
+        self.counters = collections.Counter()
+
+    @property
+    def stack(self) -> list:
+        """
+        Phases that are running in the current thread, outermost first
+        """
+        return self.thread_stacks.setdefault(threading.get_ident(), [])
+
+    def phase(self, name: str):
+        """
+        Context manager that times the block as a phase, nested in the phases that are running
+        """
+        if not self.enabled:
+            return _DISABLED_PHASE
+        return _Phase(self, name)
+
+    def count(self, name: str, value: int = 1):
+        """
+        Increase a counter, e.g. the number of items processed in a phase
+        """
+        if self.enabled:
+            self.counters[name] += value
+
+    def record(self, name: str, elapsed: float, self_time: float, stack: str):
+        self.phases[name].add(elapsed, self_time)
+        self.stacks[stack] += self_time
+
+    def reset(self):
+        """
+        Remove everything that is collected so far
+        """
+        self.thread_stacks = {}
+        self.phases.clear()
+        self.stacks.clear()
+        self.counters.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Statistics of every phase and the counters, e.g. to write them as JSON
+        """
+        return {
+            'phases': {name: stats.to_dict() for name, stats in sorted(self.phases.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def write_json(self, path: str):
+        with open(path, mode='w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def write_folded(self, path: str):
+        """
+        Write the self time of every stack of phases in microseconds, one 'outer;inner time' line per stack, the
+        input format of flamegraph.pl and speedscope
+        """
+        with open(path, mode='w', encoding='utf-8') as f:
+            for stack, self_time in sorted(self.stacks.items()):
+                f.write(f'{stack} {max(int(round(self_time * 1e6)), 0)}\n')
+
+    def summary(self) -> str:
+        """
+        Table of the phases, slowest total time first
+        """
+        lines = [f"{'phase':<40}{'calls':>10}{'total (ms)':>14}{'self (ms)':>14}{'mean (us)':>12}{'p99 (us)':>12}"
+                 f"{'max (us)':>12}"]
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].total):
+            values = stats.to_dict()
+            lines.append(f"{name:<40}{stats.calls:>10}{values['total_ms']:>14.3f}{values['self_ms']:>14.3f}"
+                         f"{values['mean_us']:>12.1f}{values['p99_us']:>12.1f}{values['max_us']:>12.1f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<40}{value:>10}")
+        return '\n'.join(lines)
@@ -0,0 +1,117 @@
+"""
+Integer indexed graph in compressed sparse row (CSR) format, searched with Dijkstra on an array of edge weights
+"""
+
+# packages
+import heapq
+from math import inf
+
+import numpy as np
+
+
+class CSRGraph(object):
+    """
+        This class stores the adjacency of every node as a slice of flat neighbor and edge arrays. The structure is
+        built once, the weights of the edges are passed per search so one graph serves every agent.
+    """
+
+    def __init__(self, adjacency: list[list[tuple[int, int]]]):
+        """
+            :param adjacency: For every node a list of (neighbor, edge id) tuples, nodes are the integers
+            0, ..., len(adjacency) - 1 and the weight of an edge is looked up by its id
+        """
+        self.num_nodes = len(adjacency)
+
+        self.indptr = np.cumsum([0] + [len(neighbors) for neighbors in adjacency])
+        self.neighbors = np.array([neighbor for neighbors in adjacency for neighbor, _ in neighbors], dtype=np.int64)
+        self.edge_ids = np.array([edge_id for neighbors in adjacency for _, edge_id in neighbors], dtype=np.int64)
+
+        # plain lists for the search loop, indexing numpy arrays element-wise is slow
+        self._indptr = self.indptr.tolist()
+        self._neighbors = self.neighbors.tolist()
+        self._edge_ids = self.edge_ids.tolist()
+
+        # search state, only reset (not reallocated) between searches
+        self.distances = [inf] * self.num_nodes
+        self.parent_edges = [-1] * self.num_nodes
+        self.parents = [-1] * self.num_nodes
+
+    def reset(self):
+        self.distances[:] = [inf] * self.num_nodes
+        self.parent_edges[:] = [-1] * self.num_nodes
+        self.parents[:] = [-1] * self.num_nodes
+
+    def search(self, start: int, target: int, edge_weights: np.ndarray) -> list[int]:
+        """
+            Dijkstra from start until target is settled
+            :param start: Start node
+            :param target: Target node
+            :param edge_weights: Weight per edge id, np.inf for edges that may not be used
+            :return: Edge ids of a shortest path from start to target, empty if there is none
+        """
+        self.reset()
+        weights = edge_weights.tolist()
+        distances = self.distances
+        indptr = self._indptr
+        neighbors = self._neighbors
+        edge_ids = self._edge_ids
+
+        distances[start] = 0
+        opened = [(0, start)]
+        while opened:
+            distance, node = heapq.heappop(opened)
+            if distance > distances[node]:
+                continue  # outdated entry
+            if node == target:
+                break
+            for idx in range(indptr[node], indptr[node + 1]):
+                new_distance = distance + weights[edge_ids[idx]]
+                neighbor = neighbors[idx]
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    self.parents[neighbor] = node
+                    self.parent_edges[neighbor] = edge_ids[idx]
+                    heapq.heappush(opened, (new_distance, neighbor))
+
+        if distances[target] == inf:
+            return []
+
+        path = []
+        node = target
+        while node != start:
+            path.append(self.parent_edges[node])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def distances_from(self, start: int, edge_weights: np.ndarray, max_distance: float = inf) -> list[float]:
+        """
+            Dijkstra from start until all nodes within max_distance are settled
+            :param start: Start node
+            :param edge_weights: Weight per edge id, np.inf for edges that may not be used
+            :param max_distance: Distances larger than this are not needed, they may be too large or inf
+            :return: Distance from start to every node, inf for nodes that cannot be reached
+        """
+        self.reset()
+        weights = edge_weights.tolist()
+        distances = self.distances
+        indptr = self._indptr
+        neighbors = self._neighbors
+        edge_ids = self._edge_ids
+
+        distances[start] = 0
+        opened = [(0, start)]
+        while opened:
+            distance, node = heapq.heappop(opened)
+            if distance > distances[node]:
+                continue  # outdated entry
+            if distance > max_distance:
+                break
+            for idx in range(indptr[node], indptr[node + 1]):
+                new_distance = distance + weights[edge_ids[idx]]
+                neighbor = neighbors[idx]
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    heapq.heappush(opened, (new_distance, neighbor))
+
+        return list(distances)
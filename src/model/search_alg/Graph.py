@@ -3,6 +3,8 @@ The code in this class is adapted from: https://github.com/AndreasSoularidis/med
 """
 
 # packages
+import heapq
+
 from ..search_alg.Node import Node
 
 
@@ -14,21 +16,24 @@ class Graph:
     def __init__(self, nodes: list[Node] = None):
         self.start = None
         self.target = None
-        self.opened = []
-        self.closed = []
+        self.opened = []  # binary heap of (heuristic value, name, node), outdated entries are skipped when popped
+        self.opened_names = set([])
+        self.closed = set([])
 
         self.number_of_steps = 0
         if nodes is None:
             self.nodes = []
         else:
             self.nodes = nodes
+        self.node_dict = {node.name: node for node in self.nodes}
 
     def setup(self, start: str, target: str):
         self.start = self.find_node(start)
         self.target = self.find_node(target)
         self.number_of_steps = 0
         self.opened = []
-        self.closed = []
+        self.opened_names = set([])
+        self.closed = set([])
         for node in self.nodes:
             node.reset()
 
@@ -37,15 +42,13 @@ class Graph:
             Add a new node (vertex) in the graph
         """
         self.nodes.append(node)
+        self.node_dict[node.name] = node
 
     def find_node(self, node_name: str):
         """
-            Return True if the node with the given value exist in the graph. Otherwise, it returns False
+            Return the node with the given value if it exists in the graph. Otherwise, it returns None
         """
-        for node in self.nodes:
-            if node.name == node_name:
-                return node
-        return None
+        return self.node_dict.get(node_name)
 
     def add_edge(self, value1: str, value2: str, weight: int = 1):
         """
@@ -96,48 +99,51 @@ class Graph:
           and is smaller than the new value, the method return the old value. Otherwise, the method return the new value
           and note the parent as the parent node of child
         """
-        for neighbor in parent.neighbors:
-            if neighbor[0] == child:
-                distance = parent.heuristic_value + neighbor[1]
-                if distance < child.heuristic_value:
-                    child.parent = parent
-                    return distance
+        distance = min(parent.heuristic_value + weight for neighbor, weight in parent.neighbors if neighbor is child)
+        if distance < child.heuristic_value:
+            child.parent = parent
+            return distance
 
-                return child.heuristic_value
+        return child.heuristic_value
 
     def insert_to_list(self, list_category: str, node: Node):
         """
-          Insert a node in the proper list (opened or closed) according to list_category
+          Insert a node in the proper list (opened or closed) according to list_category. A node that is already in
+          the opened heap is pushed again with its new heuristic value, the old entry is skipped once popped.
         """
         if list_category == "open":
-            self.opened.append(node)
+            heapq.heappush(self.opened, (node.heuristic_value, node.name, node))
+            self.opened_names.add(node.name)
         else:
-            self.closed.append(node)
+            self.closed.add(node.name)
 
     def remove_from_opened(self) -> Node:
         """
-          Remove the node with the smallest heuristic value from the opened list
-          Then add the removed node to the closed list
+          Remove the node with the smallest heuristic value from the opened heap
+          Then add the removed node to the closed set
         """
-        self.opened.sort()
-        node = self.opened.pop(0)
-        self.closed.append(node)
-        return node
+        while self.opened:
+            heuristic_value, name, node = heapq.heappop(self.opened)
+            if name in self.closed or heuristic_value > node.heuristic_value:
+                continue  # outdated entry
+            self.opened_names.discard(name)
+            self.closed.add(name)
+            return node
+        return None
 
     def opened_is_empty(self) -> bool:
         """
-          Check if the list opened is empty, so no solution found
+          Check if the opened heap is empty, so no solution found
         """
-        return len(self.opened) == 0
+        return len(self.opened_names) == 0
 
     def get_old_node(self, node_value: str):
         """
-          Return the node with the given value from the opened list,
+          Return the node with the given value from the opened heap,
           to compare its heuristic_value with a node with the same value
         """
-        for node in self.opened:
-            if node.name == node_value:
-                return node
+        if node_value in self.opened_names:
+            return self.node_dict[node_value]
         return None
 
     def calculate_path(self, target_node: Node) -> list[str]:
@@ -149,9 +155,7 @@ class Graph:
         node = target_node.parent
         while True:
             if node is None:
-                print(f"path = {path}")
-                print(f"node = {node}")
-                print(f"start = {self.start}, target = {self.target}")
+                raise ValueError(f"No path from {self.start} to {self.target}: {target_node.name} has no parent")
             path.append(node.name)
             if node.parent is None:
                 break
@@ -162,12 +166,12 @@ class Graph:
     def search(self):
         """
           Is the main algorithm. Search for a solution in the solution space of the problem
-          Stops if the opened list is empty, so no solution found or if it finds a solution.
+          Stops if the opened heap is empty, so no solution found or if it finds a solution.
         """
         # The heuristic value of the starting node is zero
         self.start.heuristic_value = 0
-        # Add the starting point to opened list
-        self.opened.append(self.start)
+        # Add the starting point to opened heap
+        self.insert_to_list("open", self.start)
 
         while True:
             self.number_of_steps += 1
@@ -178,24 +182,19 @@ class Graph:
 
             selected_node = self.remove_from_opened()
             # check if the selected_node is the solution
-            if selected_node == self.target:
+            if selected_node is self.target:
                 path = self.calculate_path(selected_node)
                 return path, self.number_of_steps
 
-            # extend the node
-            new_nodes = selected_node.extend_node()
-
-            # add the extended nodes in the list opened
-            if len(new_nodes) > 0:
-                for new_node in new_nodes:
-                    new_node.heuristic_value = self.calculate_distance(selected_node, new_node)
-                    if new_node not in self.closed and new_node not in self.opened:
-                        self.insert_to_list("open", new_node)
-                    elif new_node in self.opened and new_node.parent != selected_node:
-                        old_node = self.get_old_node(new_node.name)
-                        if new_node.heuristic_value < old_node.heuristic_value:
-                            new_node.parent = selected_node
-                            self.insert_to_list("open", new_node)
+            # relax the edges of the node and (re-)insert improved nodes in the opened heap
+            for new_node, weight in selected_node.neighbors:
+                if new_node.name in self.closed:
+                    continue
+                distance = selected_node.heuristic_value + weight
+                if distance < new_node.heuristic_value:
+                    new_node.heuristic_value = distance
+                    new_node.parent = selected_node
+                    self.insert_to_list("open", new_node)
 
     def get_shortest_route(self) -> list[str]:
         """
@@ -0,0 +1,74 @@
+"""
+All-pairs shortest paths on a graph of integer indexed nodes, used to look up routes without a new search per route
+"""
+
+# packages
+import numpy as np
+
+
+class AllPairsShortestPaths(object):
+    """
+        This class stores the distance and the next node on a shortest path for every pair of nodes.
+    """
+
+    def __init__(self, num_nodes: int):
+        self.num_nodes = num_nodes
+        self.distances = np.full((num_nodes, num_nodes), np.inf)
+        self.next_node = np.full((num_nodes, num_nodes), -1, dtype=np.int64)
+
+    def compute(self, weights: np.ndarray):
+        """
+            Floyd-Warshall on a symmetric weight matrix, weights[i, j] is np.inf if there is no edge between i and j
+        """
+        nodes = np.arange(self.num_nodes)
+        distances = weights.astype(float)
+        next_node = np.where(np.isfinite(distances), nodes[None, :], -1)
+        distances[nodes, nodes] = 0
+        next_node[nodes, nodes] = nodes
+
+        for via in range(self.num_nodes):
+            through_via = distances[:, via, None] + distances[None, via, :]
+            shorter = through_via < distances
+            distances = np.where(shorter, through_via, distances)
+            next_node = np.where(shorter, next_node[:, via, None], next_node)
+
+        self.distances = distances
+        self.next_node = next_node
+
+    def relax_edge(self, node1: int, node2: int, weight: float):
+        """
+            Update the table after the edge between node1 and node2 got a lower weight (or was added), in O(n^2)
+            instead of running Floyd-Warshall again. Only pairs that get strictly shorter through the edge change.
+        """
+        nodes = np.arange(self.num_nodes)
+        distances = self.distances
+        next_node = self.next_node
+        for start, end in ((node1, node2), (node2, node1)):
+            # paths i -> start -> end -> j, the first hop of i == start is the edge itself
+            through_edge = distances[:, start, None] + weight + distances[None, end, :]
+            first_hop = np.where(nodes == start, end, next_node[:, start])
+            shorter = through_edge < distances
+            distances = np.where(shorter, through_edge, distances)
+            next_node = np.where(shorter, first_hop[:, None], next_node)
+
+        self.distances = distances
+        self.next_node = next_node
+
+    def distance(self, start: int, target: int) -> float:
+        """
+            Length of the shortest path between start and target, np.inf if they are not connected
+        """
+        return self.distances[start, target]
+
+    def get_path(self, start: int, target: int) -> list[int]:
+        """
+            Return the shortest path from start to target as a list of nodes, empty if they are not connected
+        """
+        if self.next_node[start, target] < 0:
+            return []
+
+        path = [start]
+        while start != target:
+            start = int(self.next_node[start, target])
+            path.append(start)
+        return path
@@ -0,0 +1,274 @@
+"""
+Compact Kripke model where the hand of every agent is encoded as an integer bitmask over the route cards
+"""
+
+# packages
+import itertools
+import numpy as np
+
+from ..ttr_kripke.World import World
+from ..ttr_kripke.Partition import Partition
+from ..ttr_kripke.enumeration import count_worlds, hand_mask_array
+from ..events import EventLog, MessageEvent, AnnouncementEvent
+from ..config import *
+
+MAX_ROUTE_CARDS = KRIPKE_CONFIG['MAX_BITMASK_ROUTE_CARDS']
+MAX_WORLDS = KRIPKE_CONFIG['MAX_WORLDS']
+
+
+class BitmaskKripke(object):
+
+    def __init__(self, agent_ids: list[int], route_cards_ids: list[str], max_worlds: int = MAX_WORLDS,
+                 events: EventLog = None, progress=None):
+        """
+        Initialization of the bitmask Kripke model. Every world is a row of a uint64 array with one column per agent,
+        bit i of a column is set if the agent holds route card route_cards_ids[i].
+        :param agent_ids: List of all agent id's
+        :param route_cards_ids: List of all route card id's
+        :param max_worlds: Maximum number of worlds that may be allocated, None for no limit
+        :param events: Event log for the messages of the model, disabled if None
+        :param progress: Function called with ('worlds', done, total) while the worlds are built, see TicketToRide
+        """
+        assert len(route_cards_ids) <= MAX_ROUTE_CARDS, \
+            f"At most {MAX_ROUTE_CARDS} route cards fit in a bitmask. EXITING..."
+
+        self.agent_ids = agent_ids
+        self.events = events if events is not None else EventLog()
+        self.progress = progress
+        self.route_cards_ids = route_cards_ids
+        self.max_worlds = max_worlds
+        self.agent_index = {agent_id: idx for idx, agent_id in enumerate(agent_ids)}
+        self.card_bits = {route_card: 1 << idx for idx, route_card in enumerate(route_cards_ids)}
+        self.hands = np.zeros((0, len(agent_ids)), dtype=np.uint64)
+        self.known_hands = {}  # agent_id -> bitmask of its own hand, once the agent has seen it
+        self.partitions = {}
+
+        self._world_views = None
+        self._relation_views = None
+
+        self._init_worlds()
+        self._init_relations()
+
+    def _init_worlds(self):
+        """
+        Initialize worlds by dealing the route cards to the agents, the number of worlds is reported before allocating
+        """
+        num_worlds = count_worlds(len(self.route_cards_ids), len(self.agent_ids))
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"- Initializing worlds... -> Number of Kripke worlds = {num_worlds}"))
+        assert self.max_worlds is None or num_worlds <= self.max_worlds, \
+            f"Number of worlds exceeds the maximum of {self.max_worlds}. EXITING..."
+
+        if self.progress is not None:
+            self.progress('worlds', 0, num_worlds)
+        self.hands = hand_mask_array(len(self.route_cards_ids), len(self.agent_ids))
+        if self.progress is not None:
+            self.progress('worlds', num_worlds, num_worlds)
+
+    def _init_relations(self):
+        """
+        Initialize relations for all worlds before agents knows their own card. The relation of every agent is stored
+        as a partition of the worlds into equivalence classes, the list of (world, world) tuples is built on demand.
+        """
+        for agent_id in self.agent_ids:
+            self.partitions[agent_id] = Partition(self.num_worlds)
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"- Initializing relations... -> Number of relations per agent = "
+                                          f"{self.num_worlds ** 2}\n"))
+
+    @property
+    def num_worlds(self) -> int:
+        return self.hands.shape[0]
+
+    def cards_to_mask(self, route_cards: set[str]) -> int:
+        """
+        Convert a set of route card names to its bitmask
+        """
+        mask = 0
+        for route_card in route_cards:
+            mask |= self.card_bits[route_card]
+        return mask
+
+    def mask_to_cards(self, mask: int) -> set[str]:
+        """
+        Convert a bitmask to the set of route card names it represents
+        """
+        mask = int(mask)
+        return {route_card for route_card, bit in self.card_bits.items() if mask & bit}
+
+    def considered_worlds(self, agent_id: int) -> np.ndarray:
+        """
+        Boolean array over all worlds that is True for the worlds agent_id considers possible given its own hand
+        """
+        if agent_id not in self.known_hands:
+            return np.ones(self.num_worlds, dtype=bool)
+        return self.hands[:, self.agent_index[agent_id]] == np.uint64(self.known_hands[agent_id])
+
+    def _keep_worlds(self, keep: np.ndarray):
+        """
+        Remove all worlds (and thereby all their relations) for which keep is False
+        """
+        self.hands = self.hands[keep]
+        for partition in self.partitions.values():
+            partition.restrict(keep)
+        self._invalidate_views()
+
+    def _invalidate_views(self):
+        self._world_views = None
+        self._relation_views = None
+
+    def update_once_cards_known(self, agent_id: int, route_cards: set[str]):
+        """
+        Update relations for agent_id that knows that target_agent has route_cards
+        :param agent_id: Id of agent for which relations will be updated
+        :param route_cards: Route cards of which agent knows
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'own_cards'))
+
+        # relations of agent_id only remain between worlds in which it has the same hand
+        self.known_hands[agent_id] = self.cards_to_mask(route_cards)
+        self.partitions[agent_id].refine(self.hands[:, self.agent_index[agent_id]])
+        self._invalidate_views()
+
+        if len(self.agent_ids) == 2:
+            # In case of two agents, all route cards are publicly known
+            self.public_announcement_route_card(agent_id, route_cards)
+
+    def public_announcement_possibilities(self, agent_id: int, route_cards: set[str]):
+        """
+        Function that publicly announces the states agents think of as possible true states
+        :param agent_id: Agent that announces possibilities
+        :param route_cards: Route cards of which there will be an announcement
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'one_of'))
+
+        if len(route_cards) == 1:
+            self.public_announcement_route_card(agent_id, route_cards)
+
+        mask = np.uint64(self.cards_to_mask(route_cards))
+        self._keep_worlds((self.hands[:, self.agent_index[agent_id]] & mask) != 0)
+
+    def public_announcement_route_card(self, agent_id: int, route_card: set[str]):
+        """
+        Method to do a public announcement of a route card and remove worlds that are no longer possible
+        :param agent_id: Agent that has route card
+        :param route_card: Route card that is being announced
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_card, 'card'))
+
+        mask = np.uint64(self.cards_to_mask(route_card))
+        self._keep_worlds((self.hands[:, self.agent_index[agent_id]] & mask) == mask)
+
+    def get_known_route_cards(self, agent_id: int, target_agent_id: int) -> list[str]:
+        """
+        Function to retrieve the cards that one agent knows another agent has.
+        :param agent_id: Agent of which the worlds are considered
+        :param target_agent_id: Agent Id of which the agent knows the cards
+        :return: List containing knows cards in string representation
+        """
+        target_hands = self.hands[self.considered_worlds(agent_id), self.agent_index[target_agent_id]]
+        if target_hands.size == 0:
+            return []
+
+        known_mask = int(np.bitwise_and.reduce(target_hands))
+        return [route_card for route_card in self.route_cards_ids if known_mask & self.card_bits[route_card]]
+
+    def are_related(self, agent_id: int, world_idx1: int, world_idx2: int) -> bool:
+        """
+        Returns True if agent_id cannot distinguish the worlds at the two given indices
+        """
+        return self.partitions[agent_id].are_related(world_idx1, world_idx2)
+
+    def accessible_worlds(self, agent_id: int, world_idx: int) -> np.ndarray:
+        """
+        Returns the indices of all worlds that agent_id considers possible when the world at world_idx is the true world
+        """
+        return self.partitions[agent_id].accessible(world_idx)
+
+    def iter_relations(self, agent_id: int):
+        """
+        Generator over the relations of agent_id as (world, world) tuples
+        """
+        worlds = self.worlds
+        for world_idx1, world_idx2 in self.partitions[agent_id].iter_pairs():
+            yield worlds[world_idx1], worlds[world_idx2]
+
+    @property
+    def worlds(self) -> list[World]:
+        """
+        World objects of all remaining worlds, only built on demand (e.g. to draw the state space)
+        """
+        if self._world_views is None:
+            considered = np.stack([self.considered_worlds(agent_id) for agent_id in self.agent_ids], axis=1)
+            self._world_views = []
+            for hand_row, considered_row in zip(self.hands, considered):
+                state = {agent_id: self.mask_to_cards(hand_row[idx]) for idx, agent_id in enumerate(self.agent_ids)}
+                agent_list = [agent_id for idx, agent_id in enumerate(self.agent_ids) if considered_row[idx]]
+                self._world_views.append(World(state, agent_list))
+        return self._world_views
+
+    @property
+    def relations(self) -> dict[int, list[tuple[World, World]]]:
+        """
+        Relations as lists of (world, world) tuples per agent, only built on demand (e.g. to draw the state space)
+        """
+        if self._relation_views is None:
+            self._relation_views = {agent_id: list(self.iter_relations(agent_id)) for agent_id in self.agent_ids}
+        return self._relation_views
+
+    @property
+    def relation_labels(self) -> dict[int, np.ndarray]:
+        """
+        Class label of every world (in the order of worlds) per agent, an agent cannot distinguish worlds with the same
+        label. Unlike relations this does not build the (world, world) tuples, e.g. to draw large state spaces.
+        """
+        return {agent_id: partition.labels for agent_id, partition in self.partitions.items()}
+
+    def sample_world(self, agent_id: int, rng) -> dict[int, set[str]]:
+        """
+        Draw one of the worlds agent_id considers possible given its own hand, uniformly at random
+        :param rng: random.Random instance
+        :return: State dictionary with a set of route cards for every agent, or None if there are no such worlds
+        """
+        world_indices = np.flatnonzero(self.considered_worlds(agent_id))
+        if world_indices.size == 0:
+            return None
+        hands = self.hands[world_indices[rng.randrange(world_indices.size)]]
+        return {other_agent_id: self.mask_to_cards(hands[idx]) for other_agent_id, idx in self.agent_index.items()}
+
+    def snapshot(self) -> tuple:
+        """
+        Immutable copy of the remaining worlds and relations: the hand bitmasks of all worlds, the class label of
+        every world per agent and the hands the agents know. The arrays are shared with the model, which never changes
+        them in place.
+        """
+        self.hands.flags.writeable = False
+        labels = []
+        for agent_id in self.agent_ids:
+            self.partitions[agent_id].labels.flags.writeable = False
+            labels.append(self.partitions[agent_id].labels)
+        return self.hands, tuple(labels), tuple(self.known_hands.items())
+
+    def restore(self, snapshot: tuple):
+        """
+        Set the worlds and relations to a snapshot made by snapshot()
+        """
+        self.hands, labels, known_hands = snapshot
+        self.partitions = {agent_id: Partition.from_labels(agent_labels)
+                           for agent_id, agent_labels in zip(self.agent_ids, labels)}
+        self.known_hands = dict(known_hands)
+        self._invalidate_views()
+
+    def __str__(self):
+        name = ""
+        for agent_id in self.agent_ids:
+            name += f"--{agent_id}:"
+            for relation in itertools.islice(self.iter_relations(agent_id), 10):
+                name += f"{str(relation[0])}-{str(relation[1])} || "
+            if agent_id != self.agent_ids[-1]:
+                name += "\n"
+
+        return name
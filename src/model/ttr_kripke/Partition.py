@@ -0,0 +1,91 @@
+"""
+Equivalence relation of an agent over the worlds of a Kripke model, stored as a partition of the worlds
+"""
+
+# packages
+import numpy as np
+
+
+class Partition(object):
+
+    def __init__(self, num_worlds: int):
+        """
+        Initializer of a partition in which all worlds are in the same equivalence class, i.e. the agent cannot
+        distinguish any world. Worlds are referred to by their position in the list or array of worlds of the model.
+        :param num_worlds: Number of worlds in the model
+        """
+        self.labels = np.zeros(num_worlds, dtype=np.int64)
+        self._classes = None
+
+    @classmethod
+    def from_labels(cls, labels: np.ndarray):
+        """
+        Partition with the given class label per world. The labels are never changed in place, so the array may be
+        shared with (a snapshot of) another partition.
+        """
+        partition = cls(0)
+        partition.labels = labels
+        return partition
+
+    def __len__(self) -> int:
+        return self.labels.shape[0]
+
+    def refine(self, keys: np.ndarray):
+        """
+        Split every equivalence class on the given keys, worlds stay related only if they have equal keys
+        :param keys: Array with for every world what the agent can distinguish (e.g. its own hand)
+        """
+        keys = np.asarray(keys)
+        if len(self) == 0:
+            return
+        if (self.labels == self.labels[0]).all():
+            # single class, the keys alone determine the new classes
+            _, self.labels = np.unique(keys, return_inverse=True)
+        else:
+            _, self.labels = np.unique(np.stack([self.labels, keys.astype(np.int64)], axis=1), axis=0,
+                                       return_inverse=True)
+        self.labels = self.labels.reshape(-1)
+        self._classes = None
+
+    def restrict(self, keep: np.ndarray):
+        """
+        Remove the worlds for which keep is False, together with all their relations
+        :param keep: Boolean array over the worlds
+        """
+        self.labels = self.labels[np.asarray(keep, dtype=bool)]
+        self._classes = None
+
+    @property
+    def classes(self) -> dict[int, np.ndarray]:
+        """
+        Dictionary from class label to the sorted positions of the worlds in that class
+        """
+        if self._classes is None:
+            order = np.argsort(self.labels, kind='stable')
+            labels, starts = np.unique(self.labels[order], return_index=True)
+            self._classes = dict(zip(labels.tolist(), np.split(order, starts[1:])))
+        return self._classes
+
+    def accessible(self, world_idx: int) -> np.ndarray:
+        """
+        Positions of all worlds that are accessible from the world at world_idx
+        """
+        return self.classes[int(self.labels[world_idx])]
+
+    def are_related(self, world_idx1: int, world_idx2: int) -> bool:
+        return self.labels[world_idx1] == self.labels[world_idx2]
+
+    def num_relations(self) -> int:
+        """
+        Number of (world, world) pairs in the relation
+        """
+        return sum(len(members) ** 2 for members in self.classes.values())
+
+    def iter_pairs(self):
+        """
+        Generator over all related pairs of world positions, in the order of itertools.product over the worlds
+        """
+        classes = self.classes
+        for world_idx1, label in enumerate(self.labels.tolist()):
+            for world_idx2 in classes[label].tolist():
+                yield world_idx1, world_idx2
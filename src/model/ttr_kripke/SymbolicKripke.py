@@ -0,0 +1,369 @@
+"""
+Symbolic Kripke model that only stores the constraints learned so far instead of enumerating all worlds
+"""
+
+# packages
+import numpy as np
+
+from ..ttr_kripke.World import World
+from ..ttr_kripke.Partition import Partition
+from ..ttr_kripke.enumeration import count_worlds, iter_hand_partitions
+from ..events import EventLog, MessageEvent, AnnouncementEvent
+from ..config import *
+
+MAX_ENUMERATED_WORLDS = KRIPKE_CONFIG['MAX_ENUMERATED_WORLDS']
+
+
+class SymbolicKripke(object):
+
+    def __init__(self, agent_ids: list[int], route_cards_ids: list[str], events: EventLog = None, progress=None):
+        """
+        Initialization of the symbolic Kripke model. The worlds are all ways to deal the route cards evenly among the
+        agents that satisfy the public constraints: cards an agent is known to have and sets of cards of which an
+        agent is known to have at least one. Knowledge of an agent follows from these constraints together with its
+        own hand.
+        :param agent_ids: List of all agent id's
+        :param route_cards_ids: List of all route card id's
+        :param events: Event log for the messages of the model, disabled if None
+        :param progress: Progress function of the enumerating models, unused because no worlds are built
+        """
+        self.agent_ids = agent_ids
+        self.events = events if events is not None else EventLog()
+        self.route_cards_ids = route_cards_ids
+        self.num_cards_per_agent, rem = divmod(len(route_cards_ids), len(agent_ids))
+        assert rem == 0, "Cards cannot be evenly distributed among agents. EXITING..."
+
+        self.known_hands = {}  # agent_id -> own hand, only known to the agent itself
+        self.public_cards = {agent_id: set([]) for agent_id in agent_ids}  # agent has every card
+        self.public_clauses = {agent_id: [] for agent_id in agent_ids}  # agent has at least one card of every set
+        self.is_consistent = True
+
+        self._world_views = None
+        self._relation_views = None
+
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"- Symbolic Kripke model -> Number of Kripke worlds = "
+                                          f"{count_worlds(len(route_cards_ids), len(agent_ids))} (not enumerated)\n"))
+
+    def _add_public_card(self, agent_id: int, route_card: str):
+        """
+        Add the constraint that agent_id has route_card and propagate it through the public clauses
+        """
+        if route_card in self.public_cards[agent_id]:
+            return
+        for other_agent_id in self.agent_ids:
+            if other_agent_id != agent_id and route_card in self.public_cards[other_agent_id]:
+                self.is_consistent = False
+                return
+        if len(self.public_cards[agent_id]) == self.num_cards_per_agent:
+            self.is_consistent = False
+            return
+
+        self.public_cards[agent_id].add(route_card)
+
+        # clauses of agent_id containing the card are satisfied, other agents can no longer use the card
+        self.public_clauses[agent_id] = [clause for clause in self.public_clauses[agent_id]
+                                         if route_card not in clause]
+        for other_agent_id in self.agent_ids:
+            if other_agent_id == agent_id:
+                continue
+            clauses = self.public_clauses[other_agent_id]
+            self.public_clauses[other_agent_id] = []
+            for clause in clauses:
+                self._add_public_clause(other_agent_id, clause - {route_card})
+
+    def _add_public_clause(self, agent_id: int, route_cards: frozenset[str]):
+        """
+        Add the constraint that agent_id has at least one of route_cards, after removing cards owned by other agents
+        """
+        for other_agent_id in self.agent_ids:
+            if other_agent_id != agent_id:
+                route_cards = route_cards - self.public_cards[other_agent_id]
+
+        if route_cards & self.public_cards[agent_id]:
+            return
+        if not route_cards:
+            self.is_consistent = False
+            return
+        if len(route_cards) == 1:
+            self._add_public_card(agent_id, next(iter(route_cards)))
+            return
+
+        clauses = self.public_clauses[agent_id]
+        if any(clause <= route_cards for clause in clauses):
+            return
+        self.public_clauses[agent_id] = [clause for clause in clauses if not route_cards <= clause] + [route_cards]
+
+    def _invalidate_views(self):
+        self._world_views = None
+        self._relation_views = None
+
+    def update_once_cards_known(self, agent_id: int, route_cards: set[str]):
+        """
+        Update relations for agent_id that knows that target_agent has route_cards
+        :param agent_id: Id of agent for which relations will be updated
+        :param route_cards: Route cards of which agent knows
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'own_cards'))
+
+        self.known_hands[agent_id] = frozenset(route_cards)
+        self._invalidate_views()
+
+        if len(self.agent_ids) == 2:
+            # In case of two agents, all route cards are publicly known
+            self.public_announcement_route_card(agent_id, route_cards)
+
+    def public_announcement_possibilities(self, agent_id: int, route_cards: set[str]):
+        """
+        Function that publicly announces the states agents think of as possible true states
+        :param agent_id: Agent that announces possibilities
+        :param route_cards: Route cards of which there will be an announcement
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'one_of'))
+
+        if len(route_cards) == 1:
+            self.public_announcement_route_card(agent_id, route_cards)
+
+        self._add_public_clause(agent_id, frozenset(route_cards))
+        self._invalidate_views()
+
+    def public_announcement_route_card(self, agent_id: int, route_card: set[str]):
+        """
+        Method to do a public announcement of a route card and remove worlds that are no longer possible
+        :param agent_id: Agent that has route card
+        :param route_card: Route card that is being announced
+        """
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_card, 'card'))
+
+        for card in route_card:
+            self._add_public_card(agent_id, card)
+        self._invalidate_views()
+
+    def find_world(self, agent_id: int = None, excluded: tuple[str, int] = None, rng=None) -> dict[int, set[str]]:
+        """
+        Search for a world that satisfies all public constraints, in which agent_id (if given) has its own hand and
+        in which the excluded route card (if given) is not held by the excluded agent. Clauses are satisfied one at a
+        time, starting with the clause that has the fewest options, afterwards the remaining cards are dealt freely.
+        :param agent_id: Agent whose own hand is fixed in the world, None to only use public constraints
+        :param excluded: Tuple of a route card and an agent that may not hold that card
+        :param rng: random.Random instance to try the options in a random order, None for a fixed order
+        :return: State dictionary with a set of route cards for every agent, or None if there is no such world
+        """
+        if not self.is_consistent:
+            return None
+
+        owner = {}
+        for owner_id, route_cards in self.public_cards.items():
+            for route_card in route_cards:
+                owner[route_card] = owner_id
+        capacity = {owner_id: self.num_cards_per_agent - len(route_cards)
+                    for owner_id, route_cards in self.public_cards.items()}
+
+        if agent_id in self.known_hands:
+            own_hand = self.known_hands[agent_id]
+            if not self.public_cards[agent_id] <= own_hand:
+                return None
+            for route_card in own_hand - self.public_cards[agent_id]:
+                if route_card in owner:
+                    return None
+                owner[route_card] = agent_id
+            capacity[agent_id] = 0
+
+        if excluded is not None and owner.get(excluded[0]) == excluded[1]:
+            return None
+
+        clauses = [(owner_id, clause) for owner_id in self.agent_ids for clause in self.public_clauses[owner_id]]
+        failed_states = set([])
+
+        def deal_rest() -> bool:
+            free_cards = [route_card for route_card in self.route_cards_ids if route_card not in owner]
+            if rng is not None:
+                rng.shuffle(free_cards)
+            if excluded is not None and excluded[0] not in owner:
+                # first give the excluded card to another agent that has room for it
+                receivers = [owner_id for owner_id in self.agent_ids
+                             if owner_id != excluded[1] and capacity[owner_id] > 0]
+                if not receivers:
+                    return False
+                free_cards.remove(excluded[0])
+                owner[excluded[0]] = receivers[0]
+                capacity[receivers[0]] -= 1
+            for owner_id in self.agent_ids:
+                for _ in range(capacity[owner_id]):
+                    owner[free_cards.pop()] = owner_id
+                capacity[owner_id] = 0
+            return True
+
+        def satisfy_clauses() -> bool:
+            best = None
+            for owner_id, clause in clauses:
+                if any(owner.get(route_card) == owner_id for route_card in clause):
+                    continue
+                options = [route_card for route_card in clause if route_card not in owner
+                           and capacity[owner_id] > 0 and (route_card, owner_id) != excluded]
+                if not options:
+                    return False
+                if best is None or len(options) < len(best[1]):
+                    best = (owner_id, options)
+
+            if best is None:
+                return deal_rest()
+
+            state_key = frozenset(owner.items())
+            if state_key in failed_states:
+                return False
+
+            owner_id, options = best
+            if rng is not None:
+                rng.shuffle(options)
+            for route_card in options:
+                owner[route_card] = owner_id
+                capacity[owner_id] -= 1
+                if satisfy_clauses():
+                    return True
+                del owner[route_card]
+                capacity[owner_id] += 1
+
+            failed_states.add(state_key)
+            return False
+
+        if not satisfy_clauses():
+            return None
+
+        state = {owner_id: set([]) for owner_id in self.agent_ids}
+        for route_card, owner_id in owner.items():
+            state[owner_id].add(route_card)
+        return state
+
+    def get_known_route_cards(self, agent_id: int, target_agent_id: int) -> list[str]:
+        """
+        Function to retrieve the cards that one agent knows another agent has. A card is known if no world that
+        agent_id considers possible exists in which the target agent does not hold the card.
+        :param agent_id: Agent of which the worlds are considered
+        :param target_agent_id: Agent Id of which the agent knows the cards
+        :return: List containing knows cards in string representation
+        """
+        witness = self.find_world(agent_id)
+        if witness is None:
+            return []
+
+        certain_cards = self.public_cards[target_agent_id]
+        if agent_id == target_agent_id and agent_id in self.known_hands:
+            certain_cards = certain_cards | self.known_hands[agent_id]
+
+        known_cards = []
+        for route_card in self.route_cards_ids:
+            if route_card not in witness[target_agent_id]:
+                continue
+            if route_card in certain_cards or \
+                    self.find_world(agent_id, excluded=(route_card, target_agent_id)) is None:
+                known_cards.append(route_card)
+
+        return known_cards
+
+    def satisfies_constraints(self, state: dict[int, set[str]]) -> bool:
+        """
+        Returns True if the world with the given state satisfies all public constraints
+        """
+        if not self.is_consistent:
+            return False
+        for agent_id in self.agent_ids:
+            hand = state[agent_id]
+            if not self.public_cards[agent_id] <= hand:
+                return False
+            for clause in self.public_clauses[agent_id]:
+                if not clause & hand:
+                    return False
+        return True
+
+    @property
+    def worlds(self) -> list[World]:
+        """
+        World objects of all remaining worlds, only enumerated on demand for small models (e.g. to draw the state space)
+        """
+        if self._world_views is None:
+            num_worlds = count_worlds(len(self.route_cards_ids), len(self.agent_ids))
+            if num_worlds > MAX_ENUMERATED_WORLDS:
+                raise RuntimeError(f"Symbolic Kripke model with {num_worlds} worlds is too large to enumerate.")
+
+            self._world_views = []
+            for world_i in iter_hand_partitions(self.route_cards_ids, len(self.agent_ids)):
+                state = {agent_id: set(world_i[idx]) for idx, agent_id in enumerate(self.agent_ids)}
+                if self.satisfies_constraints(state):
+                    agent_list = [agent_id for agent_id in self.agent_ids
+                                  if agent_id not in self.known_hands or self.known_hands[agent_id] == state[agent_id]]
+                    self._world_views.append(World(state, agent_list))
+        return self._world_views
+
+    @property
+    def relations(self) -> dict[int, list[tuple[World, World]]]:
+        """
+        Relations as lists of (world, world) tuples per agent, only enumerated on demand for small models
+        """
+        if self._relation_views is None:
+            worlds = self.worlds
+            self._relation_views = {}
+            for agent_id, labels in self.relation_labels.items():
+                partition = Partition.from_labels(labels)
+                self._relation_views[agent_id] = [(worlds[world_idx1], worlds[world_idx2])
+                                                  for world_idx1, world_idx2 in partition.iter_pairs()]
+        return self._relation_views
+
+    @property
+    def relation_labels(self) -> dict[int, np.ndarray]:
+        """
+        Class label of every world (in the order of worlds) per agent, an agent cannot distinguish worlds with the same
+        label: all worlds for an agent that has not seen its hand, otherwise the worlds in which it has the same hand
+        """
+        worlds = self.worlds
+        labels = {}
+        for agent_id in self.agent_ids:
+            if agent_id in self.known_hands:
+                hand_keys = {}
+                labels[agent_id] = np.array([hand_keys.setdefault(frozenset(world.get_state(agent_id)), len(hand_keys))
+                                             for world in worlds], dtype=np.int64)
+            else:
+                labels[agent_id] = np.zeros(len(worlds), dtype=np.int64)
+        return labels
+
+    def sample_world(self, agent_id: int, rng) -> dict[int, set[str]]:
+        """
+        Draw a world agent_id considers possible given its own hand. The search tries the options in a random order,
+        so every world that satisfies the constraints can be drawn, although not uniformly.
+        :param rng: random.Random instance
+        :return: State dictionary with a set of route cards for every agent, or None if there are no such worlds
+        """
+        return self.find_world(agent_id, rng=rng)
+
+    def snapshot(self) -> tuple:
+        """
+        Immutable copy of the constraints and the hands the agents know
+        """
+        return (tuple(self.known_hands.items()),
+                tuple(frozenset(self.public_cards[agent_id]) for agent_id in self.agent_ids),
+                tuple(tuple(self.public_clauses[agent_id]) for agent_id in self.agent_ids),
+                self.is_consistent)
+
+    def restore(self, snapshot: tuple):
+        """
+        Set the constraints to a snapshot made by snapshot()
+        """
+        known_hands, public_cards, public_clauses, self.is_consistent = snapshot
+        self.known_hands = dict(known_hands)
+        self.public_cards = {agent_id: set(route_cards) for agent_id, route_cards in zip(self.agent_ids, public_cards)}
+        self.public_clauses = {agent_id: list(clauses) for agent_id, clauses in zip(self.agent_ids, public_clauses)}
+        self._invalidate_views()
+
+    def __str__(self):
+        name = ""
+        for agent_id in self.agent_ids:
+            name += f"--{agent_id}: has {sorted(self.public_cards[agent_id])}"
+            for clause in self.public_clauses[agent_id]:
+                name += f" || at least one of {sorted(clause)}"
+            if agent_id != self.agent_ids[-1]:
+                name += "\n"
+
+        return name
@@ -1,65 +1,85 @@
 # packages
 import itertools
+import numpy as np
 
 from ..ttr_kripke.World import World
+from ..ttr_kripke.Partition import Partition
+from ..ttr_kripke.enumeration import count_worlds, iter_hand_partitions
+from ..events import EventLog, MessageEvent, AnnouncementEvent
+from ..config import *
+
+MAX_WORLDS = KRIPKE_CONFIG['MAX_WORLDS']
+PROGRESS_STEP = 10000  # number of worlds between two progress reports
 
 
 class TtRKripke(object):
 
-    def __init__(self, agent_ids: list[int], route_cards_ids: list[str]):
+    def __init__(self, agent_ids: list[int], route_cards_ids: list[str], max_worlds: int = MAX_WORLDS,
+                 events: EventLog = None, progress=None):
         """
         Initialization of Kripke model
         :param agent_ids: List of all agent id's
         :param route_cards_ids: List of all route card id's
+        :param max_worlds: Maximum number of worlds that may be allocated, None for no limit
+        :param events: Event log for the messages of the model, disabled if None
+        :param progress: Function called with ('worlds', done, total) while the worlds are built, see TicketToRide
         """
         self.agent_ids = agent_ids
+        self.events = events if events is not None else EventLog()
+        self.progress = progress
         self.route_cards_ids = route_cards_ids
+        self.max_worlds = max_worlds
         self.worlds = []
-        self.relations = {}
+        self.partitions = {}
+        self._relation_views = None
 
         self._init_worlds()
         self._init_relations()
 
     def _init_worlds(self):
         """
-        Initialize worlds by creating possible combinations of route cards
-        """
-        print("- Initializing worlds...", end=" -> ")
-        m_route_cards = len(self.route_cards_ids)
-        n_agents = len(self.agent_ids)
-        num_cards_per_agent, rem = divmod(m_route_cards, n_agents)
-        assert rem == 0, "Cards cannot be evenly distributed among agents. EXITING..."
-
-        m_cards_combinations = list(itertools.combinations(self.route_cards_ids, num_cards_per_agent))
-        n_agents_combinations = list(itertools.permutations(m_cards_combinations, n_agents))
-        for world_i in n_agents_combinations:
-            to_add = True
-            set_cards = set(world_i[0])
-            for idx in range(1, n_agents):
-                new_set = set(world_i[idx])
-                if set_cards.intersection(new_set):
-                    to_add = False
-                    break  # Do not add
-                set_cards.update(new_set)
-
-            if to_add:
-                state = {}
-                for idx, agent_id in enumerate(self.agent_ids):
-                    state[agent_id] = set(world_i[idx])
-                self.worlds.append(World(state, self.agent_ids.copy()))
-        print(f"Number of Kripke worlds = {len(self.worlds)}")
+        Initialize worlds by streaming all ways to deal the route cards, the number of worlds is reported before
+        allocating
+        """
+        num_worlds = count_worlds(len(self.route_cards_ids), len(self.agent_ids))
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"- Initializing worlds... -> Number of Kripke worlds = {num_worlds}"))
+        assert self.max_worlds is None or num_worlds <= self.max_worlds, \
+            f"Number of worlds exceeds the maximum of {self.max_worlds}. EXITING..."
+
+        progress = self.progress
+        if progress is not None:
+            progress('worlds', 0, num_worlds)
+        for world_i in iter_hand_partitions(self.route_cards_ids, len(self.agent_ids)):
+            state = {}
+            for idx, agent_id in enumerate(self.agent_ids):
+                state[agent_id] = set(world_i[idx])
+            self.worlds.append(World(state, self.agent_ids.copy()))
+            if progress is not None and len(self.worlds) % PROGRESS_STEP == 0:
+                progress('worlds', len(self.worlds), num_worlds)
+        if progress is not None:
+            progress('worlds', num_worlds, num_worlds)
 
     def _init_relations(self):
         """
-        Initialize relations for all worlds before agents knows their own card
+        Initialize relations for all worlds before agents knows their own card. The relation of every agent is stored
+        as a partition of the worlds into equivalence classes, the list of (world, world) tuples is built on demand.
         """
-        print(f"- Initializing relations...", end=" -> ")
-        relation_list = []
-        for relation in itertools.product(self.worlds, repeat=2):
-            relation_list.append(relation)
         for i in self.agent_ids:
-            self.relations[i] = relation_list
-        print(f"Number of relations per agent = {len(relation_list)}\n")
+            self.partitions[i] = Partition(len(self.worlds))
+        self._relation_views = None
+        if self.events.enabled:
+            self.events.emit(MessageEvent(f"- Initializing relations... -> Number of relations per agent = "
+                                          f"{len(self.worlds) ** 2}\n"))
+
+    def _keep_worlds(self, keep: list[bool]):
+        """
+        Remove all worlds for which keep is False, together with their relations for every agent
+        """
+        self.worlds = [world for world, to_keep in zip(self.worlds, keep) if to_keep]
+        for partition in self.partitions.values():
+            partition.restrict(keep)
+        self._relation_views = None
 
     def update_once_cards_known(self, agent_id: int, route_cards: set[str]):
         """
@@ -67,18 +87,14 @@ class TtRKripke(object):
         :param agent_id: Id of agent for which relations will be updated
         :param route_cards: Route cards of which agent knows
         """
-        print(f"--> Agent {agent_id} knows that itself has cards {route_cards}")
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'own_cards'))
 
-        update_dict = []
-        for relation in self.relations[agent_id]:
-            # check if intersection is equal to route cards
-            from_state = relation[0].get_state(agent_id)
-            to_state = relation[1].get_state(agent_id)
-            if not from_state.symmetric_difference(to_state):
-                # true if internal states of agent_id is not equal
-                update_dict.append(relation)
-
-        self.relations[agent_id] = update_dict
+        # relations only remain between worlds in which the internal states of agent_id are equal
+        hand_keys = {}
+        keys = [hand_keys.setdefault(frozenset(world.get_state(agent_id)), len(hand_keys)) for world in self.worlds]
+        self.partitions[agent_id].refine(keys)
+        self._relation_views = None
 
         # agents no longer consider the worlds that violate their own relations
         for world in self.worlds:
@@ -97,31 +113,14 @@ class TtRKripke(object):
         :param agent_id: Agent that announces possibilities
         :param route_cards: Route cards of which there will be an announcement
         """
-        print(f"--> Publicly known that agent {agent_id} has at least one of cards {route_cards}")
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_cards, 'one_of'))
 
         if len(route_cards) == 1:
             self.public_announcement_route_card(agent_id, route_cards)
 
-        # remove relations
-        for agent in self.agent_ids:
-            update_dict = []
-            for relation in self.relations[agent]:
-                from_state = relation[0].get_state(agent_id)
-                to_state = relation[1].get_state(agent_id)
-                if from_state.intersection(route_cards) and to_state.intersection(route_cards):
-                    # keep state if one of route cards is in state
-                    update_dict.append(relation)
-
-            self.relations[agent] = update_dict
-
-        # remove worlds
-        world_list = []
-        for world in self.worlds:
-            if route_cards.intersection(world.get_state(agent_id)):
-                # true if card is in state for agent_id
-                world_list.append(world)
-
-        self.worlds = world_list
+        # remove worlds (and their relations) in which none of the route cards is in the state of agent_id
+        self._keep_worlds([bool(route_cards.intersection(world.get_state(agent_id))) for world in self.worlds])
 
     def public_announcement_route_card(self, agent_id: int, route_card: set[str]):
         """
@@ -129,28 +128,48 @@ class TtRKripke(object):
         :param agent_id: Agent that has route card
         :param route_card: Route card that is being announced
         """
-        print(f"--> Publicly known that agent {agent_id} has card {route_card}")
+        if self.events.enabled:
+            self.events.emit(AnnouncementEvent(agent_id, route_card, 'card'))
 
-        # remove relations
-        for agent in self.agent_ids:
-            update_dict = []
-            for relation in self.relations[agent]:
-                from_state = relation[0].get_state(agent_id)
-                to_state = relation[1].get_state(agent_id)
-                if not route_card.difference(from_state) and not route_card.difference(to_state):
-                    # true if card in both states
-                    update_dict.append(relation)
+        # remove worlds (and their relations) in which the card is not in the state of agent_id
+        self._keep_worlds([not route_card.difference(world.get_state(agent_id)) for world in self.worlds])
 
-            self.relations[agent] = update_dict
+    def are_related(self, agent_id: int, world1: World, world2: World) -> bool:
+        """
+        Returns True if agent_id cannot distinguish the two worlds
+        """
+        return self.partitions[agent_id].are_related(self.worlds.index(world1), self.worlds.index(world2))
 
-        # remove worlds
-        world_list = []
-        for world in self.worlds:
-            if not route_card.difference(world.get_state(agent_id)):
-                # true if card is in state for agent_id
-                world_list.append(world)
+    def accessible_worlds(self, agent_id: int, world: World) -> list[World]:
+        """
+        Returns all worlds that agent_id considers possible when world is the true world
+        """
+        accessible = self.partitions[agent_id].accessible(self.worlds.index(world))
+        return [self.worlds[world_idx] for world_idx in accessible]
 
-        self.worlds = world_list
+    def iter_relations(self, agent_id: int):
+        """
+        Generator over the relations of agent_id as (world, world) tuples
+        """
+        for world_idx1, world_idx2 in self.partitions[agent_id].iter_pairs():
+            yield self.worlds[world_idx1], self.worlds[world_idx2]
+
+    @property
+    def relations(self) -> dict[int, list[tuple[World, World]]]:
+        """
+        Relations as lists of (world, world) tuples per agent, only built on demand (e.g. to draw the state space)
+        """
+        if self._relation_views is None:
+            self._relation_views = {agent_id: list(self.iter_relations(agent_id)) for agent_id in self.agent_ids}
+        return self._relation_views
+
+    @property
+    def relation_labels(self) -> dict[int, np.ndarray]:
+        """
+        Class label of every world (in the order of worlds) per agent, an agent cannot distinguish worlds with the same
+        label. Unlike relations this does not build the (world, world) tuples, e.g. to draw large state spaces.
+        """
+        return {agent_id: partition.labels for agent_id, partition in self.partitions.items()}
 
     def get_known_route_cards(self, agent_id: int, target_agent_id: int) -> list[str]:
         """
@@ -171,24 +190,56 @@ class TtRKripke(object):
                     else:
                         possible_target_cards[route_card] = 1
 
+        if world_counter == 0:
+            return []
+
+        # in the order of the route cards, not of the sets of the worlds, which changes with the hash seed
         known_cards = []
-        for route_card, card_count in possible_target_cards.items():
-            if card_count == world_counter:
+        for route_card in self.route_cards_ids:
+            if possible_target_cards.get(route_card, 0) == world_counter:
                 known_cards.append(route_card)
 
         return known_cards
 
+    def sample_world(self, agent_id: int, rng) -> dict[int, set[str]]:
+        """
+        Draw one of the worlds agent_id considers possible given its own hand, uniformly at random
+        :param rng: random.Random instance
+        :return: State dictionary with a set of route cards for every agent, or None if there are no such worlds
+        """
+        worlds = [world for world in self.worlds if world.has_agent_in_agent_list(agent_id, agent_id)]
+        if not worlds:
+            return None
+        world = worlds[rng.randrange(len(worlds))]
+        return {other_agent_id: set(world.get_state(other_agent_id)) for other_agent_id in self.agent_ids}
+
+    def snapshot(self) -> tuple:
+        """
+        Immutable copy of the remaining worlds and the class label of every world per agent. The worlds themselves
+        are shared with the model, they do not change after the route cards are dealt.
+        """
+        labels = []
+        for agent_id in self.agent_ids:
+            self.partitions[agent_id].labels.flags.writeable = False
+            labels.append(self.partitions[agent_id].labels)
+        return tuple(self.worlds), tuple(labels)
+
+    def restore(self, snapshot: tuple):
+        """
+        Set the worlds and relations to a snapshot made by snapshot()
+        """
+        worlds, labels = snapshot
+        self.worlds = list(worlds)
+        self.partitions = {agent_id: Partition.from_labels(agent_labels)
+                           for agent_id, agent_labels in zip(self.agent_ids, labels)}
+        self._relation_views = None
+
     def __str__(self):
         name = ""
-        cnt = 0
         for agent_id in self.agent_ids:
             name += f"--{agent_id}:"
-            for relation in self.relations[agent_id]:
-                cnt += 1
+            for relation in itertools.islice(self.iter_relations(agent_id), 10):
                 name += f"{str(relation[0])}-{str(relation[1])} || "
-                if cnt == 10:
-                    cnt = 0
-                    break
             if agent_id != self.agent_ids[-1]:
                 name += "\n"
 
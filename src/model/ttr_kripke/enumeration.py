@@ -0,0 +1,91 @@
+"""
+Functions to count and enumerate the worlds of a Kripke model, i.e. all ways to deal the route cards over the agents
+"""
+
+# packages
+import itertools
+import math
+import numpy as np
+
+
+def count_worlds(num_route_cards: int, num_agents: int) -> int:
+    """
+    Exact number of worlds, the multinomial coefficient m! / (k!)^n with k = m / n cards per agent
+    :param num_route_cards: Total number of route cards m
+    :param num_agents: Number of agents n
+    :return: Number of ordered partitions of the route cards into equal hands
+    """
+    num_cards_per_agent, rem = divmod(num_route_cards, num_agents)
+    assert rem == 0, "Cards cannot be evenly distributed among agents. EXITING..."
+
+    num_worlds = 1
+    for remaining in range(num_route_cards, 0, -num_cards_per_agent):
+        num_worlds *= math.comb(remaining, num_cards_per_agent)
+    return num_worlds
+
+
+def iter_hand_partitions(route_cards: list, num_agents: int):
+    """
+    Generator over all disjoint ordered partitions of route_cards into equal hands, one hand per agent. Only valid
+    worlds are generated, in the same order as filtering itertools.permutations of the combinations of cards.
+    :param route_cards: List of route cards (or their indices)
+    :param num_agents: Number of agents
+    :return: Generator of tuples with a tuple of route cards for every agent
+    """
+    num_cards_per_agent, rem = divmod(len(route_cards), num_agents)
+    assert rem == 0, "Cards cannot be evenly distributed among agents. EXITING..."
+
+    def deal(remaining: tuple, agents_left: int):
+        if agents_left == 1:
+            # the last agent holds exactly the cards that are left
+            yield remaining,
+            return
+        for hand in itertools.combinations(remaining, num_cards_per_agent):
+            hand_set = set(hand)
+            rest = tuple(card for card in remaining if card not in hand_set)
+            for other_hands in deal(rest, agents_left - 1):
+                yield (hand,) + other_hands
+
+    if num_agents > 0:
+        yield from deal(tuple(route_cards), num_agents)
+
+
+def iter_hand_masks(num_route_cards: int, num_agents: int):
+    """
+    Generator over the same worlds as iter_hand_partitions, where every hand is a bitmask over the card indices
+    :param num_route_cards: Total number of route cards
+    :param num_agents: Number of agents
+    :return: Generator of tuples with an integer bitmask for every agent
+    """
+    masks = [1 << idx for idx in range(num_route_cards)]
+    for partition in iter_hand_partitions(masks, num_agents):
+        yield tuple(sum(hand) for hand in partition)
+
+
+def hand_mask_array(num_route_cards: int, num_agents: int) -> np.ndarray:
+    """
+    Vectorized version of iter_hand_masks that deals one agent at a time to all partial worlds at once. Every partial
+    world is only extended with combinations of its remaining cards, so no invalid world is ever generated.
+    :param num_route_cards: Total number of route cards
+    :param num_agents: Number of agents
+    :return: uint64 array of shape (count_worlds(num_route_cards, num_agents), num_agents), in the same order as
+    iter_hand_masks
+    """
+    num_cards_per_agent, rem = divmod(num_route_cards, num_agents)
+    assert rem == 0, "Cards cannot be evenly distributed among agents. EXITING..."
+
+    hands = np.zeros((1, 0), dtype=np.uint64)
+    remaining = (np.uint64(1) << np.arange(num_route_cards, dtype=np.uint64))[None, :]
+    for _ in range(num_agents - 1):
+        num_remaining = remaining.shape[1]
+        hand_slots = list(itertools.combinations(range(num_remaining), num_cards_per_agent))
+        rest_slots = [[slot for slot in range(num_remaining) if slot not in hand] for hand in hand_slots]
+
+        # bits of the remaining cards are disjoint, so their sum is the bitmask of the hand
+        new_hands = remaining[:, np.array(hand_slots, dtype=np.intp)].sum(axis=2, dtype=np.uint64)
+        remaining = remaining[:, np.array(rest_slots, dtype=np.intp).reshape(len(hand_slots), -1)]
+        remaining = remaining.reshape(-1, num_remaining - num_cards_per_agent)
+        hands = np.concatenate([np.repeat(hands, len(hand_slots), axis=0), new_hands.reshape(-1, 1)], axis=1)
+
+    # the last agent holds exactly the cards that are left
+    return np.concatenate([hands, remaining.sum(axis=1, dtype=np.uint64)[:, None]], axis=1)
@@ -0,0 +1,102 @@
+# packages
+import argparse
+import collections
+import json
+import sys
+
+from model.Simulation import Simulation
+from model.TicketToRide import KRIPKE_BACKENDS, KRIPKE_BACKEND, AGENT_TYPES
+from model.profiling import Profiler
+
+DEFAULT_NUM_AGENTS = 3
+DEFAULT_NUM_ROUTE_CARDS = 2
+DEFAULT_NUM_GAMES = 100
+DEFAULT_SEED = 0
+DEFAULT_WORKERS = 1
+
+
+def main():
+    """
+        Main function to simulate many games of ticket to ride without visualizer
+    """
+    parser = make_parser()
+    args = parser.parse_args()
+
+    assert 2 <= args.num_agents <= 5, "The number of agents must be in {2,...,5}. EXITING..."
+    assert args.num_route_cards >= 1, "The number of route cards must be at least 1. EXITING..."
+    assert args.workers >= 1, "The number of workers must be at least 1. EXITING..."
+    assert not args.profile or args.workers == 1, "Games can only be profiled with 1 worker. EXITING..."
+    agent_types = args.agent_types.split(',') if args.agent_types else None
+    for agent_type in agent_types or []:
+        assert agent_type in AGENT_TYPES, f"Unknown agent type {agent_type}. Choose in {list(AGENT_TYPES.keys())}."
+
+    simulation = Simulation(num_agents=args.num_agents, num_route_cards=args.num_route_cards,
+                            kripke_backend=args.kripke, max_turns=args.max_turns, quiet=not args.verbose,
+                            agent_types=agent_types, profiler=Profiler(enabled=bool(args.profile)))
+    seeds = range(args.seed, args.seed + args.games)
+
+    output = open(args.output, mode='w', encoding='utf-8') if args.output else sys.stdout
+    wins = collections.Counter()
+    reasons = collections.Counter()
+    total_turns = 0
+    try:
+        for result in simulation.run(seeds, workers=args.workers):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            wins[result['winner']] += 1
+            reasons[result['termination_reason']] += 1
+            total_turns += result['turns']
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print_summary(args.games, wins, reasons, total_turns)
+    if args.profile:
+        simulation.profiler.write_json(args.profile + '.json')
+        simulation.profiler.write_folded(args.profile + '.folded')
+        print(f"\n{simulation.profiler.summary()}", file=sys.stderr)
+
+
+def print_summary(num_games: int, wins: collections.Counter, reasons: collections.Counter, total_turns: int):
+    """
+        Prints the aggregated results of all games to stderr, so they do not mix with the results on stdout
+    """
+    print(f"\nPlayed {num_games} games, mean number of turns = {total_turns / max(num_games, 1):.2f}", file=sys.stderr)
+    for agent_id, count in sorted(wins.items()):
+        print(f"* Agent {agent_id} won {count} games", file=sys.stderr)
+    for reason, count in reasons.most_common():
+        print(f"* {count} games ended by {reason}", file=sys.stderr)
+
+
+def make_parser():
+    """
+        Makes a parser for user input
+    """
+    parser = argparse.ArgumentParser(description='Ticket to Ride simulation without visualizer')
+    parser.add_argument("--num_agents", '-n', type=int, help="The number of agents. Options={2,...,5}.",
+                        default=DEFAULT_NUM_AGENTS)
+    parser.add_argument("--num_route_cards", '-m', type=int, help="The number of route cards per agent.",
+                        default=DEFAULT_NUM_ROUTE_CARDS)
+    parser.add_argument("--kripke", '-k', choices=list(KRIPKE_BACKENDS.keys()), default=KRIPKE_BACKEND,
+                        help="The Kripke model implementation.")
+    parser.add_argument("--agent_types", '-a', default=None,
+                        help=f"Comma separated type per agent, e.g. mcts,greedy,greedy. Options={{"
+                             f"{','.join(AGENT_TYPES.keys())}}}, by default all agents are greedy.")
+    parser.add_argument("--games", '-g', type=int, help="The number of games to play.", default=DEFAULT_NUM_GAMES)
+    parser.add_argument("--seed", '-s', type=int, default=DEFAULT_SEED,
+                        help="Seed of the first game, game i is played with seed + i.")
+    parser.add_argument("--workers", '-w', type=int, default=DEFAULT_WORKERS,
+                        help="The number of worker processes that play games in parallel.")
+    parser.add_argument("--max_turns", type=int, default=None,
+                        help="Maximum number of turns per game, by default games are played until they finish.")
+    parser.add_argument("--output", '-o', default=None,
+                        help="File to write the results to as JSON lines, by default they are written to stdout.")
+    parser.add_argument("--verbose", '-v', action='store_true', help="Show the console output of every game.")
+    parser.add_argument("--profile", '-p', default=None,
+                        help="Time the phases of the games and write them to PROFILE.json and to PROFILE.folded (folded "
+                             "stacks for flame graphs).")
+    return parser
+
+
+if __name__ == "__main__":
+    main()